@@ -1,11 +1,10 @@
 import asyncio
 from typing import List
 
-import requests
-
 from config import Config
+from llm_processor import LLMProcessor
 from vector_search import MilvusWrapper
-from voice_processor import VoiceProcessor
+from voice_processor import NO_RESULTS_MESSAGE, WAIT_MESSAGE, VoiceProcessor
 from web_searcher import WebSearcher
 
 
@@ -13,6 +12,7 @@ class Agent:
     def __init__(self, config, voice_processor):
         self.config = config
         self.voice_processor = voice_processor
+        self.llm_processor = LLMProcessor(config)
 
     async def process_voice_query(self, audio_data: bytes):
         query_text = await self.voice_processor.start_transcription()
@@ -24,9 +24,7 @@ class Agent:
 
         if not results:
             # If no results found, search the web
-            self.voice_processor.text_to_speech(
-                "Please wait while I search for information."
-            )
+            self.voice_processor.text_to_speech(WAIT_MESSAGE)
             web_results = self.web_searcher.search(query_text)
 
             # Convert web results to embeddings and store in Milvus
@@ -41,16 +39,7 @@ class Agent:
         self.voice_processor.text_to_speech(response)
 
     def _get_embedding(self, text: str) -> List[float]:
-        print("Generating Embeddings")
-        payload = {"input": text, "model": "jina-embeddings-v3"}
-        response = requests.post(self.embedding_url, json=payload, headers=self.headers)
-
-        if response.status_code == 200:
-            return response.json()["data"][0]["embedding"]
-        else:
-            raise Exception(
-                f"Error getting embedding: {response.status_code} - {response.text}"
-            )
+        return self.llm_processor.embed_texts([text])[0].tolist()
 
     def _format_response(self, results: List[dict]) -> str:
         # Implement your response formatting logic here
@@ -58,5 +47,5 @@ class Agent:
         return (
             results[0]["content"]
             if results
-            else "I couldn't find any relevant information."
+            else NO_RESULTS_MESSAGE
         )
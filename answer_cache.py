@@ -0,0 +1,230 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Sequence
+
+from config import Config
+from vector_search import MilvusWrapper, index_build_params
+
+
+@dataclass
+class CachedAnswer:
+    text: str
+    audio: Optional[bytes]
+    similarity: float
+    kind: str
+
+
+class SemanticAnswerCache:
+    """Caches final answers (and their audio) by query embedding.
+
+    Answers live in a dedicated collection next to the knowledge base.
+    A lookup is a top-1 search restricted to ``ANSWER_CACHE_THRESHOLD``
+    similarity, so near-duplicate phrasings ("what is Milvus" / "what's
+    Milvus") hit the same entry. Entries expire after a TTL, the least
+    recently used are evicted beyond ``ANSWER_CACHE_MAX_ENTRIES``, and
+    calendar-derived answers have their own short TTL, expire at midnight
+    and can be dropped with :meth:`invalidate` when the calendar changes.
+    """
+
+    def __init__(self, config: Config, milvus_wrapper: MilvusWrapper):
+        self.config = config
+        self.milvus_wrapper = milvus_wrapper
+        self.executor = milvus_wrapper.executor
+        self.collection = config.ANSWER_CACHE_COLLECTION
+        self.audio_dir = config.ANSWER_CACHE_DIR
+        os.makedirs(self.audio_dir, exist_ok=True)
+        # id -> kind, in least-recently-used order
+        self.entries: OrderedDict[str, str] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._connected = False
+        self._connect_lock = threading.Lock()
+
+    @property
+    def client(self):
+        return self.milvus_wrapper.client
+
+    def connect(self):
+        """Prepares the cache collection on first use; blocking."""
+        with self._connect_lock:
+            if not self._connected:
+                self._ensure_collection_exists()
+                self._connected = True
+
+    async def aconnect(self):
+        # Keeps the first connection off the event loop
+        if not self._connected:
+            await self.executor.run("milvus", self.connect)
+
+    def _ensure_collection_exists(self):
+        if not self.client.has_collection(self.collection):
+            index_params = self.client.prepare_index_params()
+            index_params.add_index(
+                field_name="embedding",
+                index_type=self.config.MILVUS_INDEX_TYPE,
+                metric_type="COSINE",
+                params=index_build_params(self.config, self.config.MILVUS_INDEX_TYPE),
+            )
+            self.client.create_collection(
+                self.collection, index_params=index_params, **self._collection_schema()
+            )
+        self.client.load_collection(self.collection)
+
+        # Every stored entry, oldest first, so that the next store evicts
+        # any beyond ANSWER_CACHE_MAX_ENTRIES (e.g. left by another process)
+        rows = self.client.query(
+            collection_name=self.collection,
+            filter='id != ""',
+            output_fields=["id", "kind", "created_at"],
+        )
+        for row in sorted(rows, key=lambda row: row["created_at"]):
+            self.entries[row["id"]] = row["kind"]
+
+    def _collection_schema(self) -> dict:
+        fields = ["id", "embedding", "answer", "kind", "created_at"]
+        if self.config.VECTOR_BACKEND == "local":
+            # The local backend needs no pymilvus schema
+            return {
+                "dimension": self.config.VECTOR_DIM,
+                "vector_field_name": "embedding",
+                "fields": fields,
+            }
+        from pymilvus import CollectionSchema, DataType, FieldSchema
+
+        return {
+            "schema": CollectionSchema(
+                fields=[
+                    FieldSchema("id", DataType.VARCHAR, is_primary=True, max_length=64),
+                    FieldSchema(
+                        "embedding", DataType.FLOAT_VECTOR, dim=self.config.VECTOR_DIM
+                    ),
+                    FieldSchema("answer", DataType.VARCHAR, max_length=65535),
+                    FieldSchema("kind", DataType.VARCHAR, max_length=32),
+                    FieldSchema("created_at", DataType.DOUBLE),
+                ]
+            )
+        }
+
+    @staticmethod
+    def _entry_id(query: str) -> str:
+        normalized = " ".join(query.lower().split())
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:32]
+
+    def _audio_path(self, entry_id: str) -> str:
+        return os.path.join(self.audio_dir, f"{entry_id}.mp3")
+
+    def _expired(self, kind: str, created_at: float) -> bool:
+        if kind == "calendar":
+            # "Today" and "tomorrow" change meaning at midnight
+            if datetime.fromtimestamp(created_at).date() != datetime.now().date():
+                return True
+            ttl = self.config.ANSWER_CACHE_CALENDAR_TTL
+        else:
+            ttl = self.config.ANSWER_CACHE_TTL
+        return time.time() - created_at > ttl
+
+    async def lookup(self, query: str) -> Optional[CachedAnswer]:
+        await self.aconnect()
+        vector = (await self.milvus_wrapper.aencode_queries([query]))[0]
+        search_params = self.milvus_wrapper.search_params()
+        search_params["metric_type"] = "COSINE"
+        search_params["params"]["radius"] = self.config.ANSWER_CACHE_THRESHOLD
+        hits = await self.executor.run(
+            "milvus",
+            self.client.search,
+            collection_name=self.collection,
+            data=[vector],
+            limit=1,
+            output_fields=["answer", "kind", "created_at"],
+            search_params=search_params,
+        )
+        hits = [
+            hit for hit in hits[0] if hit["distance"] >= self.config.ANSWER_CACHE_THRESHOLD
+        ]
+        if not hits:
+            self.misses += 1
+            return None
+
+        hit = hits[0]
+        entity = hit["entity"]
+        if self._expired(entity["kind"], entity["created_at"]):
+            await self._delete([hit["id"]])
+            self.misses += 1
+            return None
+
+        # Stored by another process since startup: track it from now on
+        self.entries[hit["id"]] = entity["kind"]
+        self.entries.move_to_end(hit["id"])
+        self.hits += 1
+        audio_path = self._audio_path(hit["id"])
+        audio = None
+        if os.path.exists(audio_path):
+            with open(audio_path, "rb") as audio_file:
+                audio = audio_file.read()
+        return CachedAnswer(
+            text=entity["answer"],
+            audio=audio,
+            similarity=hit["distance"],
+            kind=entity["kind"],
+        )
+
+    async def store(
+        self,
+        query: str,
+        answer: str,
+        kind: str = "general",
+        audio: Optional[Sequence[bytes]] = None,
+    ):
+        await self.aconnect()
+        entry_id = self._entry_id(query)
+        vector = (await self.milvus_wrapper.aencode_queries([query]))[0]
+        await self.executor.run(
+            "milvus",
+            self.client.upsert,
+            collection_name=self.collection,
+            data=[
+                {
+                    "id": entry_id,
+                    "embedding": vector.tolist(),
+                    "answer": answer,
+                    "kind": kind,
+                    "created_at": time.time(),
+                }
+            ],
+        )
+        if audio:
+            with open(self._audio_path(entry_id), "wb") as audio_file:
+                audio_file.writelines(audio)
+        self.entries[entry_id] = kind
+        self.entries.move_to_end(entry_id)
+
+        overflow = len(self.entries) - self.config.ANSWER_CACHE_MAX_ENTRIES
+        if overflow > 0:
+            await self._delete(list(self.entries)[:overflow])
+
+    async def invalidate(self, kind: str = "calendar"):
+        """Drops every cached answer of ``kind``, e.g. after a calendar change."""
+        await self.aconnect()
+        await self._delete(
+            [entry_id for entry_id, entry_kind in self.entries.items() if entry_kind == kind]
+        )
+
+    async def _delete(self, entry_ids: list[str]):
+        if not entry_ids:
+            return
+        await self.executor.run(
+            "milvus", self.client.delete, collection_name=self.collection, ids=entry_ids
+        )
+        for entry_id in entry_ids:
+            self.entries.pop(entry_id, None)
+            audio_path = self._audio_path(entry_id)
+            if os.path.exists(audio_path):
+                os.remove(audio_path)
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
@@ -0,0 +1,75 @@
+from typing import Iterable, Iterator
+
+# 16 kHz, 16-bit mono PCM as captured by MicrophoneStream
+SAMPLE_RATE = 16_000
+BYTES_PER_MS = SAMPLE_RATE * 2 // 1000
+
+
+class AudioRingBuffer:
+    """Fixed-size PCM ring buffer that hands out frames as memoryviews.
+
+    The backing ``bytearray`` is allocated once. Incoming chunks of any size
+    are copied in, and complete frames of ``frame_bytes`` are yielded as
+    views into the buffer, without allocating. Because the capacity is a
+    multiple of the frame size and frames are always read at aligned
+    offsets, a frame never straddles the wrap-around point. Views are only
+    valid until the next :meth:`write`; copy them (``bytes(frame)``) before
+    handing them to code that keeps them.
+
+    If the reader falls behind by more than the capacity, the oldest unread
+    frames are dropped and counted in ``overruns``.
+    """
+
+    def __init__(self, capacity: int, frame_bytes: int):
+        self.frame_bytes = frame_bytes
+        self.capacity = -(-capacity // frame_bytes) * frame_bytes
+        self._buffer = bytearray(self.capacity)
+        self._view = memoryview(self._buffer)
+        self._written = 0  # total bytes ever written
+        self._read = 0  # total bytes ever read, always frame-aligned
+        self.overruns = 0
+
+    def write(self, data: bytes):
+        data = memoryview(data).cast("B")
+        if len(data) > self.capacity:
+            # Only the most recent audio can be kept
+            self._written += len(data) - self.capacity
+            data = data[-self.capacity :]
+
+        start = self._written % self.capacity
+        first = min(len(data), self.capacity - start)
+        self._view[start : start + first] = data[:first]
+        if first < len(data):
+            self._view[: len(data) - first] = data[first:]
+        self._written += len(data)
+
+        while self._written - self._read > self.capacity:
+            self._read += self.frame_bytes
+            self.overruns += 1
+
+    def available(self) -> int:
+        return self._written - self._read
+
+    def frames(self) -> Iterator[memoryview]:
+        while self.available() >= self.frame_bytes:
+            start = self._read % self.capacity
+            self._read += self.frame_bytes
+            yield self._view[start : start + self.frame_bytes]
+
+    def recent(self, nbytes: int) -> list[memoryview]:
+        """The last ``nbytes`` already read, oldest first, as one or two views."""
+        nbytes = min(nbytes, self._read, self.capacity - self.available())
+        if nbytes <= 0:
+            return []
+        end = self._read % self.capacity or self.capacity
+        start = end - nbytes
+        if start >= 0:
+            return [self._view[start:end]]
+        return [self._view[self.capacity + start :], self._view[:end]]
+
+
+def iter_chunked(data: bytes, chunk_size: int = 16_384) -> Iterable[memoryview]:
+    """Slices ``data`` into views for streaming playback without copying."""
+    view = memoryview(data)
+    for start in range(0, len(view), chunk_size):
+        yield view[start : start + chunk_size]
@@ -0,0 +1,131 @@
+"""Micro-benchmark for audio buffering on long responses and the mic path.
+
+Run from the repository root:
+
+    python -m benchmarks.audio_buffers --seconds 120
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from audio_buffer import BYTES_PER_MS, AudioRingBuffer
+
+# ElevenLabs MP3 at 128 kbps
+MP3_BYTES_PER_SECOND = 16_000
+
+
+def tts_chunks(seconds: int, seed: int = 0) -> list[bytes]:
+    rng = random.Random(seed)
+    chunks, remaining = [], seconds * MP3_BYTES_PER_SECOND
+    while remaining > 0:
+        size = min(remaining, rng.randint(512, 4096))
+        chunks.append(rng.randbytes(size))
+        remaining -= size
+    return chunks
+
+
+def mic_chunks(seconds: int, seed: int = 0) -> list[bytes]:
+    # PyAudio reads rarely line up with the frame size the transcriber wants
+    rng = random.Random(seed)
+    chunks, remaining = [], seconds * 1000 * BYTES_PER_MS
+    while remaining > 0:
+        size = min(remaining, rng.randint(1000, 5000))
+        chunks.append(rng.randbytes(size))
+        remaining -= size
+    return chunks
+
+
+def tts_concatenate(chunks: list[bytes]) -> dict:
+    """Before: ``audio_data += chunk`` and one play() of the whole buffer."""
+    allocations = copied = 0
+    audio_data = b""
+    for chunk in chunks:
+        audio_data += chunk
+        allocations += 1
+        copied += len(audio_data)
+    sink = 0
+    sink += len(audio_data)
+    return {"allocations": allocations, "bytes_copied": copied}
+
+
+def tts_streaming(chunks: list[bytes]) -> dict:
+    """After: chunks are kept in a list and written to the player one by one."""
+    kept = []
+    sink = 0
+    for chunk in chunks:
+        kept.append(chunk)
+        sink += len(memoryview(chunk))
+    return {"allocations": 0, "bytes_copied": 0}
+
+
+def mic_reslicing(chunks: list[bytes], frame_bytes: int) -> dict:
+    """Before (naive framing): grow a bytes buffer and slice frames off it."""
+    allocations = copied = frames = 0
+    pending = b""
+    for chunk in chunks:
+        pending += chunk
+        allocations += 1
+        copied += len(pending)
+        while len(pending) >= frame_bytes:
+            frame, pending = pending[:frame_bytes], pending[frame_bytes:]
+            allocations += 2
+            copied += len(frame) + len(pending)
+            frames += 1
+    return {"allocations": allocations, "bytes_copied": copied, "frames": frames}
+
+
+def mic_ring_buffer(chunks: list[bytes], frame_bytes: int) -> dict:
+    """After: one preallocated ring buffer, frames handed out as views.
+
+    The single ``bytes(frame)`` per frame is the copy handed to the
+    transcriber, which queues its input.
+    """
+    ring = AudioRingBuffer(capacity=2000 * BYTES_PER_MS, frame_bytes=frame_bytes)
+    allocations = copied = frames = 0
+    for chunk in chunks:
+        ring.write(chunk)
+        copied += len(chunk)
+        for frame in ring.frames():
+            bytes(frame)
+            allocations += 1
+            copied += len(frame)
+            frames += 1
+    return {"allocations": allocations, "bytes_copied": copied, "frames": frames}
+
+
+def measure(name: str, fn, *args):
+    tracemalloc.start()
+    started = time.perf_counter()
+    counters = fn(*args)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"  {name:<22} {elapsed_ms:>9.2f} ms  peak {peak / 1024:>9.1f} KiB  "
+        f"allocations {counters['allocations']:>7}  "
+        f"copied {counters['bytes_copied'] / 1024 / 1024:>9.2f} MiB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=int, default=90)
+    parser.add_argument("--frame-ms", type=int, default=100)
+    args = parser.parse_args()
+
+    chunks = tts_chunks(args.seconds)
+    print(f"TTS response: {args.seconds}s, {len(chunks)} chunks")
+    measure("before: bytes +=", tts_concatenate, chunks)
+    measure("after: chunk stream", tts_streaming, chunks)
+
+    chunks = mic_chunks(args.seconds)
+    frame_bytes = args.frame_ms * BYTES_PER_MS
+    print(f"Microphone: {args.seconds}s, {len(chunks)} chunks, {args.frame_ms} ms frames")
+    measure("before: re-slicing", mic_reslicing, chunks, frame_bytes)
+    measure("after: ring buffer", mic_ring_buffer, chunks, frame_bytes)
+
+
+if __name__ == "__main__":
+    main()
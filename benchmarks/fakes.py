@@ -0,0 +1,395 @@
+"""Local stand-ins for the external services used by the voice pipeline.
+
+Each fake mirrors the interface the pipeline calls and sleeps for a seeded,
+configurable latency, so load tests and benchmarks run offline and
+reproducibly.
+"""
+
+import asyncio
+import itertools
+import math
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Callable, Optional
+
+import numpy as np
+
+from audio_buffer import BYTES_PER_MS, SAMPLE_RATE
+from chunking import estimate_tokens
+from config import Config
+from llm_processor import SYSTEM_PROMPT
+from stt import Transcript
+from telemetry import annotate, record
+
+
+class Latency:
+    """Latency in milliseconds drawn from a seeded distribution.
+
+    ``uniform``: ``mean_ms`` plus up to ``jitter_ms`` either way.
+    ``normal``: ``jitter_ms`` is the standard deviation.
+    ``lognormal``: ``mean_ms`` is the median and ``jitter_ms`` a typical
+    deviation from it; the long right tail is what network services show.
+    """
+
+    DISTRIBUTIONS = ("uniform", "normal", "lognormal")
+
+    def __init__(
+        self,
+        mean_ms: float,
+        jitter_ms: float = 0.0,
+        seed: Optional[int] = 0,
+        distribution: str = "uniform",
+    ):
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {distribution}")
+        self.mean_ms = mean_ms
+        self.jitter_ms = jitter_ms
+        self.distribution = distribution
+        self.rng = random.Random(seed)
+
+    def sample(self) -> float:
+        """One draw, in seconds."""
+        if not self.jitter_ms:
+            ms = self.mean_ms
+        elif self.distribution == "normal":
+            ms = self.rng.gauss(self.mean_ms, self.jitter_ms)
+        elif self.distribution == "lognormal":
+            sigma = math.log1p(self.jitter_ms / max(self.mean_ms, 1e-6))
+            ms = self.mean_ms * self.rng.lognormvariate(0.0, sigma)
+        else:
+            ms = self.mean_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms)
+        return max(0.0, ms) / 1000
+
+    async def sleep(self):
+        await asyncio.sleep(self.sample())
+
+
+KNOWLEDGE_BASE = {
+    "milvus": "Milvus is an open-source vector database built for similarity search.",
+    "hnsw": "HNSW is a graph-based index that trades memory for low search latency.",
+    "vector": "Vector databases store embeddings and search them by similarity.",
+}
+
+
+def fake_config(**overrides) -> Config:
+    """A config for running against the fakes: no answer or TTS caching."""
+    config = Config()
+    config.ANSWER_CACHE_ENABLED = False
+    config.TTS_CACHE_MAX_BYTES = 0
+    config.TTS_PREWARM = False
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    return config
+
+
+class FakeTranscriber:
+    """Streaming STT stand-in that "recognizes" scripted transcripts.
+
+    A partial is reported for every second of audio, and the next scripted
+    transcript is reported as final ``latency`` after
+    :meth:`force_end_utterance`. Callbacks run on timer threads, like the
+    real backends' receive threads.
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        on_data: Callable[[Transcript], None],
+        on_error: Callable[[str], None] = None,
+        on_open: Callable[[str], None] = None,
+        on_close: Callable[[], None] = None,
+        transcripts: Optional[list[str]] = None,
+        latency: Optional[Latency] = None,
+    ):
+        self.on_data = on_data
+        self.on_open = on_open
+        self.on_close = on_close
+        self.transcripts = itertools.cycle(transcripts or ["What is Milvus?"])
+        self.latency = latency or Latency(150, 50)
+        self.received = 0
+        self.utterance_bytes = 0
+        self.timers: list[threading.Timer] = []
+
+    def connect(self):
+        if self.on_open:
+            self.on_open("fake-stt")
+
+    def stream(self, data: bytes):
+        self.received += len(data)
+        before = self.utterance_bytes // (1000 * BYTES_PER_MS)
+        self.utterance_bytes += len(data)
+        if self.utterance_bytes // (1000 * BYTES_PER_MS) > before:
+            self.on_data(Transcript("...", is_final=False))
+
+    def force_end_utterance(self):
+        if not self.utterance_bytes:
+            return
+        self.utterance_bytes = 0
+        text = next(self.transcripts)
+        timer = threading.Timer(
+            self.latency.sample(), self.on_data, args=(Transcript(text, is_final=True),)
+        )
+        timer.daemon = True
+        self.timers.append(timer)
+        timer.start()
+
+    def close(self):
+        for timer in self.timers:
+            timer.cancel()
+        if self.on_close:
+            self.on_close()
+
+
+class FakeLLM:
+    """Ollama stand-in that streams a canned answer word by word.
+
+    Prefill takes ``prefill_ms_per_token`` for every prompt token on top of
+    ``first_token``, so longer prompts answer later, as with a local model.
+    """
+
+    answer = (
+        "Milvus is an open-source vector database. "
+        "It was built for GenAI applications and similarity search. "
+        "It supports HNSW, IVF and DiskANN indexes."
+    )
+
+    def __init__(
+        self,
+        first_token: Optional[Latency] = None,
+        per_token: Optional[Latency] = None,
+        prefill_ms_per_token: float = 0.5,
+    ):
+        self.first_token = first_token or Latency(250, 50)
+        self.per_token = per_token or Latency(30, 5)
+        self.prefill_ms_per_token = prefill_ms_per_token
+
+    async def stream_query(self, query: str) -> AsyncIterator[str]:
+        prompt_tokens = estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(query)
+        prefill_ms = prompt_tokens * self.prefill_ms_per_token
+        await asyncio.sleep(prefill_ms / 1000)
+        await self.first_token.sleep()
+        words = self.answer.split(" ")
+        for word in words:
+            yield word + " "
+            await self.per_token.sleep()
+        annotate("prompt_tokens", prompt_tokens)
+        annotate("completion_tokens", len(words))
+        record("llm_prefill", prefill_ms)
+
+    async def process_query(self, query: str) -> str:
+        return "".join([token async for token in self.stream_query(query)]).strip()
+
+
+class FakeElevenLabs:
+    """ElevenLabs stand-in streaming silent MP3-sized chunks.
+
+    Audio comes out at roughly 128 kbps worth of bytes per character spoken.
+    """
+
+    def __init__(
+        self,
+        first_byte: Optional[Latency] = None,
+        per_chunk: Optional[Latency] = None,
+        chunk_size: int = 4096,
+    ):
+        self.first_byte = first_byte or Latency(150, 40)
+        self.per_chunk = per_chunk or Latency(5, 2)
+        self.chunk_size = chunk_size
+
+    async def generate(self, text: str, model: str, voice: str, stream: bool = True):
+        # ~15 characters per second of speech, 16 kB per second of MP3
+        size = max(self.chunk_size, len(text) * 16_000 // 15)
+
+        async def chunks():
+            await self.first_byte.sleep()
+            for start in range(0, size, self.chunk_size):
+                yield bytes(min(self.chunk_size, size - start))
+                await self.per_chunk.sleep()
+
+        return chunks()
+
+
+class FakeMilvus:
+    """Knowledge-base stand-in: keyword hits over a tiny fixed corpus."""
+
+    def __init__(self, latency: Optional[Latency] = None):
+        self.latency = latency or Latency(40, 10)
+
+    def _hits(self, text: str) -> list[dict]:
+        words = text.lower()
+        return [
+            {"text": passage, "distance": 0.8}
+            for keyword, passage in KNOWLEDGE_BASE.items()
+            if keyword in words
+        ]
+
+    def search_similar_text(self, text: str, limit: int = 3, search_params=None) -> list[dict]:
+        return self._hits(text)[:limit]
+
+    async def asearch_similar_text(self, text: str, limit: int = 3, search_params=None):
+        await self.latency.sleep()
+        return self._hits(text)[:limit]
+
+
+class FakeWebSearcher:
+    def __init__(self, latency: Optional[Latency] = None):
+        self.latency = latency or Latency(600, 200)
+
+    async def asearch(self, query: str) -> list[str]:
+        await self.latency.sleep()
+        return [f"Web result {i} about {query}" for i in range(1, 4)]
+
+    def keep_results(self, query: str):
+        pass
+
+
+class FakeCalendar:
+    def __init__(self, latency: Optional[Latency] = None):
+        self.latency = latency or Latency(300, 100)
+
+    async def get_upcoming_events(self) -> str:
+        await self.latency.sleep()
+        return "Upcoming events:\n- 2024-01-15T10:00:00: Team standup"
+
+    async def get_events_for_query(self, text: str) -> str:
+        return await self.get_upcoming_events()
+
+
+class FakeHttpError(Exception):
+    """Shaped like ``googleapiclient.errors.HttpError``: the status is on ``resp``."""
+
+    def __init__(self, status: int, reason: str):
+        super().__init__(f"<HttpError {status}: {reason}>")
+        self.resp = type("Response", (), {"status": status})()
+
+
+class FakeCalendarAPI:
+    """In-memory stand-in for the Google Calendar v3 client, for ``CalendarService``.
+
+    Supports what the mirror uses of ``events().list(...).execute()``:
+    paging, ``timeMin`` on full loads, and ``syncToken`` returning only the
+    events changed since (with deleted ones as ``status: cancelled``).
+    :meth:`expire_tokens` makes old tokens fail with 410 like the real API.
+    Requests block for ``latency``, as they run on executor threads.
+    """
+
+    def __init__(self, latency: Optional[Latency] = None, events: int = 20):
+        self.latency = latency or Latency(300, 100)
+        self.lock = threading.Lock()
+        self.version = 0
+        self.oldest_token = 0
+        # id -> (version of its last change, item)
+        self.items: dict[str, tuple[int, dict]] = {}
+        self.requests = 0
+        start = datetime.now().astimezone().replace(minute=0, second=0, microsecond=0)
+        for i in range(events):
+            self.add_event(f"Meeting {i + 1}", start + timedelta(hours=5 * i + 1))
+
+    def add_event(self, summary: str, start: datetime, event_id: Optional[str] = None) -> str:
+        with self.lock:
+            self.version += 1
+            event_id = event_id or f"event{self.version}"
+            self.items[event_id] = (
+                self.version,
+                {
+                    "id": event_id,
+                    "status": "confirmed",
+                    "summary": summary,
+                    "start": {"dateTime": start.isoformat()},
+                    "end": {"dateTime": (start + timedelta(hours=1)).isoformat()},
+                },
+            )
+            return event_id
+
+    def delete_event(self, event_id: str):
+        with self.lock:
+            self.version += 1
+            _, item = self.items[event_id]
+            self.items[event_id] = (self.version, {**item, "status": "cancelled"})
+
+    def expire_tokens(self):
+        with self.lock:
+            self.oldest_token = self.version
+
+    def events(self):
+        return self
+
+    def list(self, calendarId: str = "primary", **params):
+        return _FakeListRequest(self, params)
+
+    def _execute(self, params: dict) -> dict:
+        time.sleep(self.latency.sample())
+        with self.lock:
+            self.requests += 1
+            if "syncToken" in params:
+                since = int(params["syncToken"])
+                if since < self.oldest_token:
+                    raise FakeHttpError(410, "Sync token is no longer valid")
+                items = [item for version, item in self.items.values() if version > since]
+            else:
+                time_min = params.get("timeMin")
+                items = [
+                    item
+                    for _, item in self.items.values()
+                    if item["status"] != "cancelled"
+                    and (
+                        time_min is None
+                        or datetime.fromisoformat(item["start"]["dateTime"])
+                        >= datetime.fromisoformat(time_min)
+                    )
+                ]
+            offset = int(params.get("pageToken") or 0)
+            limit = params.get("maxResults", 250)
+            page = {"items": items[offset : offset + limit]}
+            if offset + limit < len(items):
+                page["nextPageToken"] = str(offset + limit)
+            else:
+                page["nextSyncToken"] = str(self.version)
+            return page
+
+
+class _FakeListRequest:
+    def __init__(self, api: FakeCalendarAPI, params: dict):
+        self.api = api
+        self.params = params
+
+    def execute(self) -> dict:
+        return self.api._execute(self.params)
+
+
+class NullPlayer:
+    """Audio player stand-in that discards what it is given.
+
+    Playback then takes as long as the reply takes to arrive, not as long
+    as it would take to hear it.
+    """
+
+    def __init__(self):
+        self.bytes_played = 0
+
+    def write(self, chunk: bytes):
+        self.bytes_played += len(chunk)
+
+    def close(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+def speech_like_pcm(
+    speech_ms: int = 1500, silence_ms: int = 1000, seed: int = 0
+) -> bytes:
+    """A voiced tone with syllable-rate modulation, followed by background noise.
+
+    Loud enough to open the energy VAD, so it can stand in for a recorded
+    utterance.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(SAMPLE_RATE * speech_ms // 1000) / SAMPLE_RATE
+    voiced = 4000 * np.sin(2 * np.pi * 180 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t))
+    signal = np.concatenate([voiced, np.zeros(SAMPLE_RATE * silence_ms // 1000)])
+    signal += rng.normal(0, 30, len(signal))
+    return signal.astype(np.int16).tobytes()
@@ -0,0 +1,184 @@
+"""Load generator for the WebSocket voice server.
+
+Every simulated client replays an utterance (a WAV fixture, or synthetic
+speech-like audio) in real time, waits for the spoken reply and repeats.
+By default an in-process server is started on the local fakes from
+``benchmarks.fakes``; ``--url`` targets a running server instead.
+
+    python -m benchmarks.load_generator --sessions 1,8,32 --turns 5
+
+Turn latency is measured from the end of the user's speech to the first
+reply audio byte and to the end of the reply. "Sessions per core" divides
+the number of sessions by the CPU cores the process kept busy; with the
+in-process server this includes the clients' own (small) cost.
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+from websockets.asyncio.client import connect
+
+from audio_buffer import BYTES_PER_MS
+from benchmarks.fakes import (
+    FakeCalendar,
+    FakeElevenLabs,
+    FakeLLM,
+    FakeMilvus,
+    FakeTranscriber,
+    FakeWebSearcher,
+    fake_config,
+    speech_like_pcm,
+)
+from server import SharedServices, VoiceServer
+from stt import read_wav
+from telemetry import get_telemetry
+from tts_cache import TTSCache
+
+QUERIES = [
+    "What is Milvus?",
+    "How does HNSW work?",
+    "Who won the game last night?",
+    "What is on my calendar today?",
+]
+
+
+@dataclass
+class ClientResult:
+    first_audio: list[float] = field(default_factory=list)
+    complete: list[float] = field(default_factory=list)
+    errors: int = 0
+
+
+def fake_services(config, seed: int = 0) -> SharedServices:
+    return SharedServices(
+        llm_processor=FakeLLM(),
+        milvus_wrapper=FakeMilvus(),
+        web_searcher=FakeWebSearcher(),
+        calendar_service=FakeCalendar(),
+        answer_cache=None,
+        elevenlabs=FakeElevenLabs(),
+        tts_cache=TTSCache(config),
+        transcriber_factory=functools.partial(FakeTranscriber, transcripts=QUERIES),
+    )
+
+
+async def run_client(
+    url: str, utterance: bytes, speech_bytes: int, turns: int, frame_ms: int, timeout: float
+) -> ClientResult:
+    result = ClientResult()
+    frame_bytes = frame_ms * BYTES_PER_MS
+    async with connect(url, max_size=None) as websocket:
+        await websocket.recv()  # ready
+        for _ in range(turns):
+            speech_end = None
+            started = time.perf_counter()
+            for i, start in enumerate(range(0, len(utterance), frame_bytes)):
+                await websocket.send(utterance[start : start + frame_bytes])
+                if speech_end is None and start + frame_bytes >= speech_bytes:
+                    speech_end = time.perf_counter()
+                # Pace frames like a live microphone
+                await asyncio.sleep(max(0.0, started + (i + 1) * frame_ms / 1000 - time.perf_counter()))
+
+            first_audio = None
+            try:
+                async with asyncio.timeout(timeout):
+                    while True:
+                        message = await websocket.recv()
+                        if isinstance(message, bytes):
+                            if first_audio is None:
+                                first_audio = time.perf_counter()
+                            continue
+                        if json.loads(message)["type"] in ("reply", "interrupted"):
+                            break
+            except TimeoutError:
+                result.errors += 1
+                continue
+            if first_audio is not None:
+                result.first_audio.append(first_audio - speech_end)
+            result.complete.append(time.perf_counter() - speech_end)
+    return result
+
+
+def percentiles(samples: list[float]) -> str:
+    if not samples:
+        return "n/a"
+    p50, p95 = np.percentile(np.asarray(samples) * 1000, [50, 95])
+    return f"p50 {p50:7.1f} ms  p95 {p95:7.1f} ms"
+
+
+async def run_level(args, url: str, utterance: bytes, speech_bytes: int, sessions: int):
+    wall_started, cpu_started = time.perf_counter(), time.process_time()
+    results = await asyncio.gather(
+        *[
+            run_client(url, utterance, speech_bytes, args.turns, args.frame_ms, args.timeout)
+            for _ in range(sessions)
+        ]
+    )
+    wall = time.perf_counter() - wall_started
+    cores_busy = (time.process_time() - cpu_started) / wall
+
+    first_audio = [latency for r in results for latency in r.first_audio]
+    complete = [latency for r in results for latency in r.complete]
+    errors = sum(r.errors for r in results)
+    print(f"\n👥 {sessions} session(s), {len(complete)} turns, {errors} timed out")
+    print(f"    first audio  {percentiles(first_audio)}")
+    print(f"    full reply   {percentiles(complete)}")
+    print(
+        f"    CPU          {cores_busy:.2f} cores busy, "
+        f"{sessions / max(cores_busy, 1e-6):.1f} sessions per core "
+        f"({os.cpu_count()} cores available)"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Replay audio against the voice server")
+    parser.add_argument("--url", default=None, help="target server (default: in-process fakes)")
+    parser.add_argument("--sessions", default="1,8,32", help="comma-separated session counts")
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--wav", default=None, help="16 kHz mono utterance to replay")
+    parser.add_argument("--frame-ms", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    if args.wav:
+        speech = read_wav(args.wav)
+        # Trailing silence lets the server's VAD close the utterance
+        utterance = speech + bytes(1000 * BYTES_PER_MS)
+    else:
+        utterance = speech_like_pcm()
+        speech = speech_like_pcm(silence_ms=0)
+    speech_bytes = len(speech)
+
+    server_task: Optional[asyncio.Task] = None
+    url = args.url
+    if url is None:
+        config = fake_config(TURN_MAX_CONCURRENT=1024, TURN_QUEUE_SIZE=4)
+        server = VoiceServer(config, fake_services(config))
+        ready = asyncio.Event()
+        server_task = asyncio.create_task(server.serve("127.0.0.1", 8766, ready))
+        await ready.wait()
+        url = "ws://127.0.0.1:8766"
+
+    try:
+        for sessions in [int(n) for n in args.sessions.split(",")]:
+            await run_level(args, url, utterance, speech_bytes, sessions)
+        if server_task is not None:
+            print("\n⏱️  Server stage latency (ms)")
+            for stage, stats in get_telemetry(config).summary().items():
+                print(f"    {stage:<16} {stats}")
+    finally:
+        if server_task is not None:
+            server_task.cancel()
+            # Lets the server close its listener before the loop shuts down
+            await asyncio.gather(server_task, return_exceptions=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
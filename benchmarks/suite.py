@@ -0,0 +1,328 @@
+"""End-to-end benchmark scenarios on local fakes.
+
+Every scenario drives the real pipeline (scheduler, parallel retrieval,
+sentence streaming, TTS cache) through :class:`main.VoiceAssistant`, with
+the fakes from ``benchmarks.fakes`` injected in place of Milvus/Jina,
+Ollama, ElevenLabs, DuckDuckGo, Google Calendar and the audio player.
+
+    python -m benchmarks.suite                       # all scenarios
+    python -m benchmarks.suite kb_hit burst --turns 50
+    python -m benchmarks.suite --compare .cache/benchmarks/baseline.json
+
+Per-stage p50/p95/p99 come from the turn traces (see ``telemetry``).
+Results are written as JSON; ``--compare`` reports the stages whose p95
+got slower than a previous run by more than ``--tolerance`` and exits
+non-zero if any did.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from benchmarks.fakes import (
+    FakeCalendarAPI,
+    FakeElevenLabs,
+    FakeLLM,
+    FakeMilvus,
+    FakeWebSearcher,
+    Latency,
+    NullPlayer,
+    fake_config,
+)
+from calendar_service import CalendarService
+from config import Config
+from main import VoiceAssistant
+from scheduler import Turn, TurnScheduler
+from telemetry import Telemetry
+from tts_cache import TTSCache
+from voice_processor import VoiceProcessor
+
+# (mean or median ms, jitter ms) of each fake service
+LATENCY_PROFILE = {
+    "milvus": (40, 10),
+    "llm_first_token": (250, 50),
+    "llm_per_token": (30, 5),
+    "tts_first_byte": (150, 40),
+    "tts_per_chunk": (5, 2),
+    "web": (600, 200),
+    "calendar": (300, 100),
+}
+
+
+@dataclass
+class Scenario:
+    name: str
+    description: str
+    queries: list[str]
+    sessions: int = 1
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in [
+        Scenario("kb_hit", "answered from the knowledge base", ["What is Milvus?"]),
+        Scenario(
+            "calendar", "answered from the calendar", ["What is on my calendar today?"]
+        ),
+        Scenario(
+            "web_fallback",
+            "knowledge-base miss, answered from the web",
+            ["Who won the game last night?"],
+        ),
+        Scenario(
+            "burst",
+            "concurrent sessions asking a mix of questions at once",
+            [
+                "What is Milvus?",
+                "What is on my calendar today?",
+                "Who won the game last night?",
+                "How does HNSW work?",
+            ],
+            sessions=16,
+        ),
+    ]
+}
+
+
+@dataclass
+class ScenarioResult:
+    turns: int = 0
+    failed: int = 0
+    wall_s: float = 0.0
+    stages: list[dict[str, float]] = field(default_factory=list)
+    attributes: list[dict[str, float]] = field(default_factory=list)
+
+    @staticmethod
+    def _percentiles(turns: list[dict[str, float]]) -> dict[str, dict]:
+        percentiles = {}
+        for name in sorted({name for values in turns for name in values}):
+            samples = [values[name] for values in turns if name in values]
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+            percentiles[name] = {
+                "count": len(samples),
+                "p50": round(float(p50), 1),
+                "p95": round(float(p95), 1),
+                "p99": round(float(p99), 1),
+            }
+        return percentiles
+
+    def report(self) -> dict:
+        return {
+            "turns": self.turns,
+            "failed": self.failed,
+            "wall_s": round(self.wall_s, 3),
+            "turns_per_s": round(self.turns / self.wall_s, 2) if self.wall_s else 0.0,
+            "stages_ms": self._percentiles(self.stages),
+            "attributes": self._percentiles(self.attributes),
+        }
+
+
+def fake_services(config: Config, distribution: str, seed: int) -> dict:
+    """Constructor arguments for :class:`VoiceAssistant`, one fake per service.
+
+    The calendar is the real mirror over a fake Calendar API, so calendar
+    turns measure lookups in the mirror rather than API round trips.
+    """
+
+    def latency(name: str, offset: int) -> Latency:
+        mean_ms, jitter_ms = LATENCY_PROFILE[name]
+        return Latency(mean_ms, jitter_ms, seed=seed + offset, distribution=distribution)
+
+    return {
+        "llm_processor": FakeLLM(latency("llm_first_token", 1), latency("llm_per_token", 2)),
+        "milvus_wrapper": FakeMilvus(latency("milvus", 3)),
+        "web_searcher": FakeWebSearcher(latency("web", 4)),
+        "calendar_service": CalendarService(
+            config, service=FakeCalendarAPI(latency("calendar", 5))
+        ),
+    }
+
+
+class ScenarioRunner:
+    """Runs scripted turns through one scheduler shared by per-session assistants."""
+
+    def __init__(self, config: Config, distribution: str, seed: int):
+        self.config = config
+        self.services = fake_services(config, distribution, seed)
+        self.elevenlabs = FakeElevenLabs(
+            Latency(*LATENCY_PROFILE["tts_first_byte"], seed=seed + 6, distribution=distribution),
+            Latency(*LATENCY_PROFILE["tts_per_chunk"], seed=seed + 7, distribution=distribution),
+        )
+        self.tts_cache = TTSCache(config)
+        # Separate from the process-wide registry so scenarios don't mix
+        self.telemetry = Telemetry(config)
+        self.scheduler = TurnScheduler(config, self.run_turn, loop=asyncio.get_running_loop())
+        self.assistants: dict[str, VoiceAssistant] = {}
+        # Sessions ask one question at a time: session id -> its open turn
+        self.pending: dict[str, asyncio.Future] = {}
+        self.result = ScenarioResult()
+
+    def assistant(self, session_id: str) -> VoiceAssistant:
+        assistant = self.assistants.get(session_id)
+        if assistant is None:
+            voice = VoiceProcessor(
+                self.config, elevenlabs=self.elevenlabs, tts_cache=self.tts_cache
+            )
+            voice.player_factory = NullPlayer
+            assistant = VoiceAssistant(
+                self.config,
+                voice_processor=voice,
+                answer_cache=None,
+                scheduler=self.scheduler,
+                session_id=session_id,
+                **self.services,
+            )
+            assistant.telemetry = self.telemetry
+            self.assistants[session_id] = assistant
+        return assistant
+
+    async def run_turn(self, turn: Turn):
+        assistant = self.assistants[turn.session_id]
+        done = self.pending.pop(turn.session_id)
+        try:
+            with assistant.trace_turn(turn) as trace:
+                await assistant.process_transcription(turn.text)
+            self.result.stages.append(trace.stages)
+            self.result.attributes.append(trace.attributes)
+        except Exception:
+            self.result.failed += 1
+            raise
+        finally:
+            done.set_result(None)
+
+    async def ask(self, session_id: str, text: str):
+        self.assistant(session_id)
+        done = self.pending[session_id] = asyncio.get_running_loop().create_future()
+        await self.scheduler.submit(session_id, text)
+        await done
+
+    async def run(self, scenario: Scenario, turns: int) -> ScenarioResult:
+        async def session(index: int):
+            for i in range(turns):
+                query = scenario.queries[(index + i) % len(scenario.queries)]
+                await self.ask(f"{scenario.name}-{index}", query)
+
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*[session(i) for i in range(scenario.sessions)])
+        finally:
+            await self.scheduler.close()
+            await self.services["calendar_service"].stop()
+        self.result.wall_s = time.perf_counter() - started
+        self.result.turns = len(self.result.stages)
+        return self.result
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list[str]:
+    """Stages whose p95 grew by more than ``tolerance`` (a fraction) over ``baseline``."""
+    regressions = []
+    for name, scenario in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        for stage, stats in scenario["stages_ms"].items():
+            previous = before["stages_ms"].get(stage)
+            if previous is None or not previous["p95"]:
+                continue
+            change = stats["p95"] / previous["p95"] - 1
+            if change > tolerance:
+                regressions.append(
+                    f"{name}/{stage}: p95 {previous['p95']} -> {stats['p95']} ms (+{change:.0%})"
+                )
+    return regressions
+
+
+def print_report(name: str, description: str, report: dict):
+    print(f"\n📊 {name}: {description}")
+    print(
+        f"    {report['turns']} turns, {report['failed']} failed, "
+        f"{report['turns_per_s']} turns/s"
+    )
+    for stage, stats in report["stages_ms"].items():
+        print(
+            f"    {stage:<18} p50 {stats['p50']:8.1f}  p95 {stats['p95']:8.1f}  "
+            f"p99 {stats['p99']:8.1f} ms"
+        )
+    for name, stats in report["attributes"].items():
+        print(
+            f"    {name:<18} p50 {stats['p50']:8.1f}  p95 {stats['p95']:8.1f}  "
+            f"p99 {stats['p99']:8.1f}"
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Run the voice pipeline benchmark scenarios")
+    parser.add_argument("scenarios", nargs="*", help=f"any of {', '.join(SCENARIOS)}")
+    parser.add_argument("--turns", type=int, default=20, help="turns per session")
+    parser.add_argument("--distribution", default="lognormal", choices=Latency.DISTRIBUTIONS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="results file (default: .cache/benchmarks/)")
+    parser.add_argument("--compare", default=None, help="earlier results file to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed p95 slowdown")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    config = fake_config(TURN_SUPERSEDE=False, TURN_MAX_CONCURRENT=64)
+    results = {
+        "environment": environment(),
+        "settings": {
+            "turns": args.turns,
+            "distribution": args.distribution,
+            "seed": args.seed,
+            "latency_profile": LATENCY_PROFILE,
+        },
+        "scenarios": {},
+    }
+    for name in args.scenarios or SCENARIOS:
+        scenario = SCENARIOS[name]
+        runner = ScenarioRunner(config, args.distribution, args.seed)
+        report = (await runner.run(scenario, args.turns)).report()
+        results["scenarios"][name] = report
+        print_report(name, scenario.description, report)
+
+    output = args.output or os.path.join(
+        ".cache", "benchmarks", time.strftime("%Y%m%d-%H%M%S") + ".json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as results_file:
+        json.dump(results, results_file, indent=2)
+    print(f"\n💾 Results saved to {output}")
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(json.load(baseline_file), results, args.tolerance)
+        if regressions:
+            print(f"\n⚠️  {len(regressions)} regression(s) against {args.compare}:")
+            for regression in regressions:
+                print(f"    {regression}")
+            sys.exit(1)
+        print(f"\n✅ No p95 regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,22 +1,112 @@
+import asyncio
+import logging
 import os.path
 import pickle
-from datetime import datetime, timedelta
+import re
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from typing import Awaitable, Callable, Optional
 
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from executors import get_executor
+
+logger = logging.getLogger(__name__)
+
+CALENDAR_ERROR_PREFIX = "Error accessing calendar"
+
+NEXT_EVENT_QUERY = re.compile(r"\bnext (meeting|event|appointment)\b")
+
+
+@dataclass
+class CalendarEvent:
+    id: str
+    summary: str
+    start: datetime  # timezone-aware
+    all_day: bool
+
+    @classmethod
+    def from_api(cls, item: dict) -> "CalendarEvent":
+        start = item["start"]
+        if "dateTime" in start:
+            when = datetime.fromisoformat(start["dateTime"].replace("Z", "+00:00"))
+            all_day = False
+        else:
+            # All-day events start at local midnight
+            when = datetime.fromisoformat(start["date"]).astimezone()
+            all_day = True
+        return cls(item["id"], item.get("summary", "(no title)"), when, all_day)
+
+    def describe(self) -> str:
+        local = self.start.astimezone()
+        if self.all_day:
+            return f"- {self.summary} on {local.strftime('%B %d')} (all day)"
+        return f"- {self.summary} on {local.strftime('%B %d at %I:%M %p')}"
+
+
+def _start_of_day(day: datetime) -> datetime:
+    return datetime.combine(day.date(), time.min, tzinfo=day.tzinfo)
+
+
+def query_range(text: str, now: datetime, days: int = 7) -> tuple[datetime, datetime]:
+    """The time range a calendar question is about: today, tomorrow, this week or the next ``days``."""
+    text = text.lower()
+    today = _start_of_day(now)
+    if "tomorrow" in text:
+        return today + timedelta(days=1), today + timedelta(days=2)
+    if "today" in text or "tonight" in text:
+        return today, today + timedelta(days=1)
+    if "this week" in text:
+        return today, today + timedelta(days=7 - today.weekday())
+    if "next week" in text:
+        start = today + timedelta(days=7 - today.weekday())
+        return start, start + timedelta(days=7)
+    return today, today + timedelta(days=days)
 
 
 class CalendarService:
-    def __init__(self, config):
+    """A local mirror of the user's Google Calendar.
+
+    The first lookup loads the events once; a background task then polls
+    ``events.list`` with the ``syncToken`` of the previous call every
+    ``CALENDAR_SYNC_INTERVAL`` seconds, which returns only what changed.
+    Events are kept sorted by start time, so a question is answered by a
+    range lookup without calling the API. Listeners added with
+    :meth:`add_change_listener` run whenever the calendar changed, e.g. to
+    drop cached calendar answers.
+
+    ``service`` can be any object with the ``events().list(...).execute()``
+    interface of the Calendar API client, such as
+    ``benchmarks.fakes.FakeCalendarAPI``.
+    """
+
+    def __init__(self, config, service=None):
         self.config = config
         self.SCOPES = ["https://www.googleapis.com/auth/calendar.readonly"]
         self.creds = None
+        self.executor = get_executor(config)
+        # Without a service, authentication waits for the first calendar question
+        self.service = service
+        self.events: dict[str, CalendarEvent] = {}
+        # (start timestamp, event id), sorted
+        self.index: list[tuple[float, str]] = []
+        self.sync_token: Optional[str] = None
+        self.loaded: Optional[asyncio.Event] = None
+        self.sync_task: Optional[asyncio.Task] = None
+        self.listeners: list[Callable[[], Awaitable]] = []
+        self.last_error: Optional[Exception] = None
+        self.full_syncs = 0
+        self.incremental_syncs = 0
+
+    def _connect(self):
+        from googleapiclient.discovery import build
+
         self._authenticate()
         self.service = build("calendar", "v3", credentials=self.creds)
 
     def _authenticate(self):
+        from google.auth.transport.requests import Request
+        from google_auth_oauthlib.flow import InstalledAppFlow
+
         if os.path.exists("token.pickle"):
             with open("token.pickle", "rb") as token:
                 self.creds = pickle.load(token)
@@ -32,38 +122,141 @@ class CalendarService:
             with open("token.pickle", "wb") as token:
                 pickle.dump(self.creds, token)
 
-    async def get_upcoming_events(self, days=7):
-        now = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        time_max = now + timedelta(days=days)
-
-        try:
-            events_result = (
-                self.service.events()
-                .list(
-                    calendarId="primary",
-                    timeMin=now.isoformat() + "Z",
-                    timeMax=time_max.isoformat() + "Z",
-                    maxResults=100,
-                    singleEvents=True,
-                    orderBy="startTime",
-                )
-                .execute()
+    def add_change_listener(self, listener: Callable[[], Awaitable]):
+        self.listeners.append(listener)
+
+    def start(self):
+        """Starts the background sync; called on the first lookup if not before."""
+        if self.sync_task is None:
+            self.loaded = asyncio.Event()
+            self.sync_task = asyncio.create_task(self._sync_loop())
+
+    async def stop(self):
+        if self.sync_task is not None:
+            self.sync_task.cancel()
+            await asyncio.gather(self.sync_task, return_exceptions=True)
+            self.sync_task = None
+
+    async def _sync_loop(self):
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.warning(f"    ⚠️  Calendar sync failed: {e}")
+                self.last_error = e
+                # Lookups waiting for the first load report the error
+                self.loaded.set()
+            await asyncio.sleep(self.config.CALENDAR_SYNC_INTERVAL)
+
+    async def _list(self, **params) -> tuple[list[dict], Optional[str]]:
+        """All pages of one ``events.list`` call: the items and the next sync token."""
+        if self.service is None:
+            # May wait for the user's consent in a browser, so not under
+            # CALENDAR_TIMEOUT, which is meant for events.list calls
+            await self.executor.run(
+                "calendar", self._connect, timeout=self.config.CALENDAR_AUTH_TIMEOUT
+            )
+        items, page_token = [], None
+        while True:
+            if page_token:
+                params["pageToken"] = page_token
+            request = self.service.events().list(
+                calendarId=self.config.CALENDAR_ID, maxResults=2500, **params
+            )
+            page = await self.executor.run("calendar", request.execute)
+            items.extend(page.get("items", []))
+            page_token = page.get("nextPageToken")
+            if not page_token:
+                return items, page.get("nextSyncToken")
+
+    async def sync(self):
+        """Brings the mirror up to date, incrementally when a sync token is held."""
+        changed = False
+        if self.sync_token is not None:
+            try:
+                items, token = await self._list(singleEvents=True, syncToken=self.sync_token)
+                self.incremental_syncs += 1
+                changed = self._apply(items)
+            except Exception as e:
+                # 410 Gone: the token expired and a full sync is required
+                if getattr(getattr(e, "resp", None), "status", None) != 410:
+                    raise
+                logger.info("    Calendar sync token expired, reloading")
+                self.sync_token = None
+        if self.sync_token is None:
+            time_min = _start_of_day(datetime.now().astimezone())
+            items, token = await self._list(
+                singleEvents=True, timeMin=time_min.isoformat()
             )
+            self.full_syncs += 1
+            self._apply(items, reset=True)
+            changed = True
+        self.sync_token = token
+        if self.loaded is not None:
+            self.loaded.set()
+        if changed:
+            for listener in self.listeners:
+                try:
+                    await listener()
+                except Exception as e:
+                    logger.warning(f"    ⚠️  Calendar change listener failed: {e}")
 
-            events = events_result.get("items", [])
+    def _apply(self, items: list[dict], reset: bool = False) -> bool:
+        """Applies changed or cancelled events; returns whether anything changed."""
+        if reset:
+            self.events = {}
+        for item in items:
+            if item.get("status") == "cancelled":
+                self.events.pop(item["id"], None)
+            else:
+                self.events[item["id"]] = CalendarEvent.from_api(item)
+        if items or reset:
+            self.index = sorted(
+                (event.start.timestamp(), event.id) for event in self.events.values()
+            )
+        return bool(items)
 
-            if not events:
-                return "No upcoming events found."
+    def events_between(self, start: datetime, end: datetime) -> list[CalendarEvent]:
+        low = bisect_left(self.index, (start.timestamp(), ""))
+        high = bisect_left(self.index, (end.timestamp(), ""))
+        return [self.events[event_id] for _, event_id in self.index[low:high]]
 
-            formatted_events = []
-            for event in events:
-                start = event["start"].get("dateTime", event["start"].get("date"))
-                start_time = datetime.fromisoformat(start.replace("Z", "+00:00"))
-                formatted_events.append(
-                    f"- {event['summary']} on {start_time.strftime('%B %d at %I:%M %p')}"
-                )
+    def next_event(self, after: datetime) -> Optional[CalendarEvent]:
+        position = bisect_left(self.index, (after.timestamp(), ""))
+        if position == len(self.index):
+            return None
+        return self.events[self.index[position][1]]
 
-            return "\n".join(formatted_events)
+    async def _loaded(self) -> bool:
+        self.start()
+        await self.loaded.wait()
+        return self.sync_token is not None
+
+    @staticmethod
+    def _describe(events: list[CalendarEvent]) -> str:
+        if not events:
+            return "No upcoming events found."
+        return "\n".join(event.describe() for event in events)
+
+    async def get_events_for_query(self, text: str) -> str:
+        """Answers a calendar question ("today", "this week", "next meeting") from the mirror."""
+        if not await self._loaded():
+            return f"{CALENDAR_ERROR_PREFIX}: {str(self.last_error)}"
+        now = datetime.now().astimezone()
+        if NEXT_EVENT_QUERY.search(text.lower()):
+            event = self.next_event(now)
+            return f"Next event:\n{event.describe()}" if event else "No upcoming events found."
+        return self._describe(self.events_between(*query_range(text, now)))
+
+    async def get_upcoming_events(self, days=7):
+        if not await self._loaded():
+            return f"{CALENDAR_ERROR_PREFIX}: {str(self.last_error)}"
+        now = datetime.now().astimezone()
+        return self._describe(self.events_between(*query_range("", now, days)))
 
-        except Exception as e:
-            return f"Error accessing calendar: {str(e)}"
+    def stats(self) -> dict[str, int]:
+        return {
+            "events": len(self.events),
+            "full_syncs": self.full_syncs,
+            "incremental_syncs": self.incremental_syncs,
+        }
@@ -0,0 +1,53 @@
+import math
+import re
+
+# Rough ratio for English text with BPE-style tokenizers; good enough for
+# sizing chunks and request batches without loading a tokenizer.
+TOKENS_PER_WORD = 1.3
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text.split()) * TOKENS_PER_WORD)
+
+
+def chunk_text(text: str, chunk_tokens: int = 256, overlap_tokens: int = 32) -> list[str]:
+    """Splits ``text`` into chunks of at most ``chunk_tokens`` estimated tokens.
+
+    Whole paragraphs are packed together while they fit; longer paragraphs
+    are cut on word boundaries. Consecutive chunks share ``overlap_tokens``
+    worth of words so that a sentence cut in two is still retrievable.
+    """
+    text = text.strip()
+    if not text:
+        return []
+    if estimate_tokens(text) <= chunk_tokens:
+        return [text]
+
+    max_words = max(1, int(chunk_tokens / TOKENS_PER_WORD))
+    overlap_words = min(int(overlap_tokens / TOKENS_PER_WORD), max_words // 2)
+
+    chunks = []
+    current: list[str] = []
+    pending = 0  # words in ``current`` that are not part of an emitted chunk yet
+
+    def flush():
+        nonlocal current, pending
+        chunks.append(" ".join(current))
+        current = current[len(current) - overlap_words :] if overlap_words else []
+        pending = 0
+
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        words = paragraph.split()
+        if pending and len(current) + len(words) > max_words:
+            flush()
+        for word in words:
+            current.append(word)
+            pending += 1
+            if len(current) >= max_words:
+                flush()
+
+    if pending:
+        chunks.append(" ".join(current))
+    return chunks
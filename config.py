@@ -9,11 +9,116 @@ load_dotenv()
 
 @dataclass
 class Config:
+    VECTOR_BACKEND: str = "milvus"  # milvus, milvus-lite or local
+    MILVUS_LITE_PATH: str = "milvus_lite.db"
+    LOCAL_INDEX_DIR: str = ".cache/local_index"
     MILVUS_HOST: str = "localhost"
     MILVUS_PORT: int = 19530
     COLLECTION_NAME: str = "audio_assistant"
+    MILVUS_RESET_COLLECTION: bool = False
+    MILVUS_INDEX_TYPE: str = "HNSW"  # HNSW, IVF_FLAT, IVF_PQ or DISKANN
+    MILVUS_METRIC_TYPE: str = "COSINE"
+    HNSW_M: int = 16
+    HNSW_EF_CONSTRUCTION: int = 200
+    HNSW_EF: int = 64
+    IVF_NLIST: int = 1024
+    IVF_NPROBE: int = 16
+    IVF_PQ_M: int = 64
+    IVF_PQ_NBITS: int = 8
+    DISKANN_SEARCH_LIST: int = 100
     ELEVENLABS_API_KEY: str = os.getenv("ELEVENLABS_API_KEY")
     ASSEMBLY_API_KEY: str = os.getenv("ASSEMBLY_API_KEY")
     VECTOR_DIM: int = 1024
     DUCKDUCKGO_NUM_RESULTS: int = 5
+    WEB_SEARCH_MAX_WORKERS: int = 4
+    WEB_SEARCH_TIMEOUT: float = 8.0
+    CALENDAR_TIMEOUT: float = 10.0
+    CALENDAR_AUTH_TIMEOUT: float = 300.0  # first sign-in waits for browser consent
+    MILVUS_MAX_WORKERS: int = 8
+    MILVUS_TIMEOUT: float = 5.0
+    AUDIO_MAX_WORKERS: int = 2
+    RETRIEVAL_POLICY: str = "priority"  # priority or merge
+    KB_RELEVANCE_THRESHOLD: float = 0.4
+    KB_SEARCH_LIMIT: int = 3
+    KB_RANGE_SEARCH: bool = True  # let Milvus drop hits below the threshold
+    KB_CANDIDATES: int = 10  # fetched per query for de-duplication and re-ranking
+    KB_HYBRID_RERANK: bool = True
+    KB_BM25_WEIGHT: float = 0.3
+    KB_DEDUP_THRESHOLD: float = 0.8  # word overlap (Jaccard) that marks a duplicate
+    KB_SEARCH_COALESCE_MS: float = 2.0
+    KB_DEADLINE: float = 1.5
+    CALENDAR_DEADLINE: float = 3.0
+    CALENDAR_ID: str = "primary"
+    CALENDAR_SYNC_INTERVAL: float = 60.0  # seconds between incremental syncs
+    WEB_DEADLINE: float = 4.0
+    WEB_SPECULATION_DELAY: float = 0.0
+    WEB_CACHE_TTL: float = 3600  # seconds a query's results are reused
+    WEB_CACHE_MAX_ENTRIES: int = 256
+    WEB_WRITE_BACK: bool = True  # store result pages in the knowledge base
+    WEB_FETCH_CONCURRENCY: int = 4
+    WEB_FETCH_TIMEOUT: float = 5.0
+    WEB_FETCH_MAX_BYTES: int = 1_000_000
+    WEB_PAGE_MAX_CHUNKS: int = 8
+    WEB_KB_TTL: float = 7 * 24 * 3600  # age at which stored web documents expire
+    WEB_KB_PURGE_INTERVAL: float = 600
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_COLLECTION: str = "answer_cache"
+    ANSWER_CACHE_DIR: str = ".cache/answers"
+    ANSWER_CACHE_THRESHOLD: float = 0.92
+    ANSWER_CACHE_TTL: float = 24 * 3600
+    ANSWER_CACHE_CALENDAR_TTL: float = 300
+    ANSWER_CACHE_MAX_ENTRIES: int = 1000
     JINA_API_KEY: str = os.getenv("JINA_API_KEY")
+    EMBEDDING_MODEL: str = "jina-embeddings-v3"
+    EMBEDDING_URL: str = "https://api.jina.ai/v1/embeddings"
+    EMBEDDING_MAX_CONNECTIONS: int = 8
+    EMBEDDING_MAX_CONCURRENCY: int = 4
+    EMBEDDING_TIMEOUT: float = 10.0
+    EMBEDDING_MAX_RETRIES: int = 3
+    EMBEDDING_BACKOFF: float = 0.5
+    EMBEDDING_COALESCE_MS: float = 5.0
+    EMBEDDING_CACHE_DIR: str = ".cache/embeddings"
+    EMBEDDING_CACHE_SIZE: int = 10_000
+    EMBED_BATCH_SIZE: int = 64
+    EMBED_BATCH_TOKENS: int = 8192
+    CHUNK_TOKENS: int = 128
+    CHUNK_OVERLAP_TOKENS: int = 16
+    INGEST_WORKERS: int = 4
+    LLM_MODEL: str = "llama3.2"
+    LLM_KEEP_ALIVE: str = "30m"
+    CONTEXT_TOKEN_BUDGET: int = 384
+    CONTEXT_WEB_RESULTS: int = 3
+    ELEVENLABS_MODEL: str = "eleven_turbo_v2_5"
+    ELEVENLABS_VOICE: str = "mZ8K1MPRiT5wDQaasg3i"
+    STREAM_RESPONSES: bool = True
+    TTS_QUEUE_SIZE: int = 32
+    TTS_CACHE_DIR: str = ".cache/tts"
+    TTS_CACHE_MAX_BYTES: int = 200 * 1024 * 1024
+    TTS_PREWARM: bool = True
+    MIC_FRAME_MS: int = 100
+    MIC_BUFFER_MS: int = 2000
+    VAD_ENABLED: bool = True
+    VAD_SUBFRAME_MS: int = 10
+    VAD_SNR_DB: float = 9.0
+    VAD_MIN_ENERGY_DB: float = -55.0
+    VAD_MAX_ZCR: float = 0.4
+    VAD_SPEECH_RATIO: float = 0.3
+    VAD_PREROLL_MS: int = 300
+    VAD_HANGOVER_MS: int = 600
+    STT_BACKEND: str = "assemblyai"  # "assemblyai" or "local"
+    WHISPER_MODEL: str = "base.en"
+    WHISPER_COMPUTE_TYPE: str = "int8"
+    WHISPER_CPU_THREADS: int = 4
+    WHISPER_LANGUAGE: str = "en"
+    STT_PARTIAL_INTERVAL_MS: int = 500
+    STT_MAX_WINDOW_S: float = 15.0
+    DUPLEX_MODE: str = "barge-in"  # "half", "pause" or "barge-in"
+    BARGE_IN_SNR_DB: float = 12.0
+    BARGE_IN_MIN_MS: int = 300
+    TURN_QUEUE_SIZE: int = 4
+    TURN_MAX_CONCURRENT: int = 4
+    TURN_SUPERSEDE: bool = True
+    TURN_SUBMIT_TIMEOUT: float = 2.0
+    LOG_LEVEL: str = "INFO"  # DEBUG, INFO, WARNING, ERROR or OFF
+    TELEMETRY_ENABLED: bool = True
+    TELEMETRY_JSONL: str = ""  # e.g. ".cache/telemetry.jsonl"
@@ -0,0 +1,134 @@
+import re
+from dataclasses import dataclass
+
+from chunking import TOKENS_PER_WORD, estimate_tokens
+from config import Config
+from rerank import bm25_scores, jaccard, tokenize
+
+SOURCE_DESCRIPTIONS = {
+    "knowledge_base": "given context",
+    "calendar": "user's calendar events",
+    "web": "web search results",
+    "merged": "given context, calendar events and web search results",
+}
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+
+def split_into_sentences(text: str) -> list[str]:
+    return [sentence.strip() for sentence in _SENTENCE_END.split(text) if sentence.strip()]
+
+
+@dataclass
+class _Sentence:
+    section: int
+    position: int
+    text: str
+    tokens: int
+    score: float = 0.0
+
+
+@dataclass
+class BuiltContext:
+    prompt: str
+    context_tokens: int
+    original_tokens: int
+    sentences_kept: int
+    sentences_dropped: int
+
+
+class ContextBuilder:
+    """Assembles retrieved passages into a prompt within ``CONTEXT_TOKEN_BUDGET``.
+
+    Passages are split into sentences; exact and near-duplicate sentences
+    (across chunks and sources) are dropped, and when the rest does not fit
+    the budget the sentences sharing the most terms with the query (BM25,
+    with a small bonus for higher-ranked passages) are kept, in their
+    original order. Calendar listings are trimmed line by line the same
+    way, but never de-duplicated: two similar events are still two events.
+    """
+
+    def __init__(self, config: Config):
+        self.config = config
+
+    def _sentences(self, sections: list[tuple[str, list[str], bool]]) -> list[_Sentence]:
+        sentences, seen = [], []
+        for section, (_, passages, deduplicate) in enumerate(sections):
+            for rank, passage in enumerate(passages):
+                for text in split_into_sentences(passage):
+                    if deduplicate:
+                        words = set(tokenize(text))
+                        if any(
+                            jaccard(words, other) >= self.config.KB_DEDUP_THRESHOLD
+                            for other in seen
+                        ):
+                            continue
+                        seen.append(words)
+                    sentence = _Sentence(section, len(sentences), text, estimate_tokens(text))
+                    # Earlier passages were ranked more relevant by retrieval
+                    sentence.score = 1.0 / (1 + rank)
+                    sentences.append(sentence)
+        return sentences
+
+    def _select(self, query: str, sentences: list[_Sentence]) -> list[_Sentence]:
+        budget = self.config.CONTEXT_TOKEN_BUDGET
+        if sum(sentence.tokens for sentence in sentences) <= budget:
+            return sentences
+        keyword = bm25_scores(query, [sentence.text for sentence in sentences])
+        best = max(keyword) or 1.0
+        for sentence, score in zip(sentences, keyword):
+            sentence.score = score / best + 0.2 * sentence.score
+
+        selected, used = [], 0
+        for sentence in sorted(sentences, key=lambda sentence: sentence.score, reverse=True):
+            if used + sentence.tokens > budget:
+                continue
+            selected.append(sentence)
+            used += sentence.tokens
+        if not selected and sentences:
+            # A single sentence longer than the whole budget: cut it down
+            top = max(sentences, key=lambda sentence: sentence.score)
+            words = top.text.split()[: max(1, int(budget / TOKENS_PER_WORD))]
+            selected = [_Sentence(top.section, top.position, " ".join(words), budget)]
+        return sorted(selected, key=lambda sentence: sentence.position)
+
+    def build(self, query: str, retrieval) -> BuiltContext:
+        """The user prompt for ``query`` from a :class:`retrieval.RetrievalResult`."""
+        # (title, passages in retrieval order, whether to drop near-duplicates)
+        sections: list[tuple[str, list[str], bool]] = []
+        if retrieval.knowledge_base:
+            sections.append(
+                ("Context", [hit["text"] for hit in retrieval.knowledge_base], True)
+            )
+        if retrieval.calendar:
+            sections.append(("Calendar Events", retrieval.calendar.splitlines(), False))
+        if retrieval.web:
+            sections.append(
+                ("Web search results", retrieval.web[: self.config.CONTEXT_WEB_RESULTS], True)
+            )
+        if not sections:
+            return BuiltContext(query, 0, 0, 0, 0)
+
+        original_tokens = sum(
+            estimate_tokens(passage) for _, passages, _ in sections for passage in passages
+        )
+        sentences = self._sentences(sections)
+        selected = self._select(query, sentences)
+
+        blocks = []
+        for section, (title, _, _) in enumerate(sections):
+            texts = [sentence.text for sentence in selected if sentence.section == section]
+            if texts:
+                blocks.append(f"{title}:\n" + "\n".join(texts))
+        prompt = (
+            "\n\n".join(blocks)
+            + f"\n\nUser Query: {query}\n\n"
+            + f"Please answer the user's query based on the {SOURCE_DESCRIPTIONS[retrieval.source]}."
+        )
+        return BuiltContext(
+            prompt=prompt,
+            context_tokens=sum(sentence.tokens for sentence in selected),
+            original_tokens=original_tokens,
+            sentences_kept=len(selected),
+            sentences_dropped=len(sentences) - len(selected),
+        )
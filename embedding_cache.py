@@ -0,0 +1,197 @@
+import hashlib
+import json
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional, Sequence
+
+import numpy as np
+
+from config import Config
+
+
+class EmbeddingCache:
+    """Two-tier cache for embedding vectors.
+
+    Entries are keyed by (model, task, dimensions, sha256(text)). The first
+    tier is an in-memory LRU; the second is an append-only float32 file on
+    disk, read back through a memory map, with a JSONL index of offsets.
+    """
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.max_entries = config.EMBEDDING_CACHE_SIZE
+        self.memory: OrderedDict[str, np.ndarray] = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        os.makedirs(config.EMBEDDING_CACHE_DIR, exist_ok=True)
+        self.data_path = os.path.join(config.EMBEDDING_CACHE_DIR, "vectors.f32")
+        self.index_path = os.path.join(config.EMBEDDING_CACHE_DIR, "index.jsonl")
+        self.index: dict[str, tuple[int, int]] = {}
+        self._mmap: Optional[mmap.mmap] = None
+        self._load_index()
+
+    @staticmethod
+    def make_key(model: str, task: str, dimensions: int, text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{model}:{task}:{dimensions}:{digest}"
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return
+        data_size = (
+            os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        )
+        with open(self.index_path, "r", encoding="utf-8") as index_file:
+            for line in index_file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn last line from an interrupted write
+                    continue
+                offset, dim = entry["offset"], entry["dim"]
+                if offset + dim * 4 <= data_size:
+                    self.index[entry["key"]] = (offset, dim)
+
+    def _read_disk(self, key: str) -> Optional[np.ndarray]:
+        location = self.index.get(key)
+        if location is None:
+            return None
+        offset, dim = location
+        if self._mmap is None or offset + dim * 4 > len(self._mmap):
+            with open(self.data_path, "rb") as data_file:
+                self._mmap = mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ)
+        return np.frombuffer(self._mmap, dtype=np.float32, count=dim, offset=offset)
+
+    def _write_disk(self, entries: list[tuple[str, np.ndarray]]):
+        with open(self.data_path, "ab") as data_file:
+            offset = data_file.tell()
+            lines = []
+            for key, vector in entries:
+                data_file.write(vector.tobytes())
+                self.index[key] = (offset, vector.shape[0])
+                lines.append(
+                    json.dumps({"key": key, "offset": offset, "dim": vector.shape[0]})
+                )
+                offset += vector.nbytes
+        # The index is written after the vectors so that it never points past
+        # the end of the data file.
+        with open(self.index_path, "a", encoding="utf-8") as index_file:
+            index_file.write("\n".join(lines) + "\n")
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self.memory[key] = vector
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self.lock:
+            vector = self.memory.get(key)
+            if vector is not None:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return vector
+            vector = self._read_disk(key)
+            if vector is not None:
+                self._remember(key, vector)
+                self.hits += 1
+                self.disk_hits += 1
+                return vector
+            self.misses += 1
+            return None
+
+    def put_many(self, entries: list[tuple[str, np.ndarray]]):
+        entries = [
+            (key, np.asarray(vector, dtype=np.float32).ravel())
+            for key, vector in entries
+        ]
+        with self.lock:
+            new_entries = [(key, vector) for key, vector in entries if key not in self.index]
+            if new_entries:
+                self._write_disk(new_entries)
+            for key, vector in entries:
+                self._remember(key, vector)
+
+    def _lookup(
+        self, texts: Sequence[str], model: str, task: str, dimensions: int
+    ) -> tuple[list[str], list[Optional[np.ndarray]], dict[str, str]]:
+        keys = [self.make_key(model, task, dimensions, text) for text in texts]
+        vectors = [self.get(key) for key in keys]
+        # Identical texts in one batch are only sent once
+        missing = {}
+        for key, text, vector in zip(keys, texts, vectors):
+            if vector is None:
+                missing.setdefault(key, text)
+        return keys, vectors, missing
+
+    def _merge(
+        self,
+        keys: list[str],
+        vectors: list[Optional[np.ndarray]],
+        missing: dict[str, str],
+        encoded: Sequence,
+    ) -> list[np.ndarray]:
+        computed = {
+            key: np.asarray(vector, dtype=np.float32).ravel()
+            for key, vector in zip(missing.keys(), encoded)
+        }
+        if computed:
+            self.put_many(list(computed.items()))
+        return [
+            vector if vector is not None else computed[key]
+            for key, vector in zip(keys, vectors)
+        ]
+
+    def encode(
+        self,
+        texts: Sequence[str],
+        encode_fn: Callable[[list[str]], Sequence],
+        model: str,
+        task: str,
+        dimensions: int,
+    ) -> list[np.ndarray]:
+        """Returns embeddings for ``texts``, calling ``encode_fn`` only for misses."""
+        keys, vectors, missing = self._lookup(texts, model, task, dimensions)
+        encoded = encode_fn(list(missing.values())) if missing else []
+        return self._merge(keys, vectors, missing, encoded)
+
+    async def aencode(
+        self,
+        texts: Sequence[str],
+        encode_fn: Callable[[list[str]], Awaitable[Sequence]],
+        model: str,
+        task: str,
+        dimensions: int,
+    ) -> list[np.ndarray]:
+        """Async variant of :meth:`encode` for coroutine ``encode_fn``s."""
+        keys, vectors, missing = self._lookup(texts, model, task, dimensions)
+        encoded = await encode_fn(list(missing.values())) if missing else []
+        return self._merge(keys, vectors, missing, encoded)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_entries": len(self.memory),
+            "disk_entries": len(self.index),
+        }
+
+
+_shared_caches: dict[str, EmbeddingCache] = {}
+_shared_lock = threading.Lock()
+
+
+def get_embedding_cache(config: Config) -> EmbeddingCache:
+    """Returns the process-wide cache for ``config.EMBEDDING_CACHE_DIR``."""
+    with _shared_lock:
+        cache = _shared_caches.get(config.EMBEDDING_CACHE_DIR)
+        if cache is None:
+            cache = EmbeddingCache(config)
+            _shared_caches[config.EMBEDDING_CACHE_DIR] = cache
+        return cache
@@ -0,0 +1,94 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from config import Config
+
+
+class ServiceTimeout(Exception):
+    def __init__(self, service: str, timeout: float):
+        super().__init__(f"{service} call timed out after {timeout:.1f}s")
+        self.service = service
+        self.timeout = timeout
+
+
+class BlockingExecutor:
+    """Runs blocking third-party calls off the event loop.
+
+    Each service gets its own bounded thread pool, so a burst of slow web
+    searches cannot starve calendar or Milvus calls, and every call is
+    awaited with a per-service timeout. A timed-out call keeps running in
+    its worker thread (threads cannot be interrupted) but the caller moves
+    on immediately.
+    """
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.max_workers = {
+            # googleapiclient/httplib2 objects are not thread-safe, so the
+            # shared calendar service is only ever used from one thread.
+            "calendar": 1,
+            "web": config.WEB_SEARCH_MAX_WORKERS,
+            "milvus": config.MILVUS_MAX_WORKERS,
+            "audio": config.AUDIO_MAX_WORKERS,
+        }
+        self.timeouts: dict[str, Optional[float]] = {
+            "calendar": config.CALENDAR_TIMEOUT,
+            "web": config.WEB_SEARCH_TIMEOUT,
+            "milvus": config.MILVUS_TIMEOUT,
+            "audio": None,
+        }
+        self.pools: dict[str, ThreadPoolExecutor] = {}
+        self.lock = threading.Lock()
+
+    def _pool(self, service: str) -> ThreadPoolExecutor:
+        with self.lock:
+            pool = self.pools.get(service)
+            if pool is None:
+                pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers.get(service, 4),
+                    thread_name_prefix=f"{service}-worker",
+                )
+                self.pools[service] = pool
+            return pool
+
+    async def run(
+        self,
+        service: str,
+        fn: Callable[..., Any],
+        *args,
+        timeout: Optional[float] = None,
+        **kwargs,
+    ) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self._pool(service), functools.partial(fn, *args, **kwargs)
+        )
+        timeout = timeout if timeout is not None else self.timeouts.get(service)
+        if timeout is None:
+            return await future
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise ServiceTimeout(service, timeout) from None
+
+    def shutdown(self):
+        with self.lock:
+            for pool in self.pools.values():
+                pool.shutdown(wait=False, cancel_futures=True)
+            self.pools.clear()
+
+
+_shared_executor: Optional[BlockingExecutor] = None
+_shared_lock = threading.Lock()
+
+
+def get_executor(config: Config) -> BlockingExecutor:
+    """Returns the process-wide executor shared by all services."""
+    global _shared_executor
+    with _shared_lock:
+        if _shared_executor is None:
+            _shared_executor = BlockingExecutor(config)
+        return _shared_executor
@@ -0,0 +1,185 @@
+import argparse
+import time
+from dataclasses import replace
+
+import numpy as np
+from pymilvus import DataType, MilvusClient
+
+from config import Config
+from vector_search import index_build_params, index_search_params
+
+# Search-time knob swept for each index type, from fast/approximate to
+# slow/accurate.
+SEARCH_SWEEPS = {
+    "HNSW": ("ef", [16, 32, 64, 128, 256]),
+    "IVF_FLAT": ("nprobe", [1, 4, 16, 64]),
+    "IVF_PQ": ("nprobe", [4, 16, 64]),
+    "DISKANN": ("search_list", [16, 32, 64, 128]),
+}
+
+
+def load_vectors(client: MilvusClient, config: Config, limit: int) -> np.ndarray:
+    rows = client.query(
+        collection_name=config.COLLECTION_NAME,
+        filter="id >= 0",
+        output_fields=["embedding"],
+        limit=limit,
+    )
+    return np.asarray([row["embedding"] for row in rows], dtype=np.float32)
+
+
+def synthetic_vectors(count: int, dim: int, clusters: int = 64, seed: int = 0) -> np.ndarray:
+    """Clustered unit vectors, closer to real embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, count)
+    vectors = centers[labels] + 0.5 * rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def brute_force_top_k(
+    vectors: np.ndarray, queries: np.ndarray, k: int, metric_type: str = "COSINE"
+) -> np.ndarray:
+    """The exact top-k ids under ``metric_type``, the ground truth for recall."""
+    if metric_type == "L2":
+        # Negated squared distance, so that larger is closer as for the others
+        scores = (
+            2 * queries @ vectors.T
+            - (vectors * vectors).sum(axis=1)[None, :]
+            - (queries * queries).sum(axis=1)[:, None]
+        )
+    elif metric_type == "IP":
+        scores = queries @ vectors.T
+    else:
+        normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        query_norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        scores = (queries / query_norms) @ normalized.T
+    top = np.argpartition(-scores, k, axis=1)[:, :k]
+    order = np.take_along_axis(scores, top, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(top, order, axis=1)
+
+
+def build_collection(
+    client: MilvusClient, config: Config, name: str, index_type: str, vectors: np.ndarray
+):
+    client.drop_collection(name)
+    schema = MilvusClient.create_schema(auto_id=False)
+    schema.add_field("id", DataType.INT64, is_primary=True)
+    schema.add_field("embedding", DataType.FLOAT_VECTOR, dim=vectors.shape[1])
+    client.create_collection(name, schema=schema)
+
+    for start in range(0, len(vectors), 1000):
+        batch = vectors[start : start + 1000]
+        client.insert(
+            name,
+            [
+                {"id": start + offset, "embedding": vector.tolist()}
+                for offset, vector in enumerate(batch)
+            ],
+        )
+    client.flush(name)
+
+    index_params = client.prepare_index_params()
+    index_params.add_index(
+        field_name="embedding",
+        index_type=index_type,
+        metric_type=config.MILVUS_METRIC_TYPE,
+        params=index_build_params(config, index_type),
+    )
+    started = time.perf_counter()
+    client.create_index(name, index_params, sync=True)
+    client.load_collection(name)
+    return time.perf_counter() - started
+
+
+def measure(
+    client: MilvusClient,
+    config: Config,
+    name: str,
+    index_type: str,
+    queries: np.ndarray,
+    truth: np.ndarray,
+    k: int,
+    knob: str,
+    value: int,
+) -> tuple[float, float, float]:
+    search_params = index_search_params(config, index_type, **{knob: value})
+    hits = 0
+    latencies = []
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        result = client.search(
+            name, data=[query.tolist()], limit=k, search_params=search_params
+        )[0]
+        latencies.append(time.perf_counter() - started)
+        hits += len({hit["id"] for hit in result} & set(expected.tolist()))
+    recall = hits / (len(queries) * k)
+    qps = len(queries) / sum(latencies)
+    p95_ms = float(np.percentile(latencies, 95) * 1000)
+    return recall, qps, p95_ms
+
+
+def main():
+    config = Config()
+    parser = argparse.ArgumentParser(
+        description="Measure recall@k and QPS of Milvus index types against brute force."
+    )
+    parser.add_argument(
+        "--index-types", nargs="+", default=list(SEARCH_SWEEPS), choices=list(SEARCH_SWEEPS)
+    )
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument(
+        "--vectors", type=int, default=10_000, help="Vectors to read from the collection"
+    )
+    parser.add_argument(
+        "--synthetic",
+        action="store_true",
+        help="Use clustered random vectors instead of the stored embeddings",
+    )
+    parser.add_argument("--nlist", type=int, default=config.IVF_NLIST)
+    args = parser.parse_args()
+
+    client = MilvusClient(uri=f"http://{config.MILVUS_HOST}:{config.MILVUS_PORT}")
+    if args.synthetic:
+        vectors = synthetic_vectors(args.vectors + args.queries, config.VECTOR_DIM)
+    else:
+        vectors = load_vectors(client, config, args.vectors + args.queries)
+    if len(vectors) <= args.queries + args.k:
+        raise SystemExit(
+            f"Only {len(vectors)} vectors available; ingest more data or use --synthetic"
+        )
+
+    # Held-out vectors are used as queries so they are not their own neighbours
+    queries, corpus = vectors[: args.queries], vectors[args.queries :]
+    truth = brute_force_top_k(corpus, queries, args.k, config.MILVUS_METRIC_TYPE)
+
+    # IVF needs fewer lists than points; 4*sqrt(n) is the usual starting point
+    nlist = min(args.nlist, max(1, int(4 * np.sqrt(len(corpus)))))
+    tuning_config = replace(config, IVF_NLIST=nlist)
+    name = f"{config.COLLECTION_NAME}_tuning"
+
+    print(f"{len(corpus)} vectors, {len(queries)} queries, recall@{args.k}")
+    print(f"{'index':<10} {'param':<16} {'recall':>8} {'QPS':>9} {'p95 ms':>8}")
+    try:
+        for index_type in args.index_types:
+            build_seconds = build_collection(client, tuning_config, name, index_type, corpus)
+            print(f"{index_type:<10} built in {build_seconds:.1f}s")
+            knob, values = SEARCH_SWEEPS[index_type]
+            for value in values:
+                # HNSW and DiskANN reject a candidate list shorter than k
+                if knob in ("ef", "search_list") and value < args.k:
+                    continue
+                recall, qps, p95_ms = measure(
+                    client, tuning_config, name, index_type, queries, truth, args.k, knob, value
+                )
+                print(
+                    f"{index_type:<10} {f'{knob}={value}':<16} {recall:>8.3f} "
+                    f"{qps:>9.1f} {p95_ms:>8.2f}"
+                )
+    finally:
+        client.drop_collection(name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import argparse
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+from chunking import chunk_text, estimate_tokens
+from config import Config
+from vector_search import MilvusWrapper, content_hash
+
+DEFAULT_EXTENSIONS = (".txt", ".md", ".rst")
+
+
+@dataclass
+class Chunk:
+    text: str
+    source: str
+    chunk_index: int
+
+
+@dataclass
+class IngestStats:
+    documents: int = 0
+    chunks: int = 0
+    skipped: int = 0
+    inserted: int = 0
+    started: float = 0.0
+
+    def report(self) -> str:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return (
+            f"{self.documents} documents, {self.chunks} chunks "
+            f"({self.inserted} inserted, {self.skipped} already stored) in {elapsed:.1f}s "
+            f"— {self.documents / elapsed:.1f} docs/s, {self.chunks / elapsed:.1f} chunks/s"
+        )
+
+
+def iter_files(paths: Iterable[str], extensions: tuple[str, ...]) -> Iterator[str]:
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.lower().endswith(extensions):
+                        yield os.path.join(root, name)
+        elif os.path.isfile(path):
+            yield path
+        else:
+            print(f"⚠️  Skipping missing path: {path}")
+
+
+def iter_chunks(
+    files: Iterable[str], stats: IngestStats, chunk_tokens: int, overlap_tokens: int
+) -> Iterator[Chunk]:
+    for path in files:
+        with open(path, "r", encoding="utf-8", errors="replace") as file:
+            text = file.read()
+        stats.documents += 1
+        for index, chunk in enumerate(chunk_text(text, chunk_tokens, overlap_tokens)):
+            yield Chunk(text=chunk, source=path, chunk_index=index)
+
+
+def iter_batches(
+    chunks: Iterable[Chunk], max_batch_size: int, max_batch_tokens: int
+) -> Iterator[list[Chunk]]:
+    """Groups chunks into embedding requests bounded by count and total tokens."""
+    batch: list[Chunk] = []
+    batch_tokens = 0
+    for chunk in chunks:
+        tokens = estimate_tokens(chunk.text)
+        if batch and (
+            len(batch) >= max_batch_size or batch_tokens + tokens > max_batch_tokens
+        ):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(chunk)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+class Ingestor:
+    """Streams files into Milvus with several embed+insert batches in flight.
+
+    Only ``workers * 2`` batches are held in memory at any time, so the
+    corpus size is bounded by disk rather than RAM. Identical chunks are
+    inserted once, whether they are already stored, repeated within a
+    batch or sent by batches in flight on other workers.
+    """
+
+    def __init__(self, config: Config, milvus_wrapper: MilvusWrapper):
+        self.config = config
+        self.milvus_wrapper = milvus_wrapper
+        # Hashes taken by a batch of this run; inserts may not be visible to
+        # existing_hashes yet, so this also covers finished batches
+        self.claimed: set[str] = set()
+        self.claimed_lock = threading.Lock()
+
+    def _claim(self, batch: list[Chunk]) -> dict[str, Chunk]:
+        """The batch's chunks, by hash, that no other chunk of this run has taken."""
+        unique: dict[str, Chunk] = {}
+        for chunk in batch:
+            unique.setdefault(content_hash(chunk.text), chunk)
+        with self.claimed_lock:
+            claimed = {
+                text_hash: chunk
+                for text_hash, chunk in unique.items()
+                if text_hash not in self.claimed
+            }
+            self.claimed.update(claimed)
+        return claimed
+
+    def _embed_and_insert(self, batch: list[Chunk]) -> tuple[int, int]:
+        claimed = self._claim(batch)
+        stored = self.milvus_wrapper.existing_hashes(list(claimed)) if claimed else set()
+        new_chunks = [chunk for text_hash, chunk in claimed.items() if text_hash not in stored]
+        if not new_chunks:
+            return 0, len(batch)
+        try:
+            inserted = self.milvus_wrapper.insert_rows(
+                [chunk.text for chunk in new_chunks],
+                [
+                    {"source": chunk.source, "chunk_index": chunk.chunk_index}
+                    for chunk in new_chunks
+                ],
+            )
+        except Exception:
+            with self.claimed_lock:
+                self.claimed.difference_update(claimed)
+            raise
+        return inserted, len(batch) - len(new_chunks)
+
+    def ingest(
+        self,
+        paths: list[str],
+        extensions: tuple[str, ...] = DEFAULT_EXTENSIONS,
+        workers: int = 4,
+        batch_size: int = 64,
+        batch_tokens: int = 8192,
+        chunk_tokens: int = 128,
+        overlap_tokens: int = 16,
+    ) -> IngestStats:
+        stats = IngestStats(started=time.perf_counter())
+        max_in_flight = workers * 2
+        in_flight: deque[tuple[Future, int]] = deque()
+
+        def collect(future: Future, size: int):
+            inserted, skipped = future.result()
+            stats.inserted += inserted
+            stats.skipped += skipped
+            stats.chunks += size
+
+        chunks = iter_chunks(iter_files(paths, extensions), stats, chunk_tokens, overlap_tokens)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for batch in iter_batches(chunks, batch_size, batch_tokens):
+                if len(in_flight) >= max_in_flight:
+                    collect(*in_flight.popleft())
+                    print(f"\r📥 {stats.report()}", end="", flush=True)
+                in_flight.append((executor.submit(self._embed_and_insert, batch), len(batch)))
+            while in_flight:
+                collect(*in_flight.popleft())
+
+        print(f"\r📥 {stats.report()}")
+        return stats
+
+
+def main():
+    config = Config()
+    parser = argparse.ArgumentParser(
+        description="Chunk, embed and insert text files into the Milvus knowledge base."
+    )
+    parser.add_argument("paths", nargs="+", help="Files or directories to ingest")
+    parser.add_argument(
+        "--extensions",
+        nargs="+",
+        default=list(DEFAULT_EXTENSIONS),
+        help="File extensions to pick up when walking directories",
+    )
+    parser.add_argument("--workers", type=int, default=config.INGEST_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=config.EMBED_BATCH_SIZE)
+    parser.add_argument("--batch-tokens", type=int, default=config.EMBED_BATCH_TOKENS)
+    parser.add_argument("--chunk-tokens", type=int, default=config.CHUNK_TOKENS)
+    parser.add_argument("--overlap-tokens", type=int, default=config.CHUNK_OVERLAP_TOKENS)
+    args = parser.parse_args()
+
+    ingestor = Ingestor(config, MilvusWrapper(config))
+    ingestor.ingest(
+        args.paths,
+        extensions=tuple(extension.lower() for extension in args.extensions),
+        workers=args.workers,
+        batch_size=args.batch_size,
+        batch_tokens=args.batch_tokens,
+        chunk_tokens=args.chunk_tokens,
+        overlap_tokens=args.overlap_tokens,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+
+import httpx
+import numpy as np
+
+from config import Config
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class EmbeddingRequestError(Exception):
+    def __init__(self, status_code: int, text: str):
+        super().__init__(f"Error getting embedding: {status_code} - {text}")
+        self.status_code = status_code
+        self.retryable = status_code in RETRYABLE_STATUS
+
+
+@dataclass
+class _LoopState:
+    """The parts of the client that are bound to one event loop."""
+
+    async_client: httpx.AsyncClient
+    semaphore: asyncio.Semaphore
+    pending: dict[str, list[tuple[list[str], asyncio.Future]]] = field(default_factory=dict)
+    flush_handles: dict[str, asyncio.TimerHandle] = field(default_factory=dict)
+    in_flight: set[asyncio.Task] = field(default_factory=set)
+
+
+class JinaEmbeddingClient:
+    """Pooled HTTP client for the Jina embeddings API.
+
+    Connections are kept alive and shared by every caller; requests are
+    bounded by a semaphore, time out, and are retried with exponential
+    backoff on transport errors and 429/5xx responses. Concurrent
+    ``embed`` calls for the same task made within ``EMBEDDING_COALESCE_MS``
+    are merged into a single request, since the API accepts a list as
+    ``input``. ``embed_sync`` serves thread-based callers (ingestion,
+    blocking search) over a pooled synchronous client.
+
+    The async client, semaphore and coalescing state are kept per event
+    loop, so the shared client keeps working across ``asyncio.run`` calls
+    and from loops running in other threads.
+    """
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.url = config.EMBEDDING_URL
+        self.headers = {"Authorization": f"Bearer {config.JINA_API_KEY}"}
+        self.limits = httpx.Limits(
+            max_connections=config.EMBEDDING_MAX_CONNECTIONS,
+            max_keepalive_connections=config.EMBEDDING_MAX_CONNECTIONS,
+        )
+        self.timeout = httpx.Timeout(config.EMBEDDING_TIMEOUT)
+        self.sync_client = httpx.Client(
+            limits=self.limits, timeout=self.timeout, headers=self.headers
+        )
+        self.loop_states: dict[asyncio.AbstractEventLoop, _LoopState] = {}
+        self.lock = threading.Lock()
+        self.requests_sent = 0
+        self.texts_sent = 0
+
+    def _payload(self, texts: list[str], task: str) -> dict:
+        return {
+            "input": texts,
+            "model": self.config.EMBEDDING_MODEL,
+            "task": task,
+            "dimensions": self.config.VECTOR_DIM,
+            "late_chunking": False,
+            "embedding_type": "float",
+        }
+
+    def _parse(self, response: httpx.Response) -> list[np.ndarray]:
+        if response.status_code != 200:
+            raise EmbeddingRequestError(response.status_code, response.text)
+        data = sorted(response.json()["data"], key=lambda item: item["index"])
+        return [np.asarray(item["embedding"], dtype=np.float32) for item in data]
+
+    def _backoff(self, attempt: int) -> float:
+        return self.config.EMBEDDING_BACKOFF * (2**attempt) * (0.5 + random.random())
+
+    @staticmethod
+    def _should_retry(error: Exception) -> bool:
+        if isinstance(error, EmbeddingRequestError):
+            return error.retryable
+        return isinstance(error, httpx.TransportError)
+
+    def _loop_state(self) -> _LoopState:
+        """The state for the running loop, created on its first request."""
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            state = self.loop_states.get(loop)
+            if state is None:
+                # A closed loop's client can't be closed any more; its
+                # connections are released with it
+                for closed in [other for other in self.loop_states if other.is_closed()]:
+                    del self.loop_states[closed]
+                state = _LoopState(
+                    httpx.AsyncClient(
+                        limits=self.limits, timeout=self.timeout, headers=self.headers
+                    ),
+                    asyncio.Semaphore(self.config.EMBEDDING_MAX_CONCURRENCY),
+                )
+                self.loop_states[loop] = state
+            return state
+
+    async def _post(self, texts: list[str], task: str) -> list[np.ndarray]:
+        state = self._loop_state()
+        for attempt in range(self.config.EMBEDDING_MAX_RETRIES + 1):
+            try:
+                async with state.semaphore:
+                    self.requests_sent += 1
+                    self.texts_sent += len(texts)
+                    response = await state.async_client.post(
+                        self.url, json=self._payload(texts, task)
+                    )
+                return self._parse(response)
+            except Exception as e:
+                if attempt == self.config.EMBEDDING_MAX_RETRIES or not self._should_retry(e):
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+
+    def embed_sync(self, texts: list[str], task: str) -> list[np.ndarray]:
+        for attempt in range(self.config.EMBEDDING_MAX_RETRIES + 1):
+            try:
+                self.requests_sent += 1
+                self.texts_sent += len(texts)
+                response = self.sync_client.post(self.url, json=self._payload(texts, task))
+                return self._parse(response)
+            except Exception as e:
+                if attempt == self.config.EMBEDDING_MAX_RETRIES or not self._should_retry(e):
+                    raise
+                time.sleep(self._backoff(attempt))
+
+    async def embed(self, texts: list[str], task: str) -> list[np.ndarray]:
+        loop = asyncio.get_running_loop()
+        state = self._loop_state()
+        future = loop.create_future()
+        batch = state.pending.setdefault(task, [])
+        batch.append((list(texts), future))
+
+        if sum(len(batch_texts) for batch_texts, _ in batch) >= self.config.EMBED_BATCH_SIZE:
+            self._flush(state, task)
+        elif task not in state.flush_handles:
+            state.flush_handles[task] = loop.call_later(
+                self.config.EMBEDDING_COALESCE_MS / 1000, self._flush, state, task
+            )
+        return await future
+
+    def _flush(self, state: _LoopState, task: str):
+        handle = state.flush_handles.pop(task, None)
+        if handle:
+            handle.cancel()
+        batch = state.pending.pop(task, [])
+        if batch:
+            request = asyncio.ensure_future(self._send_batch(task, batch))
+            state.in_flight.add(request)
+            request.add_done_callback(state.in_flight.discard)
+
+    async def _send_batch(self, task: str, batch: list[tuple[list[str], asyncio.Future]]):
+        texts = [text for batch_texts, _ in batch for text in batch_texts]
+        try:
+            vectors = await self._post(texts, task)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        offset = 0
+        for batch_texts, future in batch:
+            if not future.done():
+                future.set_result(vectors[offset : offset + len(batch_texts)])
+            offset += len(batch_texts)
+
+    def stats(self) -> dict[str, int]:
+        return {"requests": self.requests_sent, "texts": self.texts_sent}
+
+    async def aclose(self):
+        with self.lock:
+            state = self.loop_states.pop(asyncio.get_running_loop(), None)
+        if state is not None:
+            await state.async_client.aclose()
+        self.sync_client.close()
+
+
+_shared_clients: dict[str, JinaEmbeddingClient] = {}
+_shared_lock = threading.Lock()
+
+
+def get_jina_client(config: Config) -> JinaEmbeddingClient:
+    """Returns the process-wide client, so every caller shares one connection pool."""
+    with _shared_lock:
+        client = _shared_clients.get(config.EMBEDDING_URL)
+        if client is None:
+            client = JinaEmbeddingClient(config)
+            _shared_clients[config.EMBEDDING_URL] = client
+        return client
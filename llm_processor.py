@@ -1,50 +1,94 @@
-import requests
-from ollama import AsyncClient
+import logging
+from typing import AsyncIterator
 
 from config import Config
+from embedding_cache import get_embedding_cache
+from jina_client import get_jina_client
+from telemetry import annotate, record, span
+
+logger = logging.getLogger(__name__)
+
+LLM_ERROR_MESSAGE = "I'm sorry, I encountered an error while processing your request."
+
+# Identical on every turn, so Ollama can reuse its KV cache for this prefix
+# instead of evaluating it again; per-turn context goes in the user message.
+SYSTEM_PROMPT = "Please respond in short, concise sentences."
 
 
 class LLMProcessor:
     def __init__(self, config: Config):
         self.config = config
-        self.ollama_client = AsyncClient()
-        self.headers = {"Authorization": f"Bearer {self.config.JINA_API_KEY}"}
-        self.embedding_url = "https://api.jina.ai/v1/embeddings"
+        self._ollama_client = None
+        self.jina_client = get_jina_client(config)
+        self.embedding_cache = get_embedding_cache(config)
+
+    @property
+    def ollama_client(self):
+        if self._ollama_client is None:
+            from ollama import AsyncClient
+
+            self._ollama_client = AsyncClient()
+        return self._ollama_client
+
+    async def warm_up(self):
+        """Loads the model into memory so the first answer doesn't wait for it."""
+        await self.ollama_client.generate(
+            model=self.config.LLM_MODEL, keep_alive=self.config.LLM_KEEP_ALIVE
+        )
+
+    def embed_texts(self, texts: list[str]) -> list:
+        return self.embedding_cache.encode(
+            texts,
+            lambda batch: self.jina_client.embed_sync(batch, task="text-matching"),
+            model=self.config.EMBEDDING_MODEL,
+            task="text-matching",
+            dimensions=self.config.VECTOR_DIM,
+        )
 
     async def generate_embedding(self, text: str) -> list[float]:
-        print("Generating Embeddings")
-        payload = {
-            "input": text,
-            "model": "jina-embeddings-v3",
-            "task": "text-matching",
-            "dimensions": self.config.VECTOR_DIM,
-            "late_chunking": False,
-            "embedding_type": "float",
-        }
-        response = requests.post(self.embedding_url, json=payload, headers=self.headers)
-
-        if response.status_code == 200:
-            return response.json()["data"][0]["embedding"]
-        else:
-            raise Exception(
-                f"Error getting embedding: {response.status_code} - {response.text}"
+        with span("embed"):
+            vectors = await self.embedding_cache.aencode(
+                [text],
+                lambda batch: self.jina_client.embed(batch, task="text-matching"),
+                model=self.config.EMBEDDING_MODEL,
+                task="text-matching",
+                dimensions=self.config.VECTOR_DIM,
             )
+        return vectors[0].tolist()
+
+    async def stream_query(self, query: str) -> AsyncIterator[str]:
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": query},
+        ]
+        async for chunk in await self.ollama_client.chat(
+            model=self.config.LLM_MODEL,
+            messages=messages,
+            stream=True,
+            # Keeps the model, and with it the cached prompt prefix, loaded
+            keep_alive=self.config.LLM_KEEP_ALIVE,
+        ):
+            if chunk["done"]:
+                self._report_usage(chunk)
+                break
+            yield chunk["message"]["content"]
+
+    @staticmethod
+    def _report_usage(chunk):
+        # Ollama counts only the prompt tokens it had to evaluate, so a
+        # reused prefix shows up as a smaller count and a shorter prefill;
+        # a fully cached prompt omits the metrics altogether.
+        prompt_tokens = chunk.get("prompt_eval_count") or 0
+        prefill_ms = (chunk.get("prompt_eval_duration") or 0) / 1e6
+        annotate("prompt_tokens", prompt_tokens)
+        annotate("completion_tokens", chunk.get("eval_count") or 0)
+        record("llm_prefill", prefill_ms)
+        logger.debug(f"    🧮 Prompt: {prompt_tokens} tokens evaluated in {prefill_ms:.0f} ms")
 
     async def process_query(self, query: str) -> str:
         try:
-            system_message = "Please respond in short, concise sentences."
-            messages = [
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": query},
-            ]
-            response = ""
-            async for chunk in await self.ollama_client.chat(
-                model="llama3.2", messages=messages, stream=True
-            ):
-                if chunk["done"]:
-                    break
-                response += chunk["message"]["content"]
-            return response
+            tokens = [token async for token in self.stream_query(query)]
+            return "".join(tokens)
         except Exception as e:
-            print(f"Error processing query with LLM: {e}")
-            return "I'm sorry, I encountered an error while processing your request."
+            logger.error(f"Error processing query with LLM: {e}")
+            return LLM_ERROR_MESSAGE
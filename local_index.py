@@ -0,0 +1,495 @@
+import ast
+import json
+import os
+import threading
+from typing import Any, Optional
+
+import numpy as np
+
+# Milvus boolean expressions ("source == 'web' and timestamp < 123",
+# "content_hash in ['a', 'b']", "not (x > 1)") are valid Python expressions,
+# so they are parsed with ``ast`` and evaluated against a whitelist of nodes.
+_COMPARATORS = {
+    ast.Eq: lambda a, b: a == b,
+    ast.NotEq: lambda a, b: a != b,
+    ast.Lt: lambda a, b: a < b,
+    ast.LtE: lambda a, b: a <= b,
+    ast.Gt: lambda a, b: a > b,
+    ast.GtE: lambda a, b: a >= b,
+    ast.In: lambda a, b: a in b,
+    ast.NotIn: lambda a, b: a not in b,
+}
+
+
+def _evaluate(node: ast.AST, row: dict) -> Any:
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body, row)
+    if isinstance(node, ast.BoolOp):
+        values = (_evaluate(value, row) for value in node.values)
+        return all(values) if isinstance(node.op, ast.And) else any(values)
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        return not _evaluate(node.operand, row)
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        return -_evaluate(node.operand, row)
+    if isinstance(node, ast.Compare):
+        left = _evaluate(node.left, row)
+        for op, comparator in zip(node.ops, node.comparators):
+            right = _evaluate(comparator, row)
+            if type(op) not in _COMPARATORS:
+                raise ValueError(f"Unsupported operator in filter: {type(op).__name__}")
+            try:
+                if not _COMPARATORS[type(op)](left, right):
+                    return False
+            except TypeError:
+                return False
+            left = right
+        return True
+    if isinstance(node, ast.Name):
+        if node.id in ("true", "True"):
+            return True
+        if node.id in ("false", "False"):
+            return False
+        return row.get(node.id)
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return [_evaluate(element, row) for element in node.elts]
+    raise ValueError(f"Unsupported filter expression: {ast.dump(node)}")
+
+
+def compile_filter(expr: str):
+    """Returns a row predicate for a Milvus filter expression (or None for no filter)."""
+    if not expr or not expr.strip():
+        return None
+    tree = ast.parse(expr.replace("&&", " and ").replace("||", " or "), mode="eval")
+    return lambda row: bool(_evaluate(tree, row))
+
+
+def _truncate(path: str, size: int):
+    if os.path.getsize(path) > size:
+        with open(path, "r+b") as file:
+            file.truncate(size)
+
+
+class LocalIndexParams(list):
+    """Stand-in for ``MilvusClient.prepare_index_params()``."""
+
+    def add_index(self, field_name: str, **kwargs):
+        self.append({"field_name": field_name, **kwargs})
+
+
+class _LocalCollection:
+    """One collection: a memory-mapped float32 matrix plus a JSONL row log.
+
+    Vectors are appended to ``vectors.f32`` and row fields to ``rows.jsonl``;
+    deletes are appended to the same log as tombstones. On open, the matrix
+    written so far is memory-mapped rather than read, and rows inserted
+    afterwards are kept in an in-memory tail.
+    """
+
+    def __init__(self, path: str, meta: dict):
+        self.path = path
+        self.meta = meta
+        self.dim: int = meta["dim"]
+        self.vector_field: str = meta["vector_field"]
+        self.lock = threading.Lock()
+        self.ids: list[int] = []
+        self.rows: list[Optional[dict]] = []
+        self.positions: dict[int, int] = {}
+        self.base = np.empty((0, self.dim), dtype=np.float32)
+        self.tail: list[np.ndarray] = []
+        self._tail_matrix: Optional[np.ndarray] = None
+        self._alive: Optional[np.ndarray] = None
+        self.next_id = 1
+        self._load()
+
+    @property
+    def metric_type(self) -> str:
+        return self.meta.get("index", {}).get("metric_type", "COSINE")
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _load(self):
+        # Inserts write the vectors before the row records, so an interrupted
+        # insert leaves vectors without rows, a torn last vector, or a torn
+        # last row line. Both files are cut back to the rows fully written,
+        # so that later appends line up again.
+        vector_bytes = self.dim * np.dtype(np.float32).itemsize
+        vectors_path = self._file("vectors.f32")
+        stored_vectors = (
+            os.path.getsize(vectors_path) // vector_bytes if os.path.exists(vectors_path) else 0
+        )
+        rows_path = self._file("rows.jsonl")
+        if os.path.exists(rows_path):
+            with open(rows_path, "rb") as rows_file:
+                offset = 0
+                for line in rows_file:
+                    try:
+                        record = json.loads(line) if line.endswith(b"\n") else None
+                    except json.JSONDecodeError:
+                        record = None
+                    if record is None or (
+                        "$deleted" not in record and len(self.rows) >= stored_vectors
+                    ):
+                        # A torn line, or a row whose vector is missing:
+                        # nothing after it was written
+                        _truncate(rows_path, offset)
+                        break
+                    offset += len(line)
+                    if "$deleted" in record:
+                        for row_id in record["$deleted"]:
+                            position = self.positions.pop(row_id, None)
+                            if position is not None:
+                                self.rows[position] = None
+                        continue
+                    self.positions[record["id"]] = len(self.rows)
+                    self.ids.append(record["id"])
+                    self.rows.append(record)
+                    if isinstance(record["id"], int):
+                        self.next_id = max(self.next_id, record["id"] + 1)
+        if os.path.exists(vectors_path):
+            # Drops vectors whose row never made it to the log
+            _truncate(vectors_path, len(self.rows) * vector_bytes)
+        if self.rows:
+            self.base = np.memmap(
+                vectors_path, dtype=np.float32, mode="r", shape=(len(self.rows), self.dim)
+            )
+
+    def save_meta(self):
+        with open(self._file("meta.json"), "w", encoding="utf-8") as meta_file:
+            json.dump(self.meta, meta_file)
+
+    def _normalize(self, vectors: np.ndarray) -> np.ndarray:
+        if self.metric_type != "COSINE":
+            return vectors
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def _blocks(self) -> list[np.ndarray]:
+        """The stored vectors as [memory-mapped base, in-memory tail], never copied together."""
+        if not self.tail:
+            return [self.base]
+        if self._tail_matrix is None:
+            self._tail_matrix = np.vstack(self.tail)
+            self.tail = [self._tail_matrix]
+        return [self.base, self._tail_matrix]
+
+    def _vector(self, position: int) -> np.ndarray:
+        if position < len(self.base):
+            return self.base[position]
+        return self._blocks()[-1][position - len(self.base)]
+
+    def insert(self, data: list[dict]) -> list[int]:
+        vectors = np.asarray(
+            [row[self.vector_field] for row in data], dtype=np.float32
+        ).reshape(-1, self.dim)
+        vectors = self._normalize(vectors)
+        with self.lock:
+            records = []
+            next_id = self.next_id
+            for row in data:
+                row_id = row.get("id", next_id)
+                if isinstance(row_id, int):
+                    next_id = max(next_id, row_id + 1)
+                record = {k: v for k, v in row.items() if k != self.vector_field}
+                record["id"] = row_id
+                records.append(record)
+            # Vectors first: see _load for how an interrupted insert is undone
+            with open(self._file("vectors.f32"), "ab") as vectors_file:
+                vectors_file.write(vectors.tobytes())
+            with open(self._file("rows.jsonl"), "a", encoding="utf-8") as rows_file:
+                rows_file.write("".join(json.dumps(record) + "\n" for record in records))
+            self.next_id = next_id
+            new_ids = []
+            for record in records:
+                self.positions[record["id"]] = len(self.rows)
+                self.ids.append(record["id"])
+                self.rows.append(record)
+                new_ids.append(record["id"])
+            self.tail.append(vectors)
+            self._tail_matrix = None
+        return new_ids
+
+    def delete(self, predicate) -> int:
+        with self.lock:
+            deleted = [
+                row["id"] for row in self.rows if row is not None and predicate(row)
+            ]
+            for row_id in deleted:
+                self.rows[self.positions.pop(row_id)] = None
+            self._alive = None
+            if deleted:
+                with open(self._file("rows.jsonl"), "a", encoding="utf-8") as rows_file:
+                    rows_file.write(json.dumps({"$deleted": deleted}) + "\n")
+        return len(deleted)
+
+    def _mask(self, predicate) -> np.ndarray:
+        if predicate is None:
+            if self._alive is None or len(self._alive) != len(self.rows):
+                self._alive = np.fromiter(
+                    (row is not None for row in self.rows), dtype=bool, count=len(self.rows)
+                )
+            return self._alive
+        return np.fromiter(
+            (row is not None and predicate(row) for row in self.rows),
+            dtype=bool,
+            count=len(self.rows),
+        )
+
+    def query(self, predicate, output_fields: Optional[list[str]], limit: Optional[int]):
+        results = []
+        for row in self.rows:
+            if row is None or (predicate is not None and not predicate(row)):
+                continue
+            results.append(self._project(row, output_fields))
+            if limit and len(results) >= limit:
+                break
+        return results
+
+    def _project(self, row: dict, output_fields: Optional[list[str]]) -> dict:
+        if not output_fields or "*" in output_fields:
+            return dict(row)
+        projected = {"id": row["id"]}
+        for field in output_fields:
+            if field == self.vector_field:
+                projected[field] = self._vector(self.positions[row["id"]]).tolist()
+            elif field in row:
+                projected[field] = row[field]
+        return projected
+
+    def search(
+        self,
+        queries: np.ndarray,
+        limit: int,
+        predicate,
+        output_fields: Optional[list[str]],
+        params: dict,
+    ) -> list[list[dict]]:
+        with self.lock:
+            blocks = self._blocks()
+            mask = self._mask(predicate)
+            # Scored outside the lock: a concurrent delete must not null out
+            # a row that the mask still selects
+            rows = list(self.rows)
+        if not mask.any():
+            return [[] for _ in queries]
+
+        queries = self._normalize(queries.reshape(-1, self.dim))
+        if self.metric_type == "L2":
+            # Negated squared L2 distance, so that larger is closer for every metric
+            query_norms = (queries * queries).sum(axis=1)[:, None]
+            scores = np.hstack(
+                [
+                    2 * queries @ block.T
+                    - (block * block).sum(axis=1)[None, :]
+                    - query_norms
+                    for block in blocks
+                ]
+            )
+        else:
+            scores = np.hstack([queries @ block.T for block in blocks])
+        scores = np.where(mask, scores, -np.inf)
+
+        results = []
+        k = min(limit, int(mask.sum()))
+        for row_scores in scores:
+            top = np.argpartition(-row_scores, k - 1)[:k]
+            top = top[np.argsort(-row_scores[top])]
+            hits = []
+            for position in top:
+                score = float(row_scores[position])
+                distance = -score if self.metric_type == "L2" else score
+                if not _in_range(distance, params, self.metric_type):
+                    continue
+                row = rows[position]
+                hits.append(
+                    {
+                        "id": row["id"],
+                        "distance": distance,
+                        "entity": self._project(row, output_fields or []),
+                    }
+                )
+            results.append(hits)
+        return results
+
+
+def _in_range(distance: float, params: dict, metric_type: str) -> bool:
+    """Applies Milvus range-search semantics for ``radius`` / ``range_filter``."""
+    radius = params.get("radius")
+    range_filter = params.get("range_filter")
+    if metric_type == "L2":
+        return (radius is None or distance < radius) and (
+            range_filter is None or distance >= range_filter
+        )
+    return (radius is None or distance > radius) and (
+        range_filter is None or distance <= range_filter
+    )
+
+
+class LocalVectorClient:
+    """In-process replacement for the subset of ``MilvusClient`` used here.
+
+    Search is an exact, vectorized dot product over a memory-mapped float32
+    matrix, so small per-device knowledge bases need neither a server nor a
+    network hop. Data persists under ``root_dir``, one directory per
+    collection.
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        os.makedirs(root_dir, exist_ok=True)
+        self.collections: dict[str, _LocalCollection] = {}
+        self.lock = threading.Lock()
+
+    def _path(self, collection_name: str) -> str:
+        return os.path.join(self.root_dir, collection_name)
+
+    def _collection(self, collection_name: str) -> _LocalCollection:
+        with self.lock:
+            collection = self.collections.get(collection_name)
+            if collection is None:
+                meta_path = os.path.join(self._path(collection_name), "meta.json")
+                if not os.path.exists(meta_path):
+                    raise ValueError(f"Collection '{collection_name}' does not exist")
+                with open(meta_path, "r", encoding="utf-8") as meta_file:
+                    meta = json.load(meta_file)
+                collection = _LocalCollection(self._path(collection_name), meta)
+                self.collections[collection_name] = collection
+            return collection
+
+    @staticmethod
+    def prepare_index_params() -> LocalIndexParams:
+        return LocalIndexParams()
+
+    def has_collection(self, collection_name: str, **kwargs) -> bool:
+        return os.path.exists(os.path.join(self._path(collection_name), "meta.json"))
+
+    def drop_collection(self, collection_name: str, **kwargs):
+        with self.lock:
+            self.collections.pop(collection_name, None)
+            path = self._path(collection_name)
+            if os.path.isdir(path):
+                for name in os.listdir(path):
+                    os.remove(os.path.join(path, name))
+                os.rmdir(path)
+
+    def create_collection(
+        self,
+        collection_name: str,
+        dimension: Optional[int] = None,
+        schema=None,
+        index_params: Optional[LocalIndexParams] = None,
+        vector_field_name: str = "vector",
+        metric_type: str = "COSINE",
+        fields: Optional[list[str]] = None,
+        **kwargs,
+    ):
+        """Takes a pymilvus schema, or (without pymilvus) ``dimension``,
+        ``vector_field_name`` and optionally the ``fields`` names."""
+        if schema is not None:
+            fields = [field.name for field in schema.fields]
+            vector = next(field for field in schema.fields if "dim" in (field.params or {}))
+            dimension, vector_field_name = int(vector.params["dim"]), vector.name
+        elif fields is None:
+            fields = ["id", vector_field_name]
+        os.makedirs(self._path(collection_name), exist_ok=True)
+        meta = {
+            "fields": fields,
+            "dim": dimension,
+            "vector_field": vector_field_name,
+            "index": {"index_type": "FLAT", "metric_type": metric_type},
+        }
+        with self.lock:
+            collection = _LocalCollection(self._path(collection_name), meta)
+            collection.save_meta()
+            self.collections[collection_name] = collection
+        if index_params:
+            self.create_index(collection_name, index_params)
+
+    def describe_collection(self, collection_name: str, **kwargs) -> dict:
+        collection = self._collection(collection_name)
+        return {
+            "collection_name": collection_name,
+            "fields": [{"name": name} for name in collection.meta["fields"]],
+        }
+
+    def create_index(self, collection_name: str, index_params: LocalIndexParams, **kwargs):
+        collection = self._collection(collection_name)
+        for index in index_params:
+            if index["field_name"] == collection.vector_field:
+                collection.meta["index"] = {
+                    "index_type": index.get("index_type", "FLAT"),
+                    "metric_type": index.get("metric_type", "COSINE"),
+                    "params": index.get("params", {}),
+                }
+        collection.save_meta()
+
+    def list_indexes(self, collection_name: str, field_name: str = "", **kwargs) -> list[str]:
+        return [self._collection(collection_name).vector_field]
+
+    def describe_index(self, collection_name: str, index_name: str, **kwargs) -> dict:
+        return dict(self._collection(collection_name).meta["index"])
+
+    def drop_index(self, collection_name: str, index_name: str, **kwargs):
+        pass
+
+    def load_collection(self, collection_name: str, **kwargs):
+        self._collection(collection_name)
+
+    def release_collection(self, collection_name: str, **kwargs):
+        pass
+
+    def flush(self, collection_name: str, **kwargs):
+        pass
+
+    def insert(self, collection_name: str, data: list[dict], **kwargs) -> dict:
+        ids = self._collection(collection_name).insert(data)
+        return {"insert_count": len(ids), "ids": ids}
+
+    def upsert(self, collection_name: str, data: list[dict], **kwargs) -> dict:
+        ids = {row["id"] for row in data if "id" in row}
+        if ids:
+            self.delete(collection_name, ids=list(ids))
+        ids = self._collection(collection_name).insert(data)
+        return {"upsert_count": len(ids)}
+
+    def delete(
+        self, collection_name: str, ids: Optional[list] = None, filter: str = "", **kwargs
+    ) -> dict:
+        if ids is not None:
+            id_set = set(ids)
+            predicate = lambda row: row["id"] in id_set  # noqa: E731
+        else:
+            predicate = compile_filter(filter) or (lambda row: True)
+        return {"delete_count": self._collection(collection_name).delete(predicate)}
+
+    def query(
+        self,
+        collection_name: str,
+        filter: str = "",
+        output_fields: Optional[list[str]] = None,
+        limit: Optional[int] = None,
+        **kwargs,
+    ) -> list[dict]:
+        return self._collection(collection_name).query(
+            compile_filter(filter), output_fields, limit
+        )
+
+    def search(
+        self,
+        collection_name: str,
+        data: list,
+        limit: int = 10,
+        output_fields: Optional[list[str]] = None,
+        search_params: Optional[dict] = None,
+        filter: str = "",
+        **kwargs,
+    ) -> list[list[dict]]:
+        return self._collection(collection_name).search(
+            np.asarray(data, dtype=np.float32),
+            limit,
+            compile_filter(filter),
+            output_fields,
+            (search_params or {}).get("params", {}),
+        )
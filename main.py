@@ -1,118 +1,272 @@
+# ruff: noqa: E402 - STARTED is taken before the imports so that the
+# startup report includes them
+import time
+
+STARTED = time.perf_counter()
+
 import asyncio
-import keyboard
+import contextlib
+import logging
 import signal
+from typing import Iterator, Optional
+
+import keyboard
 
-from calendar_service import CalendarService
+from answer_cache import CachedAnswer, SemanticAnswerCache
+from calendar_service import CALENDAR_ERROR_PREFIX, CalendarService
 from config import Config
-from llm_processor import LLMProcessor
+from context_builder import ContextBuilder
+from llm_processor import LLM_ERROR_MESSAGE, LLMProcessor
+from retrieval import ParallelRetriever
+from scheduler import Turn, TurnScheduler
+from startup import StartupReport, warm_up
+from streaming import stream_response
+from telemetry import Trace, annotate, configure_logging, get_telemetry, span
 from vector_search import MilvusWrapper
 from voice_processor import VoiceProcessor
 from web_searcher import WebSearcher
 
+logger = logging.getLogger(__name__)
+
+# The desktop assistant has a single user
+LOCAL_SESSION = "local"
+
 
 class VoiceAssistant:
-    def __init__(self):
-        self.config = Config()
-        self.voice_processor = VoiceProcessor(self.config)
-        self.llm_processor = LLMProcessor(self.config)
-        self.milvus_wrapper = MilvusWrapper(self.config)
-        self.milvus_wrapper.add_sample_data()
-        self.web_searcher = WebSearcher(self.config)
-        self.calendar_service = CalendarService(self.config)
+    """The voice pipeline for one user.
+
+    Every service can be passed in: the desktop app builds its own, while
+    the server shares one set of services between all client sessions and
+    the benchmarks inject local fakes.
+    """
+
+    def __init__(
+        self,
+        config: Optional[Config] = None,
+        voice_processor: Optional[VoiceProcessor] = None,
+        llm_processor: Optional[LLMProcessor] = None,
+        milvus_wrapper: Optional[MilvusWrapper] = None,
+        web_searcher: Optional[WebSearcher] = None,
+        calendar_service: Optional[CalendarService] = None,
+        answer_cache: Optional[SemanticAnswerCache] = None,
+        scheduler: Optional[TurnScheduler] = None,
+        session_id: str = LOCAL_SESSION,
+        startup: Optional[StartupReport] = None,
+    ):
+        # Constructing the services is cheap: connections, model loading and
+        # calendar auth happen on first use or in :meth:`run`'s warm-up.
+        self.config = config or Config()
+        self.startup = startup or StartupReport()
+        self.voice_processor = voice_processor or VoiceProcessor(self.config)
+        self.llm_processor = llm_processor or LLMProcessor(self.config)
+        self.milvus_wrapper = milvus_wrapper or MilvusWrapper(self.config)
+        self.web_searcher = web_searcher or WebSearcher(self.config, self.milvus_wrapper)
+        self.calendar_service = calendar_service or CalendarService(self.config)
+        self.retriever = ParallelRetriever(
+            self.config, self.milvus_wrapper, self.calendar_service, self.web_searcher
+        )
+        if answer_cache is None and self.config.ANSWER_CACHE_ENABLED:
+            answer_cache = SemanticAnswerCache(self.config, self.milvus_wrapper)
+        self.answer_cache = answer_cache
+        self.context_builder = ContextBuilder(self.config)
+        if calendar_service is None and self.answer_cache is not None:
+            # Answers built from the old calendar are stale once it changes
+            self.calendar_service.add_change_listener(
+                lambda: self.answer_cache.invalidate("calendar")
+            )
         self.running = False
         self.loop = asyncio.get_event_loop()
         self.is_transcribing = False 
+        self.session_id = session_id
+        self.scheduler = scheduler or TurnScheduler(self.config, self.handle_turn, loop=self.loop)
+        self.telemetry = get_telemetry(self.config)
 
-    async def process_transcription(self, text: str):
-        print("\n👤 User Query:")
-        print(f"    \"{text}\"")
+    async def process_transcription(self, text: str) -> str:
+        """Answers one user query out loud and returns the answer text."""
+        logger.info(f"\n👤 User Query:\n    \"{text}\"")
 
-        # Search Milvus for similar content
-        print("\n🔍 Searching knowledge base...")
-        milvus_results = self.milvus_wrapper.search_similar_text(text)
-        relevant_results = [result for result in milvus_results if result["distance"] > 0.4]
+        if self.answer_cache:
+            try:
+                with span("answer_cache"):
+                    cached = await self.answer_cache.lookup(text)
+            except Exception as e:
+                logger.warning(f"    ⚠️  Answer cache lookup failed: {e}")
+                cached = None
+            if cached:
+                await self.play_cached_answer(cached)
+                return cached.text
 
-        if relevant_results:
-            print("\n📚 Found relevant information in knowledge base")
-            context = "\n".join([result["text"] for result in milvus_results])
-            print("    Context snippets:")
-            for i, result in enumerate(milvus_results, 1):
-                print(f"    {i}. {result['text'][:100]}...")
+        logger.debug("\n🔍 Searching knowledge base, calendar and web in parallel...")
+        with span("retrieval"):
+            retrieval = await self.retriever.retrieve(text)
+        logger.debug(f"    ⏱️  Retrieval (ms): {retrieval.timings}")
+        if retrieval.cancelled:
+            logger.debug(f"    ✂️  Cancelled: {', '.join(retrieval.cancelled)}")
 
-            augmented_query = f"Context: {context}\n\nUser Query: {text}\n\nPlease answer the user's query based on the given context."
-            llm_response = await self.llm_processor.process_query(augmented_query)
+        if retrieval.knowledge_base:
+            logger.debug("\n📚 Found relevant information in knowledge base")
+            for i, result in enumerate(retrieval.knowledge_base, 1):
+                logger.debug(f"    {i}. {result['text'][:100]}...")
+        if retrieval.calendar:
+            logger.debug("\n📅 Processing calendar-related query...")
+        if retrieval.web:
+            logger.debug("\n🌐 Using web search results")
+            for i, result in enumerate(retrieval.web[: self.config.CONTEXT_WEB_RESULTS], 1):
+                logger.debug(f"    {i}. {result[:100]}...")
+
+        context = self.context_builder.build(text, retrieval)
+        if context.original_tokens:
+            annotate("context_tokens", context.context_tokens)
+            logger.debug(
+                f"    🧮 Context: {context.context_tokens} of {context.original_tokens} tokens, "
+                f"{context.sentences_dropped} sentences trimmed"
+            )
+        else:
+            logger.info("    ⚠️  No relevant results found, using direct LLM response")
+        augmented_query = context.prompt
 
-        # Check for calendar-related queries
-        elif any(keyword in text.lower() for keyword in ["calendar", "schedule", "events", "appointment"]):
-            print("\n📅 Processing calendar-related query...")
-            events = await self.calendar_service.get_upcoming_events()
-            augmented_query = f"Calendar Events:\n{events}\n\nUser Query: {text}\n\nPlease answer the user's query based on their calendar events."
+        audio = []
+        if self.config.STREAM_RESPONSES:
+            llm_response, complete = await self.stream_answer(augmented_query, audio)
+        else:
             llm_response = await self.llm_processor.process_query(augmented_query)
 
-        # Fall back to web search
+            logger.info(f"\n🤖 Assistant Response:\n    \"{llm_response}\"")
+
+            logger.debug("\n🔊 Converting response to speech...")
+            spoken = await self.voice_processor.text_to_speech(llm_response, audio_sink=audio)
+            complete = spoken and llm_response != LLM_ERROR_MESSAGE
+
+        # A cached answer is replayed for every similar question, so one that
+        # was cut short, partly unspoken or built on a calendar error is not kept
+        calendar_failed = bool(retrieval.calendar) and retrieval.calendar.startswith(
+            CALENDAR_ERROR_PREFIX
+        )
+        if self.answer_cache and llm_response and complete and not calendar_failed:
+            kind = "calendar" if retrieval.calendar else "general"
+            try:
+                await self.answer_cache.store(text, llm_response, kind, audio)
+            except Exception as e:
+                logger.warning(f"    ⚠️  Could not cache answer: {e}")
+        return llm_response
+
+    async def play_cached_answer(self, cached: CachedAnswer):
+        logger.info(f"\n⚡ Answer cache hit (similarity {cached.similarity:.3f})")
+        logger.info(f"\n🤖 Assistant Response:\n    \"{cached.text}\"")
+        if cached.audio:
+            self.voice_processor.pause_listening()
+            await self.voice_processor.play_audio(cached.audio)
+            self.voice_processor.announce_ready()
         else:
-            print("\n🌐 Searching the web for information...")
-            web_results = self.web_searcher.search(text)
-
-            if web_results:
-                print("    ✓ Found relevant web results")
-                context = "\n".join(web_results[:3])
-                print("    Web snippets:")
-                for i, result in enumerate(web_results[:3], 1):
-                    print(f"    {i}. {result[:100]}...")
-
-                augmented_query = f"Web search results:\n{context}\n\nUser Query: {text}\n\nPlease answer the user's query based on the web search results."
-                llm_response = await self.llm_processor.process_query(augmented_query)
-            else:
-                print("    ⚠️  No web results found, using direct LLM response")
-                llm_response = await self.llm_processor.process_query(text)
+            await self.voice_processor.text_to_speech(cached.text)
 
-        print("\n🤖 Assistant Response:")
-        print(f"    \"{llm_response}\"")
+    async def stream_answer(
+        self, augmented_query: str, audio_sink: list[bytes]
+    ) -> tuple[str, bool]:
+        """Speaks the answer while it streams; returns it and whether nothing failed."""
+        logger.debug("\n🔊 Streaming response to speech...")
+        self.voice_processor.pause_listening()
 
-        print("\n🔊 Converting response to speech...")
-        await self.voice_processor.text_to_speech(llm_response)
+        llm_response, timings = await stream_response(
+            self.llm_processor,
+            self.voice_processor,
+            augmented_query,
+            queue_size=self.config.TTS_QUEUE_SIZE,
+            audio_sink=audio_sink,
+        )
+
+        logger.info(f"\n🤖 Assistant Response:\n    \"{llm_response}\"")
+        logger.debug(f"    ⏱️  Timings (ms): {timings.report()}")
+        self.voice_processor.announce_ready()
+        return llm_response, not timings.errors
 
     def handle_interrupt(self, signum, frame):
-        print("\nInterrupt received. Stopping transcription...")
+        logger.info("\nInterrupt received. Stopping transcription...")
         self.stop()
 
     def stop(self):
         self.running = False
         self.voice_processor.stop_transcription()
+        logger.info(f"\n📊 Turns: {self.scheduler.stats()}")
+        logger.info(f"\n🌐 Web search: {self.web_searcher.stats()}")
+        logger.info(f"\n⏱️  Stage latency (ms): {self.telemetry.summary()}")
 
     def transcription_callback(self, text: str):
-        asyncio.run_coroutine_threadsafe(self.process_transcription(text), self.loop)
+        # Runs on the transcriber's thread and blocks it while the turn
+        # queue is full.
+        self.scheduler.submit_threadsafe(
+            self.session_id, text, stt_ms=self.voice_processor.last_stt_final_ms
+        )
+
+    @contextlib.contextmanager
+    def trace_turn(self, turn: Turn) -> Iterator[Optional[Trace]]:
+        """Collects the stage timings of ``turn`` into the shared telemetry."""
+        with self.telemetry.turn(self.session_id) as trace:
+            if trace is not None:
+                trace.record("queue_wait", turn.wait_ms)
+                if turn.stt_ms is not None:
+                    trace.record("stt_final", turn.stt_ms)
+            yield trace
+
+    async def handle_turn(self, turn: Turn):
+        if turn.wait_ms:
+            logger.debug(f"\n⏳ Queued for {turn.wait_ms} ms")
+        try:
+            with self.trace_turn(turn):
+                await self.process_transcription(turn.text)
+        except asyncio.CancelledError:
+            if turn.superseded:
+                logger.info("\n✂️  Reply superseded by a newer question")
+            else:
+                logger.info("\n✂️  Reply interrupted")
+                self.voice_processor.announce_ready()
+            raise
+
+    def barge_in_callback(self):
+        # Runs on the microphone thread; cancelling the turn stops the LLM
+        # stream, pending TTS requests and playback together.
+        self.loop.call_soon_threadsafe(self.barge_in)
+
+    def barge_in(self):
+        if self.scheduler.cancel_current(self.session_id):
+            logger.info("\n✋ Barge-in detected")
 
     async def toggle_transcription(self):
         self.is_transcribing = not self.is_transcribing
         if self.is_transcribing:
-            print("\n🎙️ Started recording...")
+            logger.info("\n🎙️ Started recording...")
             await self.voice_processor.start_continuous_transcription()
         else:
-            print("\n⏹️  Stopped recording...")
+            logger.info("\n⏹️  Stopped recording...")
             self.voice_processor.stop_transcription()
         
     async def run(self):
         self.voice_processor.set_transcription_callback(self.transcription_callback)
+        self.voice_processor.set_barge_in_callback(self.barge_in_callback)
         signal.signal(signal.SIGINT, self.handle_interrupt)
 
-        print("\n🚀 Voice Assistant Started")
-        print("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
-        print("    Press SPACE to toggle recording")
-        print("    Press Ctrl+C to exit")
-        print("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n")
-        
-    async def run(self):
-        self.voice_processor.set_transcription_callback(self.transcription_callback)
-        signal.signal(signal.SIGINT, self.handle_interrupt)
+        logger.info("\n🚀 Voice Assistant Started")
+        logger.info("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
+        logger.info("    Press SPACE to toggle recording")
+        logger.info("    Press Ctrl+C to exit")
+        logger.info("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n")
 
-        print("Starting voice assistant. Press SPACE to toggle recording. Press Ctrl+C to exit.")
-        
         def on_space_press():
             asyncio.run_coroutine_threadsafe(self.toggle_transcription(), self.loop)
 
         keyboard.on_press_key('space', lambda _: on_space_press())
+
+        self.startup.ready()
+        self.warm_up_task = asyncio.create_task(
+            warm_up(
+                self.config,
+                self.startup,
+                milvus_wrapper=self.milvus_wrapper,
+                answer_cache=self.answer_cache,
+                llm_processor=self.llm_processor,
+                voice_processor=self.voice_processor,
+            )
+        )
         
         self.running = True
         while self.running:
@@ -120,7 +274,12 @@ class VoiceAssistant:
 
 
 async def main():
-    assistant = VoiceAssistant()
+    config = Config()
+    configure_logging(config)
+    startup = StartupReport(STARTED)
+    startup.record("imports", STARTED)
+    with startup.step("services"):
+        assistant = VoiceAssistant(config, startup=startup)
     await assistant.run()
 
 
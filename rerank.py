@@ -0,0 +1,92 @@
+import math
+import re
+from collections import Counter
+
+_TOKEN = re.compile(r"\w+")
+
+# Too common to say anything about relevance
+STOPWORDS = frozenset(
+    "a an and are as at be by do does for from how i in is it me my of on or "
+    "the to was what when where which who why with you".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def bm25_scores(
+    query: str, documents: list[str], k1: float = 1.5, b: float = 0.75
+) -> list[float]:
+    """Okapi BM25 of ``query`` against each document, with IDF over ``documents``.
+
+    Meant for re-ranking a handful of vector-search candidates, so the
+    statistics come from the candidates themselves rather than the corpus.
+    """
+    tokenized = [tokenize(document) for document in documents]
+    if not tokenized:
+        return []
+    average_length = sum(len(tokens) for tokens in tokenized) / len(tokenized) or 1.0
+    document_frequency = Counter(token for tokens in tokenized for token in set(tokens))
+    query_terms = set(tokenize(query))
+
+    scores = []
+    for tokens in tokenized:
+        counts = Counter(tokens)
+        score = 0.0
+        for term in query_terms:
+            frequency = counts.get(term)
+            if not frequency:
+                continue
+            df = document_frequency[term]
+            idf = math.log(1 + (len(tokenized) - df + 0.5) / (df + 0.5))
+            score += idf * frequency * (k1 + 1) / (
+                frequency + k1 * (1 - b + b * len(tokens) / average_length)
+            )
+        scores.append(score)
+    return scores
+
+
+def jaccard(a: set[str], b: set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def dedupe(hits: list[dict], threshold: float) -> list[dict]:
+    """Drops hits whose words overlap an earlier (better) hit by ``threshold`` or more.
+
+    Overlapping chunks of the same document and documents ingested twice
+    would otherwise fill the prompt with the same sentences.
+    """
+    kept, kept_tokens = [], []
+    for hit in hits:
+        tokens = set(tokenize(hit["text"]))
+        if any(jaccard(tokens, seen) >= threshold for seen in kept_tokens):
+            continue
+        kept.append(hit)
+        kept_tokens.append(tokens)
+    return kept
+
+
+def hybrid_rerank(query: str, hits: list[dict], bm25_weight: float) -> list[dict]:
+    """Orders hits by dense similarity blended with keyword (BM25) relevance.
+
+    BM25 is scaled to [0, 1] by the best candidate before blending, so
+    ``bm25_weight`` is the share of the final score given to exact term
+    matches. Each hit gains a ``score``; ``distance`` keeps the vector
+    similarity the relevance threshold is defined on.
+    """
+    if not hits:
+        return hits
+    keyword = bm25_scores(query, [hit["text"] for hit in hits])
+    best = max(keyword) or 1.0
+    reranked = [
+        {
+            **hit,
+            "score": (1 - bm25_weight) * hit["distance"] + bm25_weight * score / best,
+        }
+        for hit, score in zip(hits, keyword)
+    ]
+    reranked.sort(key=lambda hit: hit["score"], reverse=True)
+    return reranked
@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Optional
+
+from calendar_service import CALENDAR_ERROR_PREFIX
+from config import Config
+from telemetry import record
+
+logger = logging.getLogger(__name__)
+
+CALENDAR_KEYWORDS = ["calendar", "schedule", "events", "appointment", "meeting"]
+
+# Highest priority first: a knowledge-base hit beats the calendar, which
+# beats the web.
+SOURCE_PRIORITY = ["knowledge_base", "calendar", "web"]
+
+
+def is_calendar_query(text: str) -> bool:
+    return any(keyword in text.lower() for keyword in CALENDAR_KEYWORDS)
+
+
+@dataclass
+class SourceResult:
+    source: str
+    value: Any = None
+    error: Optional[str] = None
+    elapsed_ms: float = 0.0
+
+
+@dataclass
+class RetrievalResult:
+    source: str  # "knowledge_base", "calendar", "web", "merged" or "none"
+    knowledge_base: list[dict] = field(default_factory=list)
+    calendar: Optional[str] = None
+    web: list[str] = field(default_factory=list)
+    timings: dict[str, float] = field(default_factory=dict)
+    cancelled: list[str] = field(default_factory=list)
+
+
+class ParallelRetriever:
+    """Queries the knowledge base, calendar and web concurrently.
+
+    Every source runs under its own deadline. With the "priority" policy
+    the highest-priority source that returns something usable wins as soon
+    as all sources above it have answered (or missed), and the remaining
+    lookups are cancelled; a KB miss therefore no longer delays the web
+    search by a full Milvus round trip. The "merge" policy waits for every
+    source and returns all usable results.
+    """
+
+    def __init__(self, config: Config, milvus_wrapper, calendar_service, web_searcher):
+        self.config = config
+        self.milvus_wrapper = milvus_wrapper
+        self.calendar_service = calendar_service
+        self.web_searcher = web_searcher
+        self.deadlines = {
+            "knowledge_base": config.KB_DEADLINE,
+            "calendar": config.CALENDAR_DEADLINE,
+            "web": config.WEB_DEADLINE,
+        }
+
+    def _relevant(self, hits: list[dict]) -> list[dict]:
+        return [hit for hit in hits if hit["distance"] > self.config.KB_RELEVANCE_THRESHOLD]
+
+    def _usable(self, result: SourceResult) -> bool:
+        if result.error or not result.value:
+            return False
+        if result.source == "knowledge_base":
+            return bool(self._relevant(result.value))
+        if result.source == "calendar":
+            return not result.value.startswith(CALENDAR_ERROR_PREFIX)
+        return True
+
+    async def _run_source(self, source: str, lookup: Awaitable) -> SourceResult:
+        started = time.perf_counter()
+        try:
+            value = await asyncio.wait_for(lookup, self.deadlines[source])
+            result = SourceResult(source, value=value)
+        except asyncio.TimeoutError:
+            result = SourceResult(source, error=f"deadline of {self.deadlines[source]}s exceeded")
+        except Exception as e:
+            result = SourceResult(source, error=str(e))
+        result.elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        record(source, result.elapsed_ms)
+        return result
+
+    async def _web_lookup(self, text: str) -> list[str]:
+        # Optional hedge: give the knowledge base a head start before paying
+        # for a web request that is discarded on a KB hit.
+        if self.config.WEB_SPECULATION_DELAY:
+            await asyncio.sleep(self.config.WEB_SPECULATION_DELAY)
+        return await self.web_searcher.asearch(text)
+
+    def _decide(self, tasks: dict[str, asyncio.Task]) -> Optional[str]:
+        """Returns the winning source, "none", or None while undecided."""
+        for source in SOURCE_PRIORITY:
+            task = tasks.get(source)
+            if task is None:
+                continue
+            if not task.done():
+                return None
+            if self._usable(task.result()):
+                return source
+        return "none"
+
+    async def retrieve(self, text: str) -> RetrievalResult:
+        lookups = {
+            "knowledge_base": self.milvus_wrapper.asearch_similar_text(
+                text, limit=self.config.KB_SEARCH_LIMIT
+            ),
+            "web": self._web_lookup(text),
+        }
+        if is_calendar_query(text):
+            lookups["calendar"] = self.calendar_service.get_events_for_query(text)
+
+        tasks = {
+            source: asyncio.create_task(self._run_source(source, lookup))
+            for source, lookup in lookups.items()
+        }
+        try:
+            if self.config.RETRIEVAL_POLICY == "merge":
+                await asyncio.wait(tasks.values())
+                winner = "merged"
+            else:
+                pending = set(tasks.values())
+                winner = self._decide(tasks)
+                while winner is None:
+                    _, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    winner = self._decide(tasks)
+        finally:
+            cancelled = [source for source, task in tasks.items() if not task.done()]
+            for source in cancelled:
+                tasks[source].cancel()
+
+        finished = {
+            source: task.result()
+            for source, task in tasks.items()
+            if task.done() and not task.cancelled()
+        }
+        result = RetrievalResult(
+            source=winner,
+            timings={source: r.elapsed_ms for source, r in finished.items()},
+            cancelled=cancelled,
+        )
+        for source, source_result in finished.items():
+            if source_result.error:
+                logger.warning(f"    ⚠️  {source} lookup failed: {source_result.error}")
+            if winner not in (source, "merged") or not self._usable(source_result):
+                continue
+            value = source_result.value
+            if source == "knowledge_base":
+                # Only hits above the threshold are worth prompt tokens
+                value = self._relevant(value)
+            setattr(result, source, value)
+        if result.web:
+            # Only results a turn actually used are worth a place in the knowledge base
+            self.web_searcher.keep_results(text)
+        return result
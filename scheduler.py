@@ -0,0 +1,202 @@
+import asyncio
+import concurrent.futures
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+import numpy as np
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Turn:
+    session_id: str
+    text: str
+    # Time from the end of speech to the final transcript, when known
+    stt_ms: Optional[float] = None
+    enqueued_at: float = field(default_factory=time.perf_counter)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    task: Optional[asyncio.Task] = None
+    superseded: bool = False
+
+    @property
+    def wait_ms(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return round((self.started_at - self.enqueued_at) * 1000, 1)
+
+
+class _Session:
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue[Turn] = asyncio.Queue(queue_size)
+        self.current: Optional[Turn] = None
+        self.worker: Optional[asyncio.Task] = None
+
+
+class TurnScheduler:
+    """Runs the turns of each session one at a time, in order.
+
+    Every session has a bounded queue drained by its own worker, and at
+    most ``TURN_MAX_CONCURRENT`` turns run at once across sessions. With
+    ``TURN_SUPERSEDE`` a new utterance cancels the session's running turn
+    and drops the ones still queued, since the user has moved on. A full
+    queue makes :meth:`submit` wait, which blocks the transcriber callback
+    that called :meth:`submit_threadsafe` up to ``TURN_SUBMIT_TIMEOUT``;
+    after that the turn is rejected.
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        handler: Callable[[Turn], Awaitable],
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ):
+        self.config = config
+        self.handler = handler
+        self.loop = loop
+        self.sessions: dict[str, _Session] = {}
+        self.concurrency = asyncio.Semaphore(config.TURN_MAX_CONCURRENT)
+        self.counts = {
+            "submitted": 0,
+            "completed": 0,
+            "superseded": 0,
+            "cancelled": 0,
+            "failed": 0,
+            "rejected": 0,
+        }
+        self.max_depth = 0
+        self.wait_times: deque[float] = deque(maxlen=1000)
+        self.run_times: deque[float] = deque(maxlen=1000)
+
+    def _session(self, session_id: str) -> _Session:
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = _Session(self.config.TURN_QUEUE_SIZE)
+            session.worker = asyncio.create_task(self._work(session))
+            self.sessions[session_id] = session
+        return session
+
+    def depth(self) -> int:
+        """Turns waiting or running, across all sessions."""
+        return sum(
+            session.queue.qsize() + (session.current is not None)
+            for session in self.sessions.values()
+        )
+
+    async def submit(self, session_id: str, text: str, stt_ms: Optional[float] = None) -> Turn:
+        session = self._session(session_id)
+        if self.config.TURN_SUPERSEDE:
+            self._supersede(session)
+        turn = Turn(session_id, text, stt_ms)
+        await session.queue.put(turn)
+        self.counts["submitted"] += 1
+        self.max_depth = max(self.max_depth, self.depth())
+        return turn
+
+    def submit_threadsafe(
+        self, session_id: str, text: str, stt_ms: Optional[float] = None
+    ) -> bool:
+        """Submits from a transcriber thread; returns False if the turn was rejected."""
+        try:
+            on_loop = asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            # Waiting here would block the loop the submit has to run on
+            self.loop.create_task(self.submit(session_id, text, stt_ms))
+            return True
+        future = asyncio.run_coroutine_threadsafe(
+            self.submit(session_id, text, stt_ms), self.loop
+        )
+        try:
+            future.result(self.config.TURN_SUBMIT_TIMEOUT)
+            return True
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            self.counts["rejected"] += 1
+            logger.warning(f"\n⚠️  Turn queue full, dropped: \"{text}\"")
+            return False
+
+    def _supersede(self, session: _Session):
+        while not session.queue.empty():
+            stale = session.queue.get_nowait()
+            stale.superseded = True
+            self.counts["superseded"] += 1
+        current = session.current
+        if current and not (current.task and current.task.done()):
+            current.superseded = True
+            if current.task:
+                current.task.cancel()
+
+    def cancel_current(self, session_id: str) -> bool:
+        """Cancels the session's running turn (e.g. on barge-in); True if there was one."""
+        session = self.sessions.get(session_id)
+        if not session or not session.current or not session.current.task:
+            return False
+        if session.current.task.done():
+            return False
+        session.current.task.cancel()
+        return True
+
+    async def _work(self, session: _Session):
+        while True:
+            turn = await session.queue.get()
+            # Visible to _supersede while it waits for a concurrency slot
+            session.current = turn
+            async with self.concurrency:
+                if turn.superseded:
+                    self.counts["superseded"] += 1
+                    session.current = None
+                    continue
+                turn.started_at = time.perf_counter()
+                self.wait_times.append(turn.started_at - turn.enqueued_at)
+                turn.task = asyncio.create_task(self.handler(turn))
+                try:
+                    await turn.task
+                    self.counts["completed"] += 1
+                except asyncio.CancelledError:
+                    if asyncio.current_task().cancelling():
+                        # The worker itself is being shut down
+                        turn.task.cancel()
+                        raise
+                    self.counts["superseded" if turn.superseded else "cancelled"] += 1
+                except Exception as e:
+                    self.counts["failed"] += 1
+                    logger.error(f"\n❌ Turn failed: {e}")
+                finally:
+                    turn.finished_at = time.perf_counter()
+                    self.run_times.append(turn.finished_at - turn.started_at)
+                    session.current = None
+
+    async def close_session(self, session_id: str):
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            return
+        session.worker.cancel()
+        await asyncio.gather(session.worker, return_exceptions=True)
+
+    async def close(self):
+        for session_id in list(self.sessions):
+            await self.close_session(session_id)
+
+    @staticmethod
+    def _percentiles(samples) -> dict[str, float]:
+        if not samples:
+            return {"p50": 0.0, "p95": 0.0}
+        p50, p95 = np.percentile(np.asarray(samples) * 1000, [50, 95])
+        return {"p50": round(float(p50), 1), "p95": round(float(p95), 1)}
+
+    def stats(self) -> dict:
+        return {
+            **self.counts,
+            "depth": self.depth(),
+            "max_depth": self.max_depth,
+            "wait_ms": self._percentiles(self.wait_times),
+            "run_ms": self._percentiles(self.run_times),
+        }
@@ -0,0 +1,264 @@
+"""WebSocket server running the voice pipeline for many clients at once.
+
+Clients connect to ``ws://HOST:PORT/`` and send 16 kHz 16-bit mono PCM as
+binary messages. The server replies with JSON text events
+
+    {"type": "ready", "session_id": ...}
+    {"type": "transcript", "text": ..., "final": bool}
+    {"type": "turn", "text": ...}          a turn started
+    {"type": "audio_start"} / {"type": "audio_end"}
+    {"type": "reply", "text": ...}         a turn finished
+    {"type": "interrupted"}                a turn was cancelled
+
+and the spoken reply as binary MP3 chunks between ``audio_start`` and
+``audio_end``. A client can also send ``{"type": "query", "text": ...}`` to
+skip speech recognition, or ``{"type": "end_utterance"}``.
+``GET /healthz`` returns session and scheduler statistics, and
+``GET /metrics`` the per-stage latency histograms in the Prometheus format.
+
+Run with ``python server.py --host 0.0.0.0 --port 8765``.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import uuid
+from dataclasses import dataclass
+from http import HTTPStatus
+from typing import Any, AsyncIterator, Callable
+
+from elevenlabs import AsyncElevenLabs
+from websockets.asyncio.server import ServerConnection, serve
+from websockets.exceptions import ConnectionClosed
+
+from answer_cache import SemanticAnswerCache
+from calendar_service import CalendarService
+from config import Config
+from llm_processor import LLMProcessor
+from main import VoiceAssistant
+from scheduler import Turn, TurnScheduler
+from startup import StartupReport, warm_up
+from stt import Transcript, create_transcriber
+from telemetry import configure_logging, get_telemetry, span
+from tts_cache import TTSCache
+from vector_search import MilvusWrapper
+from voice_processor import VoiceProcessor
+from web_searcher import WebSearcher
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SharedServices:
+    """Services shared by every client session."""
+
+    llm_processor: Any
+    milvus_wrapper: Any
+    web_searcher: Any
+    calendar_service: Any
+    answer_cache: Any
+    elevenlabs: Any
+    tts_cache: TTSCache
+    transcriber_factory: Callable = create_transcriber
+
+    @classmethod
+    def create(cls, config: Config) -> "SharedServices":
+        # Nothing connects here: see ``startup.warm_up``
+        milvus_wrapper = MilvusWrapper(config)
+        calendar_service = CalendarService(config)
+        answer_cache = None
+        if config.ANSWER_CACHE_ENABLED:
+            answer_cache = SemanticAnswerCache(config, milvus_wrapper)
+            calendar_service.add_change_listener(lambda: answer_cache.invalidate("calendar"))
+        return cls(
+            llm_processor=LLMProcessor(config),
+            milvus_wrapper=milvus_wrapper,
+            web_searcher=WebSearcher(config, milvus_wrapper),
+            calendar_service=calendar_service,
+            answer_cache=answer_cache,
+            elevenlabs=AsyncElevenLabs(api_key=config.ELEVENLABS_API_KEY),
+            tts_cache=TTSCache(config),
+        )
+
+
+class SessionVoice(VoiceProcessor):
+    """Speech in and out over a client's WebSocket instead of the local mic and speakers."""
+
+    def __init__(
+        self,
+        config: Config,
+        services: SharedServices,
+        websocket: ServerConnection,
+        loop: asyncio.AbstractEventLoop,
+    ):
+        super().__init__(config, elevenlabs=services.elevenlabs, tts_cache=services.tts_cache)
+        self.transcriber_factory = services.transcriber_factory
+        self.websocket = websocket
+        self.loop = loop
+
+    async def send_event(self, event: dict):
+        try:
+            await self.websocket.send(json.dumps(event))
+        except ConnectionClosed:
+            pass
+
+    def send_event_threadsafe(self, event: dict):
+        asyncio.run_coroutine_threadsafe(self.send_event(event), self.loop)
+
+    def on_data(self, transcript: Transcript):
+        super().on_data(transcript)
+        if transcript.text:
+            self.send_event_threadsafe(
+                {"type": "transcript", "text": transcript.text, "final": transcript.is_final}
+            )
+
+    async def play_stream(self, chunks: AsyncIterator[bytes]):
+        self.speaking.set()
+        await self.send_event({"type": "audio_start"})
+        try:
+            with span("playback"):
+                async for chunk in chunks:
+                    await self.websocket.send(bytes(chunk))
+        except ConnectionClosed:
+            pass
+        finally:
+            self.speaking.clear()
+            await self.send_event({"type": "audio_end"})
+
+
+class ClientSession:
+    def __init__(self, server: "VoiceServer", websocket: ServerConnection):
+        self.id = uuid.uuid4().hex[:12]
+        self.server = server
+        self.websocket = websocket
+        config, services = server.config, server.services
+        self.voice = SessionVoice(config, services, websocket, asyncio.get_running_loop())
+        self.assistant = VoiceAssistant(
+            config,
+            voice_processor=self.voice,
+            llm_processor=services.llm_processor,
+            milvus_wrapper=services.milvus_wrapper,
+            web_searcher=services.web_searcher,
+            calendar_service=services.calendar_service,
+            answer_cache=services.answer_cache,
+            scheduler=server.scheduler,
+            session_id=self.id,
+        )
+        self.voice.set_transcription_callback(self.assistant.transcription_callback)
+        self.voice.set_barge_in_callback(self.assistant.barge_in_callback)
+
+    async def run(self):
+        # Connecting to a hosted STT service blocks on its handshake
+        await self.voice.executor.run("audio", self.voice.connect_transcriber)
+        await self.voice.send_event({"type": "ready", "session_id": self.id})
+        async for message in self.websocket:
+            if isinstance(message, bytes):
+                self.voice.feed_audio(message)
+                continue
+            event = json.loads(message)
+            if event.get("type") == "query":
+                await self.server.scheduler.submit(self.id, event["text"])
+            elif event.get("type") == "end_utterance":
+                self.voice._end_utterance()
+
+    async def run_turn(self, turn: Turn):
+        await self.voice.send_event({"type": "turn", "text": turn.text})
+        try:
+            with self.assistant.trace_turn(turn):
+                reply = await self.assistant.process_transcription(turn.text)
+        except asyncio.CancelledError:
+            await self.voice.send_event({"type": "interrupted"})
+            raise
+        await self.voice.send_event({"type": "reply", "text": reply})
+
+    async def close(self):
+        await self.server.scheduler.close_session(self.id)
+        await self.voice.executor.run("audio", self.voice.stop_transcription)
+
+
+class VoiceServer:
+    """Runs one :class:`ClientSession` per connection on shared services.
+
+    All sessions share a single :class:`TurnScheduler`, so turns are ordered
+    per client and ``TURN_MAX_CONCURRENT`` bounds the pipelines running at
+    once across clients.
+    """
+
+    def __init__(self, config: Config, services: SharedServices):
+        self.config = config
+        self.services = services
+        self.sessions: dict[str, ClientSession] = {}
+        self.scheduler = TurnScheduler(config, self.run_turn, loop=asyncio.get_running_loop())
+
+    async def run_turn(self, turn: Turn):
+        session = self.sessions.get(turn.session_id)
+        if session is not None:
+            await session.run_turn(turn)
+
+    async def handle_client(self, websocket: ServerConnection):
+        session = ClientSession(self, websocket)
+        self.sessions[session.id] = session
+        logger.info(f"\n🔌 Client connected: {session.id} ({len(self.sessions)} active)")
+        try:
+            await session.run()
+        except ConnectionClosed:
+            pass
+        finally:
+            self.sessions.pop(session.id, None)
+            await session.close()
+            logger.info(f"\n🔌 Client disconnected: {session.id} ({len(self.sessions)} active)")
+
+    def process_request(self, connection: ServerConnection, request):
+        if request.path == "/healthz":
+            body = json.dumps({"sessions": len(self.sessions), "turns": self.scheduler.stats()})
+            return connection.respond(HTTPStatus.OK, body + "\n")
+        if request.path == "/metrics":
+            return connection.respond(HTTPStatus.OK, get_telemetry(self.config).prometheus())
+        return None
+
+    async def serve(self, host: str, port: int, ready: asyncio.Event = None):
+        async with serve(
+            self.handle_client, host, port, process_request=self.process_request
+        ) as server:
+            logger.info(f"\n🚀 Voice server listening on ws://{host}:{port}")
+            if ready is not None:
+                ready.set()
+            await server.serve_forever()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Serve the voice assistant over WebSockets")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    config = Config()
+    configure_logging(config)
+    startup = StartupReport()
+    with startup.step("services"):
+        services = SharedServices.create(config)
+    server = VoiceServer(config, services)
+
+    # Accept connections first; the services warm up while clients connect
+    ready = asyncio.Event()
+    serving = asyncio.create_task(server.serve(args.host, args.port, ready))
+    await ready.wait()
+    startup.ready()
+    warm_up_task = asyncio.create_task(
+        warm_up(
+            config,
+            startup,
+            milvus_wrapper=services.milvus_wrapper,
+            answer_cache=services.answer_cache,
+            llm_processor=services.llm_processor,
+        )
+    )
+    try:
+        await serving
+    finally:
+        warm_up_task.cancel()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+import asyncio
+import contextlib
+import logging
+import time
+from typing import Awaitable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StartupReport:
+    """How long each startup step took, and when the assistant became ready.
+
+    Steps run in the foreground (``step``) or as concurrent background
+    warm-ups (``run``); a failed warm-up is reported, not raised, since the
+    service will retry on first use.
+    """
+
+    def __init__(self, started: Optional[float] = None):
+        self.started = started or time.perf_counter()
+        self.steps: dict[str, float] = {}
+        self.failures: dict[str, str] = {}
+        self.ready_at: Optional[float] = None
+
+    def _elapsed_ms(self, since: float) -> float:
+        return round((time.perf_counter() - since) * 1000, 1)
+
+    def record(self, name: str, since: float):
+        self.steps[name] = self._elapsed_ms(since)
+
+    @contextlib.contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, started)
+
+    async def run(self, name: str, awaitable: Awaitable):
+        started = time.perf_counter()
+        try:
+            await awaitable
+        except Exception as e:
+            self.failures[name] = str(e)
+            logger.warning(f"    ⚠️  Warm-up of {name} failed: {e}")
+        finally:
+            self.record(name, started)
+
+    def ready(self):
+        self.ready_at = time.perf_counter()
+        logger.info(f"    ✓ Ready in {self._elapsed_ms(self.started):.0f} ms")
+
+    def report(self) -> dict:
+        return {
+            "ready_ms": (
+                round((self.ready_at - self.started) * 1000, 1) if self.ready_at else None
+            ),
+            "steps_ms": dict(self.steps),
+            "failed": dict(self.failures),
+        }
+
+
+async def warm_up(
+    config,
+    report: StartupReport,
+    milvus_wrapper=None,
+    answer_cache=None,
+    llm_processor=None,
+    voice_processor=None,
+):
+    """Prepares services in the background, concurrently, after the assistant is ready.
+
+    Everything here would otherwise happen on first use. The calendar is
+    left alone: it authenticates on the first calendar question.
+    """
+
+    async def knowledge_base():
+        await report.run("milvus_connect", milvus_wrapper.aconnect())
+        # Embeds only sample texts that are not stored yet
+        await report.run(
+            "sample_data",
+            milvus_wrapper.executor.run("milvus", milvus_wrapper.add_sample_data, timeout=120),
+        )
+        if answer_cache is not None:
+            await report.run("answer_cache", answer_cache.aconnect())
+
+    warm_ups = []
+    if milvus_wrapper is not None:
+        warm_ups.append(knowledge_base())
+    if llm_processor is not None:
+        warm_ups.append(report.run("llm_load", llm_processor.warm_up()))
+    if voice_processor is not None and config.TTS_PREWARM:
+        warm_ups.append(report.run("tts_prewarm", voice_processor.prewarm_tts()))
+
+    await asyncio.gather(*warm_ups)
+    logger.info(f"\n🧰 Startup (ms): {report.report()}")
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Optional
+
+from llm_processor import LLM_ERROR_MESSAGE
+from telemetry import mark
+
+logger = logging.getLogger(__name__)
+
+# A sentence ends at terminal punctuation (optionally followed by closing
+# quotes/brackets) and whitespace, or at a line break. Requiring the trailing
+# whitespace keeps "3.5" or "e.g." mid-token from being split early.
+_SENTENCE_BOUNDARY = re.compile(r"[.!?…]+[\"')\]]*\s+|\n+")
+
+
+@dataclass
+class StreamTimings:
+    started: float = field(default_factory=time.perf_counter)
+    first_token: Optional[float] = None
+    first_sentence: Optional[float] = None
+    first_audio: Optional[float] = None
+    finished: Optional[float] = None
+    # Stages that failed during the turn: "llm" and/or "tts"
+    errors: list[str] = field(default_factory=list)
+
+    def mark(self, stage: str):
+        if getattr(self, stage) is None:
+            setattr(self, stage, time.perf_counter())
+
+    def report(self) -> dict[str, Optional[float]]:
+        """Milliseconds from the start of the turn to each stage."""
+        stages = ["first_token", "first_sentence", "first_audio", "finished"]
+        return {
+            stage: None
+            if getattr(self, stage) is None
+            else round((getattr(self, stage) - self.started) * 1000, 1)
+            for stage in stages
+        }
+
+
+def _next_boundary(buffer: str, min_chars: int) -> Optional[re.Match]:
+    for match in _SENTENCE_BOUNDARY.finditer(buffer):
+        if match.start() >= min_chars:
+            return match
+    return None
+
+
+async def split_sentences(
+    tokens: AsyncIterator[str], min_chars: int = 20
+) -> AsyncIterator[str]:
+    """Regroups an LLM token stream into sentences.
+
+    Fragments shorter than ``min_chars`` are merged with the following
+    sentence so that TTS is not called for every "Yes." or "Sure!".
+    """
+    buffer = ""
+    async for token in tokens:
+        buffer += token
+        while match := _next_boundary(buffer, min_chars):
+            sentence = buffer[: match.end()].strip()
+            buffer = buffer[match.end() :]
+            if sentence:
+                yield sentence
+
+    if buffer.strip():
+        yield buffer.strip()
+
+
+async def stream_response(
+    llm_processor,
+    voice_processor,
+    query: str,
+    queue_size: int = 32,
+    audio_sink: Optional[list[bytes]] = None,
+) -> tuple[str, StreamTimings]:
+    """Speaks the LLM answer sentence by sentence while it is being generated.
+
+    Three stages run concurrently: the LLM token stream is split into
+    sentences, each sentence is synthesized as soon as it is complete, and
+    the resulting audio chunks are played through a bounded queue.
+    Returns the full response text and the per-stage timings, whose
+    ``errors`` name the stages that failed (the answer was then cut short
+    or partly unspoken); played audio chunks are also appended to
+    ``audio_sink`` when one is given.
+    """
+    timings = StreamTimings()
+    sentences: asyncio.Queue = asyncio.Queue()
+    audio: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    spoken = []
+
+    async def tokens():
+        async for token in llm_processor.stream_query(query):
+            timings.mark("first_token")
+            mark("llm_first_token")
+            yield token
+        mark("llm_last_token")
+
+    async def produce_sentences():
+        try:
+            async for sentence in split_sentences(tokens()):
+                timings.mark("first_sentence")
+                spoken.append(sentence)
+                await sentences.put(sentence)
+        except Exception as e:
+            logger.error(f"Error processing query with LLM: {e}")
+            timings.errors.append("llm")
+            spoken.append(LLM_ERROR_MESSAGE)
+            await sentences.put(LLM_ERROR_MESSAGE)
+        finally:
+            await sentences.put(None)
+
+    async def synthesize_sentences():
+        try:
+            while (sentence := await sentences.get()) is not None:
+                try:
+                    async for chunk in voice_processor.synthesize(sentence):
+                        await audio.put(chunk)
+                except Exception as e:
+                    logger.error(f"    ❌ Text-to-Speech Error: {e}")
+                    if "tts" not in timings.errors:
+                        timings.errors.append("tts")
+        finally:
+            await audio.put(None)
+
+    async def audio_chunks():
+        while (chunk := await audio.get()) is not None:
+            timings.mark("first_audio")
+            if audio_sink is not None:
+                audio_sink.append(chunk)
+            yield chunk
+
+    async with asyncio.TaskGroup() as group:
+        group.create_task(produce_sentences())
+        group.create_task(synthesize_sentences())
+        group.create_task(voice_processor.play_stream(audio_chunks()))
+
+    timings.mark("finished")
+    return " ".join(spoken), timings
+
+
+async def buffered_response(
+    llm_processor, voice_processor, query: str
+) -> tuple[str, StreamTimings]:
+    """The non-streaming baseline: full LLM answer, then full TTS, then playback."""
+    timings = StreamTimings()
+    tokens = []
+    async for token in llm_processor.stream_query(query):
+        timings.mark("first_token")
+        tokens.append(token)
+    text = "".join(tokens)
+    timings.mark("first_sentence")
+
+    audio = [chunk async for chunk in voice_processor.synthesize(text)]
+
+    async def replay():
+        for chunk in audio:
+            timings.mark("first_audio")
+            yield chunk
+
+    await voice_processor.play_stream(replay())
+    timings.mark("finished")
+    return text, timings
+
+
+if __name__ == "__main__":
+    # Mocked harness: a fake LLM emitting ~25 tokens/s and a fake TTS with a
+    # fixed time-to-first-byte plus per-character synthesis cost.
+
+    class FakeLLM:
+        answer = (
+            "Milvus is an open-source vector database. "
+            "It was built for GenAI applications and similarity search. "
+            "It supports HNSW, IVF and DiskANN indexes. "
+            "Most of its search engine is written in C++ for speed."
+        )
+
+        async def stream_query(self, query: str):
+            for word in self.answer.split(" "):
+                await asyncio.sleep(0.04)
+                yield word + " "
+
+    class FakeVoice:
+        async def synthesize(self, text: str):
+            await asyncio.sleep(0.15)
+            for _ in range(0, len(text), 40):
+                await asyncio.sleep(0.01)
+                yield b"\0" * 1024
+
+        async def play_stream(self, chunks):
+            async for _ in chunks:
+                await asyncio.sleep(0.005)
+
+    async def compare():
+        for name, pipeline in [
+            ("buffered", buffered_response),
+            ("streaming", stream_response),
+        ]:
+            _, timings = await pipeline(FakeLLM(), FakeVoice(), "What is Milvus?")
+            print(f"{name:>10}: {timings.report()}")
+
+    asyncio.run(compare())
@@ -0,0 +1,349 @@
+import argparse
+import multiprocessing
+import queue
+import threading
+import time
+import wave
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable
+
+from audio_buffer import BYTES_PER_MS, SAMPLE_RATE
+from config import Config
+
+if TYPE_CHECKING:
+    import assemblyai as aai
+
+
+@dataclass
+class Transcript:
+    text: str
+    is_final: bool
+
+
+def _ignore(*args):
+    pass
+
+
+class AssemblyAITranscriber:
+    """AssemblyAI realtime websocket, reporting neutral :class:`Transcript` objects."""
+
+    def __init__(
+        self,
+        config: Config,
+        on_data: Callable[[Transcript], None],
+        on_error: Callable[[str], None] = _ignore,
+        on_open: Callable[[str], None] = _ignore,
+        on_close: Callable[[], None] = _ignore,
+    ):
+        import assemblyai as aai
+
+        aai.settings.api_key = config.ASSEMBLY_API_KEY
+        self.final_type = aai.RealtimeFinalTranscript
+        self.on_data = on_data
+        self.transcriber = aai.RealtimeTranscriber(
+            sample_rate=SAMPLE_RATE,
+            on_data=self._on_data,
+            on_error=lambda error: on_error(str(error)),
+            on_open=lambda session: on_open(str(session.session_id)),
+            on_close=on_close,
+            word_boost=["Milvus, Zilliz"],
+        )
+
+    def _on_data(self, transcript: "aai.RealtimeTranscript"):
+        if transcript.text:
+            self.on_data(
+                Transcript(transcript.text, is_final=isinstance(transcript, self.final_type))
+            )
+
+    def connect(self):
+        self.transcriber.connect()
+
+    def stream(self, data: bytes):
+        self.transcriber.stream(data)
+
+    def force_end_utterance(self):
+        self.transcriber.force_end_utterance()
+
+    def close(self):
+        self.transcriber.close()
+
+
+def _whisper_worker(config: Config, audio_queue, result_queue):
+    """Decodes audio from ``audio_queue`` with faster-whisper in its own process.
+
+    The current utterance is re-decoded every ``STT_PARTIAL_INTERVAL_MS`` of
+    new audio to produce partials. Once it grows past ``STT_MAX_WINDOW_S``
+    the window's text is committed and decoding restarts on fresh audio, so
+    the cost of a partial stays bounded however long the user talks.
+    """
+    import numpy as np
+    from faster_whisper import WhisperModel
+
+    try:
+        model = WhisperModel(
+            config.WHISPER_MODEL,
+            device="cpu",
+            compute_type=config.WHISPER_COMPUTE_TYPE,
+            cpu_threads=config.WHISPER_CPU_THREADS,
+        )
+    except Exception as e:
+        result_queue.put(("error", f"Could not load Whisper model: {e}"))
+        result_queue.put(("closed", None))
+        return
+    result_queue.put(("open", f"whisper-{config.WHISPER_MODEL}"))
+
+    partial_bytes = config.STT_PARTIAL_INTERVAL_MS * BYTES_PER_MS
+    window_bytes = int(config.STT_MAX_WINDOW_S * 1000) * BYTES_PER_MS
+    window = bytearray()
+    committed: list[str] = []
+    decoded_bytes = 0
+
+    def decode(final: bool) -> str:
+        audio = np.frombuffer(window, dtype=np.int16).astype(np.float32) / 32768.0
+        segments, _ = model.transcribe(
+            audio,
+            language=config.WHISPER_LANGUAGE,
+            beam_size=5 if final else 1,
+            condition_on_previous_text=False,
+            initial_prompt=" ".join(committed)[-200:] or None,
+        )
+        return "".join(segment.text for segment in segments).strip()
+
+    def utterance_text(text: str) -> str:
+        return " ".join(committed + [text]).strip()
+
+    while True:
+        messages = [audio_queue.get()]
+        while True:
+            try:
+                messages.append(audio_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        try:
+            for kind, payload in messages:
+                if kind == "audio":
+                    window.extend(payload)
+                elif kind == "end":
+                    text = utterance_text(decode(final=True) if window else "")
+                    if text:
+                        result_queue.put(("final", text))
+                    window.clear()
+                    committed.clear()
+                    decoded_bytes = 0
+                elif kind == "close":
+                    result_queue.put(("closed", None))
+                    return
+
+            if len(window) >= window_bytes:
+                committed.append(decode(final=True))
+                window.clear()
+                decoded_bytes = 0
+            elif len(window) - decoded_bytes >= partial_bytes:
+                decoded_bytes = len(window)
+                text = utterance_text(decode(final=False))
+                if text:
+                    result_queue.put(("partial", text))
+        except Exception as e:
+            result_queue.put(("error", str(e)))
+
+
+class LocalWhisperTranscriber:
+    """CPU-local transcription with faster-whisper in a worker process.
+
+    Audio is sent to the worker over a queue; partial and final transcripts
+    come back on another queue and are dispatched from a reader thread, so
+    callers see the same ``on_data`` callbacks as with AssemblyAI. There is
+    no server-side endpointing: an utterance is finalized by
+    :meth:`force_end_utterance`, which the VAD gate calls when the user
+    stops talking.
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        on_data: Callable[[Transcript], None],
+        on_error: Callable[[str], None] = _ignore,
+        on_open: Callable[[str], None] = _ignore,
+        on_close: Callable[[], None] = _ignore,
+    ):
+        self.config = config
+        self.on_data = on_data
+        self.on_error = on_error
+        self.on_open = on_open
+        self.on_close = on_close
+        # CTranslate2 is not fork-safe once threads are running
+        self.context = multiprocessing.get_context("spawn")
+        self.audio_queue = None
+        self.result_queue = None
+        self.process = None
+        self.reader = None
+
+    def connect(self):
+        self.audio_queue = self.context.Queue()
+        self.result_queue = self.context.Queue()
+        self.process = self.context.Process(
+            target=_whisper_worker,
+            args=(self.config, self.audio_queue, self.result_queue),
+            name="whisper-worker",
+            daemon=True,
+        )
+        self.process.start()
+        self.reader = threading.Thread(
+            target=self._read_results, args=(self.process,), daemon=True
+        )
+        self.reader.start()
+
+    def _read_results(self, process):
+        while True:
+            try:
+                kind, payload = self.result_queue.get(timeout=0.5)
+            except queue.Empty:
+                if process.is_alive():
+                    continue
+                kind, payload = "error", f"Whisper worker exited with code {process.exitcode}"
+                self.on_error(payload)
+                self.on_close()
+                return
+            if kind == "open":
+                self.on_open(payload)
+            elif kind == "partial":
+                self.on_data(Transcript(payload, is_final=False))
+            elif kind == "final":
+                self.on_data(Transcript(payload, is_final=True))
+            elif kind == "error":
+                self.on_error(payload)
+            elif kind == "closed":
+                self.on_close()
+                return
+
+    def stream(self, data: bytes):
+        self.audio_queue.put(("audio", data))
+
+    def force_end_utterance(self):
+        self.audio_queue.put(("end", None))
+
+    def close(self, timeout: float = 5.0):
+        if self.process is None:
+            return
+        self.audio_queue.put(("close", None))
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        # Audio the worker never read must not block interpreter exit
+        self.audio_queue.cancel_join_thread()
+        self.reader.join(timeout)
+        self.process = None
+
+
+def create_transcriber(
+    config: Config,
+    on_data: Callable[[Transcript], None],
+    on_error: Callable[[str], None] = _ignore,
+    on_open: Callable[[str], None] = _ignore,
+    on_close: Callable[[], None] = _ignore,
+):
+    """Returns a streaming transcriber for ``config.STT_BACKEND``.
+
+    Every backend has ``connect``, ``stream(bytes)``, ``force_end_utterance``
+    and ``close``, takes 16 kHz 16-bit mono PCM, and reports partial and
+    final :class:`Transcript` objects through ``on_data``.
+    """
+    if config.STT_BACKEND == "assemblyai":
+        return AssemblyAITranscriber(config, on_data, on_error, on_open, on_close)
+    if config.STT_BACKEND == "local":
+        return LocalWhisperTranscriber(config, on_data, on_error, on_open, on_close)
+    raise ValueError(f"Unsupported STT backend: {config.STT_BACKEND}")
+
+
+def read_wav(path: str) -> bytes:
+    """Reads a recorded fixture, which must be 16 kHz 16-bit mono PCM."""
+    with wave.open(path, "rb") as wav:
+        if (wav.getframerate(), wav.getsampwidth(), wav.getnchannels()) != (SAMPLE_RATE, 2, 1):
+            raise ValueError(f"{path} must be {SAMPLE_RATE} Hz 16-bit mono PCM")
+        return wav.readframes(wav.getnframes())
+
+
+def transcribe_wav(
+    config: Config,
+    path: str,
+    frame_ms: int = 100,
+    realtime: bool = False,
+    timeout: float = 60.0,
+    on_data: Callable[[Transcript], None] = _ignore,
+    transcriber_factory: Callable = create_transcriber,
+) -> list[str]:
+    """Streams a WAV fixture through the configured backend and returns the final transcripts.
+
+    With ``realtime`` the frames are paced like a live microphone.
+    """
+    finals: list[str] = []
+    errors: list[str] = []
+    closed = threading.Event()
+    # Set by the final that force_end_utterance produces, or by an error
+    flushed = threading.Event()
+    forced = False
+    # Whether partials were reported since the last final
+    pending = False
+
+    def collect(transcript: Transcript):
+        nonlocal pending
+        on_data(transcript)
+        if transcript.is_final:
+            finals.append(transcript.text)
+            pending = False
+            if forced:
+                flushed.set()
+        else:
+            pending = True
+
+    def error(message: str):
+        errors.append(message)
+        flushed.set()
+
+    transcriber = transcriber_factory(config, collect, on_error=error, on_close=closed.set)
+    transcriber.connect()
+    audio = memoryview(read_wav(path))
+    frame_bytes = frame_ms * BYTES_PER_MS
+    for start in range(0, len(audio), frame_bytes):
+        transcriber.stream(bytes(audio[start : start + frame_bytes]))
+        if realtime:
+            time.sleep(frame_ms / 1000)
+    forced = True
+    transcriber.force_end_utterance()
+
+    # Unless the backend already finalized everything it heard (e.g. by
+    # endpointing on trailing silence), wait for the last final before closing
+    if pending:
+        flushed.wait(timeout)
+    transcriber.close()
+    closed.wait(timeout)
+    if errors:
+        raise RuntimeError(f"Transcription failed: {errors[0]}")
+    return finals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe a WAV fixture")
+    parser.add_argument("wav", help="16 kHz 16-bit mono WAV file")
+    parser.add_argument("--backend", choices=["assemblyai", "local"], default=None)
+    parser.add_argument("--realtime", action="store_true", help="pace frames like a microphone")
+    args = parser.parse_args()
+
+    config = Config()
+    if args.backend:
+        config.STT_BACKEND = args.backend
+
+    started = time.perf_counter()
+
+    def show(transcript: Transcript):
+        elapsed = time.perf_counter() - started
+        label = "final" if transcript.is_final else "partial"
+        print(f"[{elapsed:6.2f}s] {label:<7} {transcript.text}")
+
+    finals = transcribe_wav(config, args.wav, realtime=args.realtime, on_data=show)
+    print(f"\n📝 {len(finals)} final transcript(s) in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from typing import Iterator, Optional
+
+from config import Config
+
+# Upper bounds in milliseconds, Prometheus style; the last bucket is +Inf
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...] = BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate by linear interpolation inside the bucket holding the q-th value."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return round(lower + (upper - lower) * (rank - seen) / count, 1)
+            seen += count
+        return float(self.buckets[-1])
+
+
+class Trace:
+    """Stage timings of one turn, in milliseconds.
+
+    Spans are durations (``embed``, ``milvus_search``, ``playback``); marks
+    are offsets from the start of the turn (``llm_first_token``,
+    ``tts_first_byte``), i.e. what the user waited for. Attributes are
+    other per-turn figures, such as prompt token counts.
+    """
+
+    def __init__(self, session_id: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.session_id = session_id
+        self.started = time.perf_counter()
+        self.timestamp = time.time()
+        self.stages: dict[str, float] = {}
+        self.attributes: dict[str, float] = {}
+
+    def annotate(self, name: str, value: float):
+        self.attributes[name] = value
+
+    def record(self, stage: str, ms: float):
+        self.stages[stage] = round(ms, 1)
+
+    def mark(self, stage: str):
+        if stage not in self.stages:
+            self.record(stage, (time.perf_counter() - self.started) * 1000)
+
+    @contextlib.contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            # Repeated spans in one turn (e.g. several embeddings) add up
+            elapsed = (time.perf_counter() - started) * 1000
+            self.record(stage, self.stages.get(stage, 0.0) + elapsed)
+
+
+# The turn being processed. Tasks created inside a turn inherit it, so
+# services can add spans without the trace being passed around.
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar(
+    "current_trace", default=None
+)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def span(stage: str):
+    """Times a block as ``stage`` of the current turn; a no-op outside a turn."""
+    trace = _current_trace.get()
+    return trace.span(stage) if trace is not None else contextlib.nullcontext()
+
+
+def mark(stage: str):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.mark(stage)
+
+
+def record(stage: str, ms: float):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.record(stage, ms)
+
+
+def annotate(name: str, value: float):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.annotate(name, value)
+
+
+class Telemetry:
+    """Aggregates turn traces into per-stage latency histograms.
+
+    Finished traces can also be appended to ``TELEMETRY_JSONL``, one JSON
+    object per turn, and the histograms are rendered in the Prometheus text
+    format by :meth:`prometheus`.
+    """
+
+    def __init__(self, config: Config):
+        self.enabled = config.TELEMETRY_ENABLED
+        self.jsonl_path = config.TELEMETRY_JSONL
+        self.histograms: dict[str, Histogram] = {}
+        self.lock = threading.Lock()
+        if self.jsonl_path:
+            os.makedirs(os.path.dirname(self.jsonl_path) or ".", exist_ok=True)
+
+    @contextlib.contextmanager
+    def turn(self, session_id: str) -> Iterator[Optional[Trace]]:
+        if not self.enabled:
+            yield None
+            return
+        trace = Trace(session_id)
+        token = _current_trace.set(trace)
+        try:
+            yield trace
+        finally:
+            _current_trace.reset(token)
+            trace.record("turn", (time.perf_counter() - trace.started) * 1000)
+            self.finish(trace)
+
+    def observe(self, stage: str, ms: float):
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(ms)
+
+    def finish(self, trace: Trace):
+        for stage, ms in trace.stages.items():
+            self.observe(stage, ms)
+        if self.jsonl_path:
+            line = json.dumps(
+                {
+                    "trace_id": trace.id,
+                    "session": trace.session_id,
+                    "timestamp": trace.timestamp,
+                    "stages": trace.stages,
+                    "attributes": trace.attributes,
+                }
+            )
+            with self.lock, open(self.jsonl_path, "a") as jsonl_file:
+                jsonl_file.write(line + "\n")
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        with self.lock:
+            return {
+                stage: {
+                    "count": histogram.count,
+                    "p50": histogram.quantile(0.5),
+                    "p95": histogram.quantile(0.95),
+                }
+                for stage, histogram in sorted(self.histograms.items())
+            }
+
+    def prometheus(self) -> str:
+        lines = [
+            "# HELP voice_stage_latency_ms Latency of each voice pipeline stage per turn.",
+            "# TYPE voice_stage_latency_ms histogram",
+        ]
+        with self.lock:
+            for stage, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(
+                        f'voice_stage_latency_ms_bucket{{stage="{stage}",le="{bound}"}} {cumulative}'
+                    )
+                lines.append(
+                    f'voice_stage_latency_ms_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}'
+                )
+                lines.append(f'voice_stage_latency_ms_sum{{stage="{stage}"}} {histogram.sum:.1f}')
+                lines.append(f'voice_stage_latency_ms_count{{stage="{stage}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+
+_shared_telemetry: Optional[Telemetry] = None
+_shared_lock = threading.Lock()
+
+
+def get_telemetry(config: Config) -> Telemetry:
+    """Returns the process-wide telemetry registry."""
+    global _shared_telemetry
+    with _shared_lock:
+        if _shared_telemetry is None:
+            _shared_telemetry = Telemetry(config)
+        return _shared_telemetry
+
+
+def configure_logging(config: Config):
+    """Sets up console logging at ``LOG_LEVEL``; "OFF" silences the assistant entirely."""
+    if config.LOG_LEVEL.upper() == "OFF":
+        logging.disable(logging.CRITICAL)
+        return
+    logging.basicConfig(level=config.LOG_LEVEL.upper(), format="%(message)s")
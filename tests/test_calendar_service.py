@@ -0,0 +1,75 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from benchmarks.fakes import FakeCalendarAPI, Latency
+from calendar_service import CalendarService
+from config import Config
+
+
+def make_service(events: int = 3) -> tuple[CalendarService, FakeCalendarAPI]:
+    api = FakeCalendarAPI(Latency(0, 0), events=events)
+    return CalendarService(Config(), service=api), api
+
+
+def summaries(service: CalendarService) -> list[str]:
+    start = datetime.now().astimezone() - timedelta(days=1)
+    return [event.summary for event in service.events_between(start, start + timedelta(days=30))]
+
+
+def test_full_load_mirrors_the_calendar_in_start_order():
+    service, _ = make_service()
+    asyncio.run(service.sync())
+    assert summaries(service) == ["Meeting 1", "Meeting 2", "Meeting 3"]
+    assert service.stats() == {"events": 3, "full_syncs": 1, "incremental_syncs": 0}
+
+
+def test_incremental_sync_applies_changes_and_cancellations():
+    service, api = make_service()
+    changes = []
+
+    async def on_change():
+        changes.append(True)
+
+    service.add_change_listener(on_change)
+
+    async def run():
+        await service.sync()
+        # Half an hour before the first fake meeting
+        hour = datetime.now().astimezone().replace(minute=0, second=0, microsecond=0)
+        api.add_event("Dentist", hour + timedelta(minutes=30))
+        api.delete_event("event2")
+        await service.sync()
+        # Nothing changed since: no listener call
+        await service.sync()
+
+    asyncio.run(run())
+    assert summaries(service) == ["Dentist", "Meeting 1", "Meeting 3"]
+    assert service.stats() == {"events": 3, "full_syncs": 1, "incremental_syncs": 2}
+    assert len(changes) == 2
+
+
+def test_expired_sync_token_reloads_everything():
+    service, api = make_service()
+
+    async def run():
+        await service.sync()
+        api.delete_event("event1")
+        api.expire_tokens()
+        await service.sync()
+
+    asyncio.run(run())
+    assert summaries(service) == ["Meeting 2", "Meeting 3"]
+    assert service.stats()["full_syncs"] == 2
+
+
+def test_next_meeting_question_is_answered_from_the_mirror():
+    service, api = make_service()
+
+    async def run():
+        answer = await service.get_events_for_query("When is my next meeting?")
+        await service.stop()
+        return answer
+
+    answer = asyncio.run(run())
+    assert answer.startswith("Next event:\n- Meeting 1")
+    assert api.requests == 1
@@ -0,0 +1,97 @@
+import json
+import os
+
+import numpy as np
+
+from local_index import LocalVectorClient, compile_filter
+
+COLLECTION = "docs"
+
+
+def make_client(root) -> LocalVectorClient:
+    client = LocalVectorClient(str(root))
+    client.create_collection(COLLECTION, dimension=4, vector_field_name="embedding")
+    return client
+
+
+def row(index: int, source: str = "sample") -> dict:
+    vector = [0.0] * 4
+    vector[index % 4] = 1.0
+    vector[(index + 1) % 4] = 0.1 * index
+    return {"embedding": vector, "content": f"text {index}", "source": source, "rank": index}
+
+
+def search(client: LocalVectorClient, vector: list[float], **kwargs) -> list[dict]:
+    return client.search(
+        COLLECTION, data=[vector], limit=kwargs.pop("limit", 3), output_fields=["content"], **kwargs
+    )[0]
+
+
+def test_filter_expressions():
+    predicate = compile_filter('source == "web" and rank < 3 and not (content in ["a", "b"])')
+    assert predicate({"source": "web", "rank": 2, "content": "c"})
+    assert not predicate({"source": "web", "rank": 2, "content": "a"})
+    assert not predicate({"source": "web", "rank": 5, "content": "c"})
+    # A missing field compares false instead of raising
+    assert not predicate({"source": "web", "content": "c"})
+    assert compile_filter("") is None
+
+
+def test_insert_search_and_delete(tmp_path):
+    client = make_client(tmp_path)
+    client.insert(COLLECTION, [row(i) for i in range(3)] + [row(4, source="web")])
+
+    hits = search(client, [1.0, 0.0, 0.0, 0.0])
+    assert [hit["entity"]["content"] for hit in hits[:2]] == ["text 0", "text 4"]
+    assert hits[0]["distance"] > 0.99
+
+    hits = search(client, [1.0, 0.0, 0.0, 0.0], filter='source == "web"')
+    assert [hit["entity"]["content"] for hit in hits] == ["text 4"]
+
+    assert client.delete(COLLECTION, filter='source == "web"')["delete_count"] == 1
+    hits = search(client, [1.0, 0.0, 0.0, 0.0])
+    assert "text 4" not in [hit["entity"]["content"] for hit in hits]
+    rows = client.query(COLLECTION, filter="rank >= 1", output_fields=["content"])
+    assert sorted(row["content"] for row in rows) == ["text 1", "text 2"]
+
+
+def test_reload_from_disk(tmp_path):
+    client = make_client(tmp_path)
+    client.insert(COLLECTION, [row(i) for i in range(4)])
+    client.delete(COLLECTION, filter="rank == 2")
+
+    reloaded = LocalVectorClient(str(tmp_path))
+    hits = search(reloaded, [0.0, 1.0, 0.0, 0.0], limit=1)
+    assert hits[0]["entity"]["content"] == "text 1"
+    assert len(reloaded.query(COLLECTION, filter="")) == 3
+
+    # New ids continue after the reloaded ones
+    reloaded.insert(COLLECTION, [row(5)])
+    ids = [row["id"] for row in reloaded.query(COLLECTION, filter="")]
+    assert len(set(ids)) == len(ids) == 4
+
+
+def test_recovers_from_an_insert_interrupted_between_the_files(tmp_path):
+    client = make_client(tmp_path)
+    client.insert(COLLECTION, [row(i) for i in range(2)])
+    collection_dir = os.path.join(str(tmp_path), COLLECTION)
+
+    # The vectors of an insert were written, plus half a vector of the
+    # next one, but no row records
+    with open(os.path.join(collection_dir, "vectors.f32"), "ab") as vectors_file:
+        vectors_file.write(np.ones((3, 4), dtype=np.float32).tobytes())
+        vectors_file.write(np.ones(2, dtype=np.float32).tobytes())
+    # ...and a torn row line from yet another attempt
+    with open(os.path.join(collection_dir, "rows.jsonl"), "a", encoding="utf-8") as rows_file:
+        rows_file.write(json.dumps({"id": 99, "content": "torn"})[:10])
+
+    recovered = LocalVectorClient(str(tmp_path))
+    assert len(recovered.query(COLLECTION, filter="")) == 2
+    recovered.insert(COLLECTION, [row(2)])
+
+    # After another reload, the row written after the crash has its own vector
+    reopened = LocalVectorClient(str(tmp_path))
+    hits = search(reopened, [0.0, 0.0, 1.0, 0.0], limit=1)
+    assert hits[0]["entity"]["content"] == "text 2"
+    assert hits[0]["distance"] > 0.9
+    assert os.path.getsize(os.path.join(collection_dir, "vectors.f32")) == 3 * 4 * 4
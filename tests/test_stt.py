@@ -0,0 +1,142 @@
+import os
+import queue
+import sys
+import threading
+import time
+import types
+import wave
+from dataclasses import replace
+
+import pytest
+
+from audio_buffer import BYTES_PER_MS
+from config import Config
+from stt import Transcript, _whisper_worker, read_wav, transcribe_wav
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "tone_500ms.wav")
+
+
+class FakeTranscriber:
+    """Reports a partial per frame and, if ``endpointing``, a final after the last one.
+
+    Otherwise the utterance is only finalized by ``force_end_utterance``,
+    from another thread like a real backend.
+    """
+
+    def __init__(self, config, on_data, on_error, on_close, endpointing=False):
+        self.on_data = on_data
+        self.on_close = on_close
+        self.endpointing = endpointing
+        self.received = 0
+
+    def connect(self):
+        pass
+
+    def stream(self, data: bytes):
+        self.received += len(data)
+        self.on_data(Transcript(f"{self.received} bytes", is_final=False))
+        if self.endpointing and len(data) < 100 * BYTES_PER_MS:
+            self.on_data(Transcript(f"heard {self.received} bytes", is_final=True))
+
+    def force_end_utterance(self):
+        if not self.endpointing:
+            threading.Timer(
+                0.05, self.on_data, [Transcript(f"heard {self.received} bytes", is_final=True)]
+            ).start()
+
+    def close(self):
+        self.on_close()
+
+
+class ScriptedQueue:
+    """Hands the worker one message per ``get``, so each is its own batch."""
+
+    def __init__(self, messages):
+        self.messages = list(messages)
+
+    def get(self):
+        return self.messages.pop(0)
+
+    def get_nowait(self):
+        raise queue.Empty
+
+
+class FakeWhisperModel:
+    """Transcribes any audio as its number of samples."""
+
+    calls: list[dict] = []
+
+    def __init__(self, model, **kwargs):
+        pass
+
+    def transcribe(self, audio, **kwargs):
+        FakeWhisperModel.calls.append(kwargs)
+        return [types.SimpleNamespace(text=f" {len(audio)} samples")], None
+
+
+def test_whisper_worker_reports_partials_and_commits_full_windows(monkeypatch):
+    monkeypatch.setitem(
+        sys.modules, "faster_whisper", types.SimpleNamespace(WhisperModel=FakeWhisperModel)
+    )
+    FakeWhisperModel.calls = []
+    config = replace(Config(), STT_PARTIAL_INTERVAL_MS=100, STT_MAX_WINDOW_S=0.3)
+    chunk = ("audio", b"\0" * 100 * BYTES_PER_MS)
+    audio_queue = ScriptedQueue([chunk] * 4 + [("end", None), ("close", None)])
+    result_queue = queue.Queue()
+
+    _whisper_worker(config, audio_queue, result_queue)
+
+    results = []
+    while not result_queue.empty():
+        results.append(result_queue.get_nowait())
+    assert results == [
+        ("open", f"whisper-{config.WHISPER_MODEL}"),
+        ("partial", "1600 samples"),
+        ("partial", "3200 samples"),
+        # The third chunk fills the window: it is committed, not reported
+        ("partial", "4800 samples 1600 samples"),
+        ("final", "4800 samples 1600 samples"),
+        ("closed", None),
+    ]
+    # Partials decode greedily, the committed window and final with beam search
+    assert [call["beam_size"] for call in FakeWhisperModel.calls] == [1, 1, 5, 1, 5]
+    assert FakeWhisperModel.calls[-1]["initial_prompt"] == "4800 samples"
+
+
+def test_read_wav_returns_the_pcm_frames():
+    with wave.open(FIXTURE, "rb") as wav:
+        frames = wav.getnframes()
+    assert len(read_wav(FIXTURE)) == frames * 2
+
+
+def test_read_wav_rejects_other_formats(tmp_path):
+    path = tmp_path / "stereo.wav"
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(16_000)
+        wav.writeframes(b"\0" * 400)
+    with pytest.raises(ValueError):
+        read_wav(str(path))
+
+
+def test_transcribe_wav_waits_for_the_forced_final():
+    finals = transcribe_wav(
+        Config(), FIXTURE, frame_ms=120, timeout=5, transcriber_factory=FakeTranscriber
+    )
+    assert finals == ["heard 16000 bytes"]
+
+
+def test_transcribe_wav_returns_at_once_when_already_final():
+    started = time.monotonic()
+    finals = transcribe_wav(
+        Config(),
+        FIXTURE,
+        frame_ms=120,
+        timeout=5,
+        transcriber_factory=lambda *args, **kwargs: FakeTranscriber(
+            *args, endpointing=True, **kwargs
+        ),
+    )
+    assert finals == ["heard 16000 bytes"]
+    assert time.monotonic() - started < 1
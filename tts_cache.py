@@ -0,0 +1,92 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Sequence
+
+from config import Config
+
+
+class TTSCache:
+    """Disk-backed cache of synthesized audio keyed by (text, model, voice).
+
+    Each entry is one MP3 file named after the key hash. The total size is
+    bounded by ``TTS_CACHE_MAX_BYTES``; the least recently used files are
+    evicted first, with recency restored from file mtimes on start.
+    """
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.cache_dir = config.TTS_CACHE_DIR
+        self.max_bytes = config.TTS_CACHE_MAX_BYTES
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # key -> size in bytes, least recently used first
+        self.entries: OrderedDict[str, int] = OrderedDict()
+        self.total_bytes = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".mp3"):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                files.append((stat.st_mtime, name[: -len(".mp3")], stat.st_size))
+        for _, key, size in sorted(files):
+            self.entries[key] = size
+            self.total_bytes += size
+
+    @staticmethod
+    def make_key(text: str, model: str, voice: str) -> str:
+        return hashlib.sha256(f"{model}\0{voice}\0{text}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.mp3")
+
+    def get(self, text: str, model: str, voice: str) -> Optional[bytes]:
+        key = self.make_key(text, model, voice)
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            try:
+                with open(self._path(key), "rb") as audio_file:
+                    audio = audio_file.read()
+                os.utime(self._path(key))
+            except FileNotFoundError:
+                self.total_bytes -= self.entries.pop(key)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return audio
+
+    def put(self, text: str, model: str, voice: str, chunks: Sequence[bytes]):
+        """Stores the audio chunks of one utterance, written out without joining them."""
+        size = sum(len(chunk) for chunk in chunks)
+        if not size or size > self.max_bytes:
+            return
+        key = self.make_key(text, model, voice)
+        with self.lock:
+            temp_path = self._path(key) + ".tmp"
+            with open(temp_path, "wb") as audio_file:
+                audio_file.writelines(chunks)
+            os.replace(temp_path, self._path(key))
+            self.total_bytes += size - self.entries.pop(key, 0)
+            self.entries[key] = size
+
+            while self.total_bytes > self.max_bytes and self.entries:
+                evicted, size = self.entries.popitem(last=False)
+                self.total_bytes -= size
+                try:
+                    os.remove(self._path(evicted))
+                except FileNotFoundError:
+                    pass
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+        }
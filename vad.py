@@ -0,0 +1,145 @@
+from typing import Optional
+
+import numpy as np
+
+from audio_buffer import BYTES_PER_MS, SAMPLE_RATE, AudioRingBuffer
+from config import Config
+
+
+class EnergyVAD:
+    """Energy / zero-crossing voice-activity detector for 16-bit PCM frames.
+
+    A frame is split into short subframes (``VAD_SUBFRAME_MS``) that are
+    scored in one vectorized pass. A subframe is voiced when its energy is
+    ``VAD_SNR_DB`` above the running noise floor and its zero-crossing rate
+    is speech-like; broadband hiss crosses zero far more often and only
+    counts when it is much louder. The frame is speech when at least
+    ``VAD_SPEECH_RATIO`` of its subframes are voiced.
+
+    ``extra_snr_db`` raises the threshold temporarily, e.g. while the
+    assistant's own voice is coming back through the microphone.
+
+    Any object with an ``is_speech(frame) -> bool`` method can be used in
+    its place, e.g. a small neural model.
+    """
+
+    def __init__(self, config: Config):
+        self.subframe_samples = SAMPLE_RATE * config.VAD_SUBFRAME_MS // 1000
+        self.snr_db = config.VAD_SNR_DB
+        self.min_energy_db = config.VAD_MIN_ENERGY_DB
+        self.max_zcr = config.VAD_MAX_ZCR
+        self.speech_ratio = config.VAD_SPEECH_RATIO
+        self.noise_floor_db: Optional[float] = None
+        self.extra_snr_db = 0.0
+
+    def is_speech(self, frame: memoryview) -> bool:
+        samples = np.frombuffer(frame, dtype=np.int16)
+        usable = len(samples) // self.subframe_samples * self.subframe_samples
+        if not usable:
+            return False
+        subframes = samples[:usable].reshape(-1, self.subframe_samples) / 32768.0
+
+        energy_db = 10 * np.log10(np.mean(subframes * subframes, axis=1) + 1e-10)
+        signs = np.signbit(subframes)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (
+            self.subframe_samples - 1
+        )
+
+        # The quietest subframe bounds the noise floor from above, so a
+        # floor learned while the user was already talking recovers at the
+        # first pause between words.
+        quietest = float(energy_db.min())
+        if self.noise_floor_db is None or quietest < self.noise_floor_db:
+            self.noise_floor_db = quietest
+
+        threshold = (
+            max(self.min_energy_db, self.noise_floor_db + self.snr_db) + self.extra_snr_db
+        )
+        voiced = (energy_db > threshold) & (
+            (zcr < self.max_zcr) | (energy_db > threshold + self.snr_db)
+        )
+        speech = bool(voiced.mean() >= self.speech_ratio)
+        if not speech:
+            # Follow slow rises in background noise (fans, traffic)
+            self.noise_floor_db += 0.05 * (float(np.median(energy_db)) - self.noise_floor_db)
+        return speech
+
+
+class VADGate:
+    """Forwards only speech frames from a microphone ring buffer.
+
+    Silence is dropped. When speech starts, the last ``VAD_PREROLL_MS`` of
+    audio is sent along with the triggering frame so word onsets are not
+    clipped. After ``VAD_HANGOVER_MS`` of silence the utterance is marked as
+    ended, letting the caller ask the transcriber for a final transcript
+    right away instead of waiting for its own silence timeout.
+
+    While :meth:`duck` is on (the assistant is talking), speech has to be
+    ``BARGE_IN_SNR_DB`` louder and last ``BARGE_IN_MIN_MS`` before it
+    opens the gate, so playback leaking into the microphone is not taken
+    for the user.
+    """
+
+    def __init__(self, config: Config, ring: AudioRingBuffer, detector=None):
+        self.ring = ring
+        self.detector = detector or EnergyVAD(config)
+        self.preroll_bytes = config.VAD_PREROLL_MS * BYTES_PER_MS
+        self.hangover_frames = max(1, config.VAD_HANGOVER_MS // config.MIC_FRAME_MS)
+        self.barge_in_frames = max(1, config.BARGE_IN_MIN_MS // config.MIC_FRAME_MS)
+        self.barge_in_snr_db = config.BARGE_IN_SNR_DB
+        self.ducked = False
+        self.onset_frames = 0
+        self.in_speech = False
+        self.silent_frames = 0
+        self.utterances = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def duck(self, ducked: bool):
+        if ducked == self.ducked:
+            return
+        self.ducked = ducked
+        self.onset_frames = 0
+        if hasattr(self.detector, "extra_snr_db"):
+            self.detector.extra_snr_db = self.barge_in_snr_db if ducked else 0.0
+
+    def process(self, frame: memoryview) -> tuple[list[memoryview], bool]:
+        """Returns the views to forward for ``frame`` and whether an utterance just ended.
+
+        The views point into the ring buffer and are only valid until its
+        next write.
+        """
+        self.bytes_in += len(frame)
+        speech = self.detector.is_speech(frame)
+        ended = False
+
+        if not self.in_speech:
+            self.onset_frames = self.onset_frames + 1 if speech else 0
+            if self.onset_frames < (self.barge_in_frames if self.ducked else 1):
+                return [], False
+            self.in_speech = True
+            self.silent_frames = 0
+            self.utterances += 1
+            # Includes the onset frames, which the ring has already read
+            views = self.ring.recent(self.preroll_bytes + self.onset_frames * len(frame))
+            self.onset_frames = 0
+        else:
+            views = [frame]
+            if speech:
+                self.silent_frames = 0
+            else:
+                self.silent_frames += 1
+                if self.silent_frames >= self.hangover_frames:
+                    self.in_speech = False
+                    ended = True
+
+        self.bytes_out += sum(len(view) for view in views)
+        return views, ended
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "utterances": self.utterances,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "forwarded": round(self.bytes_out / self.bytes_in, 3) if self.bytes_in else 0.0,
+        }
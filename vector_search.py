@@ -1,45 +1,296 @@
-from pymilvus import CollectionSchema, DataType, FieldSchema, MilvusClient
-from pymilvus.model.dense import JinaEmbeddingFunction
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import threading
+from typing import Optional
 
+from chunking import chunk_text
 from config import Config
+from embedding_cache import get_embedding_cache
+from executors import get_executor
+from jina_client import get_jina_client
+from local_index import LocalVectorClient
+from rerank import dedupe, hybrid_rerank
+from telemetry import span
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_TEXTS = [
+    "In 1950, Alan Turing published his seminal paper, 'Computing Machinery and Intelligence,' proposing the Turing Test as a criterion of intelligence, a foundational concept in the philosophy and development of artificial intelligence.",
+    "The Dartmouth Conference in 1956 is considered the birthplace of artificial intelligence as a field; here, John McCarthy and others coined the term 'artificial intelligence' and laid out its basic goals.",
+    "In 1951, British mathematician and computer scientist Alan Turing also developed the first program designed to play chess, demonstrating an early example of AI in game strategy.",
+    "The invention of the Logic Theorist by Allen Newell, Herbert A. Simon, and Cliff Shaw in 1955 marked the creation of the first true AI program, which was capable of solving logic problems, akin to proving mathematical theorems.",
+    "The High-Performance Vector Database Built for Scale. Milvus is an open-source vector database built for GenAI applications. Install with pip, perform high-speed searches, and scale to tens of billions of vectors with minimal performance loss.",
+    "Milvus is an open-source project under LF AI & Data Foundation distributed under the Apache 2.0 license. Most contributors are experts from the high-performance computing (HPC) community, specializing in building large-scale systems and optimizing hardware-aware code. Core contributors include professionals from Zilliz, ARM, NVIDIA, AMD, Intel, Meta, IBM, Salesforce, Alibaba, and Microsoft.",
+    """What Makes Milvus so Fast？
+Milvus was designed from day one to be a highly efficient vector database system. In most cases, Milvus outperforms other vector databases by 2-5x (see the VectorDBBench results). This high performance is the result of several key design decisions:
+
+Hardware-aware Optimization: To accommodate Milvus in various hardware environments, we have optimized its performance specifically for many hardware architectures and platforms, including AVX512, SIMD, GPUs, and NVMe SSD.
+
+Advanced Search Algorithms: Milvus supports a wide range of in-memory and on-disk indexing/search algorithms, including IVF, HNSW, DiskANN, and more, all of which have been deeply optimized. Compared to popular implementations like FAISS and HNSWLib, Milvus delivers 30%-70% better performance.
+
+Search Engine in C++: Over 80% of a vector database’s performance is determined by its search engine. Milvus uses C++ for this critical component due to the language’s high performance, low-level optimization, and efficient resource management. Most importantly, Milvus integrates numerous hardware-aware code optimizations, ranging from assembly-level vectorization to multi-thread parallelization and scheduling, to fully leverage hardware capabilities.
+
+Column-Oriented: Milvus is a column-oriented vector database system. The primary advantages come from the data access patterns. When performing queries, a column-oriented database reads only the specific fields involved in the query, rather than entire rows, which greatly reduces the amount of data accessed. Additionally, operations on column-based data can be easily vectorized, allowing for operations to be applied in the entire columns at once, further enhancing performance.""",
+]
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def create_vector_client(config: Config):
+    """Returns a MilvusClient-compatible client for ``config.VECTOR_BACKEND``."""
+    if config.VECTOR_BACKEND == "local":
+        return LocalVectorClient(config.LOCAL_INDEX_DIR)
+    # pymilvus takes about a second to import; the local backend never needs it
+    from pymilvus import MilvusClient
+
+    if config.VECTOR_BACKEND == "milvus-lite":
+        return MilvusClient(uri=config.MILVUS_LITE_PATH)
+    if config.VECTOR_BACKEND == "milvus":
+        return MilvusClient(uri=f"http://{config.MILVUS_HOST}:{config.MILVUS_PORT}")
+    raise ValueError(f"Unsupported vector backend: {config.VECTOR_BACKEND}")
+
+
+def index_build_params(config: Config, index_type: str) -> dict:
+    if index_type == "HNSW":
+        return {"M": config.HNSW_M, "efConstruction": config.HNSW_EF_CONSTRUCTION}
+    if index_type == "IVF_FLAT":
+        return {"nlist": config.IVF_NLIST}
+    if index_type == "IVF_PQ":
+        return {"nlist": config.IVF_NLIST, "m": config.IVF_PQ_M, "nbits": config.IVF_PQ_NBITS}
+    if index_type == "DISKANN":
+        return {}
+    raise ValueError(f"Unsupported index type: {index_type}")
+
+
+def index_search_params(
+    config: Config,
+    index_type: str,
+    ef: Optional[int] = None,
+    nprobe: Optional[int] = None,
+    search_list: Optional[int] = None,
+) -> dict:
+    """Per-query search parameters for ``index_type``; unset knobs use ``config``."""
+    if index_type == "HNSW":
+        params = {"ef": ef or config.HNSW_EF}
+    elif index_type in ("IVF_FLAT", "IVF_PQ"):
+        params = {"nprobe": nprobe or config.IVF_NPROBE}
+    elif index_type == "DISKANN":
+        params = {"search_list": search_list or config.DISKANN_SEARCH_LIST}
+    else:
+        raise ValueError(f"Unsupported index type: {index_type}")
+    return {"metric_type": config.MILVUS_METRIC_TYPE, "params": params}
+
+
+def _batched(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
 
 
 class MilvusWrapper:
+    """The knowledge-base collection.
+
+    Nothing is contacted on construction: the client is created and the
+    collection checked on first use of :attr:`client`, or ahead of time by
+    :meth:`connect` / :meth:`aconnect` from a background warm-up.
+    """
+
     def __init__(self, config: Config):
         self.config = config
-        self.client = MilvusClient(
-            uri=f"http://{config.MILVUS_HOST}:{config.MILVUS_PORT}",
-        )
-        self.ef = JinaEmbeddingFunction(
-            "jina-embeddings-v3",
-            self.config.JINA_API_KEY,
+        self._client = None
+        self._connected = False
+        # Reentrant, as preparing the collection goes through ``client`` again
+        self._connect_lock = threading.RLock()
+        self.jina_client = get_jina_client(config)
+        self.embedding_cache = get_embedding_cache(config)
+        self.executor = get_executor(config)
+        # Concurrent async searches waiting to be sent together, keyed by
+        # their limit and search parameters
+        self.pending_searches: dict[tuple, list[tuple[list, asyncio.Future]]] = {}
+        self.search_flush_handles: dict[tuple, asyncio.TimerHandle] = {}
+        self.in_flight: set[asyncio.Task] = set()
+        self.search_requests = 0
+        self.search_queries = 0
+
+    @property
+    def client(self):
+        if not self._connected:
+            self.connect()
+        return self._client
+
+    def connect(self):
+        """Creates the client and prepares the collection; blocking, and a no-op once done."""
+        with self._connect_lock:
+            if self._client is not None:
+                return
+            self._client = create_vector_client(self.config)
+            try:
+                self._ensure_collection_exists()
+            except Exception:
+                self._client = None
+                raise
+            self._connected = True
+
+    async def aconnect(self):
+        if not self._connected:
+            await self.executor.run("milvus", self.connect)
+
+    def encode_documents(self, texts: list[str]) -> list:
+        return self.embedding_cache.encode(
+            texts,
+            lambda batch: self.jina_client.embed_sync(batch, task="retrieval.passage"),
+            model=self.config.EMBEDDING_MODEL,
             task="retrieval.passage",
-            dimensions=1024,
+            dimensions=self.config.VECTOR_DIM,
+        )
+
+    def encode_queries(self, texts: list[str]) -> list:
+        return self.embedding_cache.encode(
+            texts,
+            lambda batch: self.jina_client.embed_sync(batch, task="retrieval.query"),
+            model=self.config.EMBEDDING_MODEL,
+            task="retrieval.query",
+            dimensions=self.config.VECTOR_DIM,
         )
-        self._ensure_collection_exists()
+
+    async def aencode_queries(self, texts: list[str]) -> list:
+        with span("embed"):
+            return await self.embedding_cache.aencode(
+                texts,
+                lambda batch: self.jina_client.embed(batch, task="retrieval.query"),
+                model=self.config.EMBEDDING_MODEL,
+                task="retrieval.query",
+                dimensions=self.config.VECTOR_DIM,
+            )
 
     def _ensure_collection_exists(self):
-        print("checking if the collection exists in Milvus")
-        self.client.drop_collection(self.config.COLLECTION_NAME)
+        logger.debug("checking if the collection exists in Milvus")
+        name = self.config.COLLECTION_NAME
+        exists = self.client.has_collection(name)
 
-        self.client.create_collection(
-            self.config.COLLECTION_NAME,
-            dimension=self.config.VECTOR_DIM,
-            vector_field_name="embedding",
-            auto_id=True,
+        if exists and self.config.MILVUS_RESET_COLLECTION:
+            logger.info("    Resetting collection (MILVUS_RESET_COLLECTION is set)")
+            self.client.drop_collection(name)
+            exists = False
+        elif exists and not self._has_current_schema():
+            logger.info("    Collection predates content hashing, recreating it")
+            self.client.drop_collection(name)
+            exists = False
+
+        if not exists:
+            self._create_collection()
+        else:
+            self._ensure_index()
+
+        self.client.load_collection(name)
+
+    def _index_params(self):
+        index_params = self.client.prepare_index_params()
+        index_params.add_index(
+            field_name="embedding",
+            index_name="embedding",
+            index_type=self.config.MILVUS_INDEX_TYPE,
+            metric_type=self.config.MILVUS_METRIC_TYPE,
+            params=index_build_params(self.config, self.config.MILVUS_INDEX_TYPE),
         )
+        return index_params
 
-        self.client.load_collection(self.config.COLLECTION_NAME)
+    def _index_matches(self, current: dict) -> bool:
+        """Whether a ``describe_index`` result has the configured type, metric and build params."""
+        if (
+            current.get("index_type") != self.config.MILVUS_INDEX_TYPE
+            or current.get("metric_type") != self.config.MILVUS_METRIC_TYPE
+        ):
+            return False
+        # Milvus reports the build params as strings, at the top level or
+        # (depending on the version) as a JSON "params" entry
+        params = current.get("params") or {}
+        if isinstance(params, str):
+            params = json.loads(params)
+        params = {**current, **params}
+        expected = index_build_params(self.config, self.config.MILVUS_INDEX_TYPE)
+        return all(str(params.get(key)) == str(value) for key, value in expected.items())
+
+    def _ensure_index(self):
+        """Rebuilds the vector index when it differs from the configured one, build params included."""
+        name = self.config.COLLECTION_NAME
+        indexes = self.client.list_indexes(name, field_name="embedding")
+        if indexes:
+            current = self.client.describe_index(name, indexes[0])
+            if self._index_matches(current):
+                return
+            logger.info(
+                f"    Rebuilding index {current.get('index_type')} -> "
+                f"{self.config.MILVUS_INDEX_TYPE}"
+            )
+            self.client.release_collection(name)
+            self.client.drop_index(name, indexes[0])
+        self.client.create_index(name, self._index_params())
+
+    def search_params(
+        self,
+        ef: Optional[int] = None,
+        nprobe: Optional[int] = None,
+        search_list: Optional[int] = None,
+    ) -> dict:
+        return index_search_params(
+            self.config, self.config.MILVUS_INDEX_TYPE, ef, nprobe, search_list
+        )
 
-    def search(self, query_vector: list[float], limit: int = 5) -> list[dict]:
-        print("Runs a Vector Search in Milvus")
+    def _has_current_schema(self) -> bool:
+        description = self.client.describe_collection(self.config.COLLECTION_NAME)
+        field_names = {field["name"] for field in description["fields"]}
+        return {"content", "content_hash", "source"} <= field_names
+
+    def _create_collection(self):
+        if self.config.VECTOR_BACKEND == "local":
+            # Schemaless apart from the vector field, so no pymilvus needed
+            self.client.create_collection(
+                self.config.COLLECTION_NAME,
+                dimension=self.config.VECTOR_DIM,
+                vector_field_name="embedding",
+                fields=["id", "embedding", "content", "content_hash", "source"],
+                index_params=self._index_params(),
+            )
+            return
+
+        from pymilvus import CollectionSchema, DataType, FieldSchema
+
+        schema = CollectionSchema(
+            fields=[
+                FieldSchema("id", DataType.INT64, is_primary=True, auto_id=True),
+                FieldSchema(
+                    "embedding", DataType.FLOAT_VECTOR, dim=self.config.VECTOR_DIM
+                ),
+                FieldSchema("content", DataType.VARCHAR, max_length=65535),
+                FieldSchema("content_hash", DataType.VARCHAR, max_length=64),
+                FieldSchema("source", DataType.VARCHAR, max_length=1024),
+            ],
+            enable_dynamic_field=True,
+        )
+        self.client.create_collection(
+            self.config.COLLECTION_NAME, schema=schema, index_params=self._index_params()
+        )
+
+    def search(
+        self,
+        query_vector: list[float],
+        limit: int = 5,
+        search_params: Optional[dict] = None,
+    ) -> list[dict]:
+        logger.debug("Runs a Vector Search in Milvus")
         results = self.client.search(
             collection_name=self.config.COLLECTION_NAME,
             data=[query_vector],
             limit=limit,
             output_fields=["content"],
+            search_params=search_params or self.search_params(),
         )
-        print(f"results of the vector search: {results}")
+        logger.debug("results of the vector search: %s", results)
 
         return [
             {"content": hit["entity"].get("content"), "distance": hit["distance"]}
@@ -47,55 +298,246 @@ class MilvusWrapper:
         ]
 
     def add_sample_data(self):
-        print("Adding sample data to Milvus collection")
-
-        sample_texts = [
-            "In 1950, Alan Turing published his seminal paper, 'Computing Machinery and Intelligence,' proposing the Turing Test as a criterion of intelligence, a foundational concept in the philosophy and development of artificial intelligence.",
-            "The Dartmouth Conference in 1956 is considered the birthplace of artificial intelligence as a field; here, John McCarthy and others coined the term 'artificial intelligence' and laid out its basic goals.",
-            "In 1951, British mathematician and computer scientist Alan Turing also developed the first program designed to play chess, demonstrating an early example of AI in game strategy.",
-            "The invention of the Logic Theorist by Allen Newell, Herbert A. Simon, and Cliff Shaw in 1955 marked the creation of the first true AI program, which was capable of solving logic problems, akin to proving mathematical theorems.",
-            "The High-Performance Vector Database Built for Scale. Milvus is an open-source vector database built for GenAI applications. Install with pip, perform high-speed searches, and scale to tens of billions of vectors with minimal performance loss.",
-            "Milvus is an open-source project under LF AI & Data Foundation distributed under the Apache 2.0 license. Most contributors are experts from the high-performance computing (HPC) community, specializing in building large-scale systems and optimizing hardware-aware code. Core contributors include professionals from Zilliz, ARM, NVIDIA, AMD, Intel, Meta, IBM, Salesforce, Alibaba, and Microsoft.",
-            """What Makes Milvus so Fast？
-Milvus was designed from day one to be a highly efficient vector database system. In most cases, Milvus outperforms other vector databases by 2-5x (see the VectorDBBench results). This high performance is the result of several key design decisions:
-
-Hardware-aware Optimization: To accommodate Milvus in various hardware environments, we have optimized its performance specifically for many hardware architectures and platforms, including AVX512, SIMD, GPUs, and NVMe SSD.
-
-Advanced Search Algorithms: Milvus supports a wide range of in-memory and on-disk indexing/search algorithms, including IVF, HNSW, DiskANN, and more, all of which have been deeply optimized. Compared to popular implementations like FAISS and HNSWLib, Milvus delivers 30%-70% better performance.
-
-Search Engine in C++: Over 80% of a vector database’s performance is determined by its search engine. Milvus uses C++ for this critical component due to the language’s high performance, low-level optimization, and efficient resource management. Most importantly, Milvus integrates numerous hardware-aware code optimizations, ranging from assembly-level vectorization to multi-thread parallelization and scheduling, to fully leverage hardware capabilities.
-
-Column-Oriented: Milvus is a column-oriented vector database system. The primary advantages come from the data access patterns. When performing queries, a column-oriented database reads only the specific fields involved in the query, rather than entire rows, which greatly reduces the amount of data accessed. Additionally, operations on column-based data can be easily vectorized, allowing for operations to be applied in the entire columns at once, further enhancing performance.""",
+        logger.debug("Adding sample data to Milvus collection")
+        chunks = [
+            chunk
+            for text in SAMPLE_TEXTS
+            for chunk in chunk_text(
+                text, self.config.CHUNK_TOKENS, self.config.CHUNK_OVERLAP_TOKENS
+            )
         ]
+        self.sync_documents(chunks, source="sample")
 
-        embeddings = self.ef.encode_documents(sample_texts)
+    def existing_hashes(self, hashes: list[str], source: Optional[str] = None) -> set[str]:
+        existing = set()
+        for batch in _batched(hashes, 1000):
+            expr = f"content_hash in {json.dumps(batch)}"
+            if source is not None:
+                expr = f"source == {json.dumps(source)} and {expr}"
+            rows = self.client.query(
+                collection_name=self.config.COLLECTION_NAME,
+                filter=expr,
+                output_fields=["content_hash"],
+            )
+            existing.update(row["content_hash"] for row in rows)
+        return existing
 
+    def stored_hashes(self, source: str) -> set[str]:
+        """The content hashes of every document stored for ``source``."""
+        expr = f"source == {json.dumps(source)}"
+        if not hasattr(self.client, "query_iterator"):
+            # The local backend, and MilvusClient before pymilvus 2.5
+            rows = self.client.query(
+                collection_name=self.config.COLLECTION_NAME,
+                filter=expr,
+                output_fields=["content_hash"],
+            )
+            return {row["content_hash"] for row in rows}
+        # Paged, as a single query is capped at 16384 rows
+        iterator = self.client.query_iterator(
+            collection_name=self.config.COLLECTION_NAME,
+            batch_size=1000,
+            filter=expr,
+            output_fields=["content_hash"],
+        )
+        hashes = set()
+        try:
+            while rows := iterator.next():
+                hashes.update(row["content_hash"] for row in rows)
+        finally:
+            iterator.close()
+        return hashes
+
+    def insert_rows(self, texts: list[str], metadata: list[dict]) -> int:
+        """Embeds one batch of texts and inserts them with per-row metadata."""
+        embeddings = self.encode_documents(texts)
         data = [
-            {"content": sample_texts[i], "embedding": embeddings[i].tolist()}
-            for i in range(len(embeddings))
+            {
+                **fields,
+                "content": text,
+                "content_hash": content_hash(text),
+                "embedding": embedding.tolist(),
+            }
+            for text, fields, embedding in zip(texts, metadata, embeddings)
         ]
-
         result = self.client.insert(
             collection_name=self.config.COLLECTION_NAME, data=data
         )
-        print(f"Added {result['insert_count']} sample entries to the collection")
+        return result["insert_count"]
+
+    def insert_documents(self, texts: list[str], source: str) -> int:
+        """Embeds and inserts ``texts`` in batches, returning the inserted count."""
+        inserted = 0
+        for batch in _batched(texts, self.config.EMBED_BATCH_SIZE):
+            inserted += self.insert_rows(batch, [{"source": source}] * len(batch))
+        return inserted
+
+    def delete_documents(self, expr: str) -> int:
+        """Deletes the documents matching the filter ``expr``, returning the count."""
+        result = self.client.delete(collection_name=self.config.COLLECTION_NAME, filter=expr)
+        if isinstance(result, dict):
+            return result.get("delete_count", 0)
+        return 0
 
-    def search_similar_text(self, query_text: str, limit: int = 3) -> list[dict]:
-        print(f"Searching for text similar to: '{query_text}'")
-        query_vector = self.ef.encode_queries([query_text])[0]
+    def sync_documents(self, texts: list[str], source: str):
+        """Makes the documents stored for ``source`` match ``texts``.
+
+        Only texts whose content hash is not stored yet are embedded and
+        inserted; stored texts that are no longer listed are deleted.
+        """
+        desired = {content_hash(text): text for text in texts}
+        stored = self.stored_hashes(source)
+        existing = stored & desired.keys()
+
+        # Deleted by hash in batches: a "not in" filter listing every desired
+        # hash would grow with the corpus past Milvus' expression limits
+        deleted = 0
+        for batch in _batched(sorted(stored - desired.keys()), 1000):
+            deleted += self.delete_documents(
+                f"source == {json.dumps(source)} and content_hash in {json.dumps(batch)}"
+            )
+
+        new_texts = [text for text_hash, text in desired.items() if text_hash not in existing]
+        inserted = self.insert_documents(new_texts, source) if new_texts else 0
+
+        logger.info(
+            f"Synced '{source}': {inserted} added, {deleted} removed, "
+            f"{len(existing)} unchanged"
+        )
+        logger.debug(f"Embedding cache: {self.embedding_cache.stats()}")
 
+    def relevance_params(self, search_params: Optional[dict] = None) -> dict:
+        """Search parameters with ``KB_RELEVANCE_THRESHOLD`` applied as a range search.
+
+        Milvus then only returns hits above the threshold instead of the
+        top-k regardless of score. Only similarity metrics have a threshold
+        to apply; L2 parameters are returned unchanged.
+        """
+        params = copy.deepcopy(search_params or self.search_params())
+        if self.config.KB_RANGE_SEARCH and params.get("metric_type") in ("COSINE", "IP"):
+            params.setdefault("params", {})["radius"] = self.config.KB_RELEVANCE_THRESHOLD
+        return params
+
+    def _search_text_vectors(
+        self, query_vectors: list, limit: int, search_params: dict
+    ) -> list[list[dict]]:
+        """One request for all ``query_vectors``; hits per query, best first."""
+        self.search_requests += 1
+        self.search_queries += len(query_vectors)
         results = self.client.search(
             collection_name=self.config.COLLECTION_NAME,
-            data=[query_vector],
+            data=list(query_vectors),
             limit=limit,
             output_fields=["content"],
-        )[0]
-        print(f"Found {len(results)} results")
+            search_params=search_params,
+        )
+        logger.debug(f"Found {[len(hits) for hits in results]} results")
         return [
-            {"text": hit["entity"].get("content"), "distance": hit["distance"]}
-            for hit in results
+            [{"text": hit["entity"].get("content"), "distance": hit["distance"]} for hit in hits]
+            for hits in results
         ]
 
+    def _refine(self, query_text: str, hits: list[dict], limit: int) -> list[dict]:
+        """De-duplicates the candidates, re-ranks them if enabled and keeps ``limit``."""
+        hits = dedupe(hits, self.config.KB_DEDUP_THRESHOLD)
+        if self.config.KB_HYBRID_RERANK:
+            hits = hybrid_rerank(query_text, hits, self.config.KB_BM25_WEIGHT)
+        return hits[:limit]
+
+    def _candidates(self, limit: int) -> int:
+        return max(limit, self.config.KB_CANDIDATES)
+
+    def search_similar_texts(
+        self, query_texts: list[str], limit: int = 3, search_params: Optional[dict] = None
+    ) -> list[list[dict]]:
+        """Encodes and searches several queries in one round trip each."""
+        logger.debug(f"Searching for texts similar to: {query_texts}")
+        query_vectors = self.encode_queries(query_texts)
+        results = self._search_text_vectors(
+            query_vectors, self._candidates(limit), self.relevance_params(search_params)
+        )
+        return [
+            self._refine(query_text, hits, limit)
+            for query_text, hits in zip(query_texts, results)
+        ]
+
+    def search_similar_text(
+        self, query_text: str, limit: int = 3, search_params: Optional[dict] = None
+    ) -> list[dict]:
+        return self.search_similar_texts([query_text], limit, search_params)[0]
+
+    async def asearch_similar_texts(
+        self, query_texts: list[str], limit: int = 3, search_params: Optional[dict] = None
+    ) -> list[list[dict]]:
+        logger.debug(f"Searching for texts similar to: {query_texts}")
+        query_vectors = await self.aencode_queries(query_texts)
+        with span("milvus_search"):
+            results = await self._asearch_vectors(
+                query_vectors, self._candidates(limit), self.relevance_params(search_params)
+            )
+        return [
+            self._refine(query_text, hits, limit)
+            for query_text, hits in zip(query_texts, results)
+        ]
+
+    async def asearch_similar_text(
+        self, query_text: str, limit: int = 3, search_params: Optional[dict] = None
+    ) -> list[dict]:
+        return (await self.asearch_similar_texts([query_text], limit, search_params))[0]
+
+    async def _asearch_vectors(
+        self, query_vectors: list, limit: int, search_params: dict
+    ) -> list[list[dict]]:
+        """Searches on the Milvus pool, sharing one request with concurrent callers.
+
+        Searches with the same limit and parameters issued within
+        ``KB_SEARCH_COALESCE_MS`` (e.g. by several client sessions) are
+        sent as a single multi-vector request.
+        """
+        if not self.config.KB_SEARCH_COALESCE_MS:
+            return await self.executor.run(
+                "milvus", self._search_text_vectors, query_vectors, limit, search_params
+            )
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = (limit, json.dumps(search_params, sort_keys=True))
+        self.pending_searches.setdefault(key, []).append((list(query_vectors), future))
+        if key not in self.search_flush_handles:
+            self.search_flush_handles[key] = loop.call_later(
+                self.config.KB_SEARCH_COALESCE_MS / 1000, self._flush_searches, key
+            )
+        return await future
+
+    def _flush_searches(self, key: tuple):
+        self.search_flush_handles.pop(key, None)
+        batch = self.pending_searches.pop(key, [])
+        if batch:
+            request = asyncio.ensure_future(self._send_searches(key, batch))
+            self.in_flight.add(request)
+            request.add_done_callback(self.in_flight.discard)
+
+    async def _send_searches(self, key: tuple, batch: list[tuple[list, asyncio.Future]]):
+        limit, search_params = key[0], json.loads(key[1])
+        query_vectors = [vector for vectors, _ in batch for vector in vectors]
+        try:
+            results = await self.executor.run(
+                "milvus", self._search_text_vectors, query_vectors, limit, search_params
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        offset = 0
+        for vectors, future in batch:
+            if not future.done():
+                future.set_result(results[offset : offset + len(vectors)])
+            offset += len(vectors)
+
+    def search_stats(self) -> dict[str, int]:
+        return {"requests": self.search_requests, "queries": self.search_queries}
+
 
 if __name__ == "__main__":
     config = Config()
@@ -1,151 +1,365 @@
 import asyncio
-import os
+import logging
+import shutil
+import subprocess
 import threading
-from queue import Queue
-
-import assemblyai as aai
-from elevenlabs import AsyncElevenLabs, play
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Optional
 
+from audio_buffer import BYTES_PER_MS, SAMPLE_RATE, AudioRingBuffer, iter_chunked
 from config import Config
+from executors import get_executor
+from llm_processor import LLM_ERROR_MESSAGE
+from stt import Transcript, create_transcriber
+from telemetry import mark, span
+from tts_cache import TTSCache
+from vad import EnergyVAD, VADGate
+
+if TYPE_CHECKING:
+    from elevenlabs import AsyncElevenLabs
+
+logger = logging.getLogger(__name__)
+
+WAIT_MESSAGE = "Please wait while I search for information."
+NO_RESULTS_MESSAGE = "I couldn't find any relevant information."
+PREWARM_PHRASES = [WAIT_MESSAGE, NO_RESULTS_MESSAGE, LLM_ERROR_MESSAGE]
+
+
+class MpvPlayer:
+    """Plays an MP3 byte stream through mpv as chunks are written."""
+
+    def __init__(self):
+        if not shutil.which("mpv"):
+            raise ValueError(
+                "mpv not found, necessary to stream audio. "
+                "On Linux, install it with your package manager (e.g. apt install mpv)."
+            )
+        self.process = subprocess.Popen(
+            ["mpv", "--no-cache", "--no-terminal", "--", "fd://0"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def write(self, chunk: bytes):
+        self.process.stdin.write(chunk)
+        self.process.stdin.flush()
+
+    def close(self):
+        if self.process.stdin:
+            self.process.stdin.close()
+        self.process.wait()
+
+    def stop(self):
+        """Stops playback immediately, dropping whatever mpv still has buffered."""
+        self.process.kill()
+        self.process.wait()
 
 
 class VoiceProcessor:
-    def __init__(self, config: Config):
+    """Speech in and out for one user.
+
+    The ElevenLabs client and TTS cache can be passed in so that many
+    processors (one per connected client) share them; ``transcriber_factory``,
+    ``player_factory`` and ``vad_factory`` can be swapped for other backends
+    or local fakes.
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        elevenlabs: Optional["AsyncElevenLabs"] = None,
+        tts_cache: Optional[TTSCache] = None,
+    ):
         self.config = config
-        aai.settings.api_key = config.ASSEMBLY_API_KEY
-        self.elevenlabs = AsyncElevenLabs(api_key=config.ELEVENLABS_API_KEY)
+        self._elevenlabs = elevenlabs
         self.transcription_callback = None
-        self.final_transcript_queue = Queue()
+        self.barge_in_callback = None
         self.transcriber = None
         self.is_listening = False
         self.listen_event = threading.Event()
         self.stop_event = threading.Event()
+        # Set while a reply is being played back
+        self.speaking = threading.Event()
         self.listening_thread = None
+        self.player_factory = MpvPlayer
+        self.vad_factory = EnergyVAD
+        self.transcriber_factory = create_transcriber
+        self.audio_ring: Optional[AudioRingBuffer] = None
+        self.vad_gate: Optional[VADGate] = None
+        # When the VAD closed the current utterance, and how long the
+        # transcriber then took to deliver the final transcript
+        self.utterance_ended_at: Optional[float] = None
+        self.last_stt_final_ms: Optional[float] = None
+        self.executor = get_executor(config)
+        self.tts_cache = tts_cache or TTSCache(config)
+
+    @property
+    def elevenlabs(self) -> "AsyncElevenLabs":
+        # Created on the first synthesis; the SDK is slow to import
+        if self._elevenlabs is None:
+            from elevenlabs import AsyncElevenLabs
+
+            self._elevenlabs = AsyncElevenLabs(api_key=self.config.ELEVENLABS_API_KEY)
+        return self._elevenlabs
 
-    def on_open(self, session_opened: aai.RealtimeSessionOpened):
-        print("\n🎤 Speech Recognition Session Started")
-        print(f"Session ID: {session_opened.session_id}")
+    def on_open(self, session_id: str):
+        logger.info("\n🎤 Speech Recognition Session Started")
+        logger.debug(f"Session ID: {session_id}")
 
-    def on_error(self, error: aai.RealtimeError):
-        print("\n❌ Error in Speech Recognition:")
-        print(f"    {error}")
+    def on_error(self, error: str):
+        logger.error(f"\n❌ Error in Speech Recognition:\n    {error}")
 
     def on_close(self):
-        print("\n🔚 Speech Recognition Session Ended")
+        logger.info("\n🔚 Speech Recognition Session Ended")
 
-    def on_data(self, transcript: aai.RealtimeTranscript):
+    def on_data(self, transcript: Transcript):
         if not transcript.text:
             return
 
-        if isinstance(transcript, aai.RealtimeFinalTranscript):
+        if transcript.is_final:
             final_transcript = transcript.text
-            print("\n📝 Final Transcript:")
-            print(f"    \"{final_transcript}\"")
+            self.last_stt_final_ms = None
+            if self.utterance_ended_at is not None:
+                self.last_stt_final_ms = (time.perf_counter() - self.utterance_ended_at) * 1000
+                self.utterance_ended_at = None
+            logger.info(f"\n📝 Final Transcript:\n    \"{final_transcript}\"")
             if self.transcription_callback:
                 self.transcription_callback(final_transcript)
-            self.final_transcript_queue.put(final_transcript)
         else:
-            # For real-time partial transcripts, overwrite the line
-            print(f"\r🎙️ {transcript.text}", end="", flush=True)
+            logger.info(f"    🎙️ {transcript.text}")
 
     def create_transcriber(self):
-        self.transcriber = aai.RealtimeTranscriber(
-            sample_rate=16_000,
+        self.transcriber = self.transcriber_factory(
+            self.config,
             on_data=self.on_data,
             on_error=self.on_error,
             on_open=self.on_open,
             on_close=self.on_close,
-            word_boost=["Milvus, Zilliz"],
         )
         return self.transcriber
 
     async def start_continuous_transcription(self):
-        print("\n🚀 Initializing Speech Recognition...")
+        logger.debug("\n🚀 Initializing Speech Recognition...")
         self.stop_transcription()
 
         try:
-            self.transcriber = self.create_transcriber()
-            print("    ✓ Created transcriber")
-            self.transcriber.connect()
-            print("    ✓ Connected to speech recognition service")
+            self.connect_transcriber()
+            logger.debug("    ✓ Connected to speech recognition service")
 
-            microphone_stream = aai.extras.MicrophoneStream(sample_rate=16_000)
+            import assemblyai as aai
+
+            microphone_stream = aai.extras.MicrophoneStream(sample_rate=SAMPLE_RATE)
             thread = threading.Thread(
                 target=self._stream_microphone,
-                args=(microphone_stream, self._stream_callback),
+                args=(microphone_stream,),
                 daemon=True,
             )
             thread.start()
-            print("    ✓ Started microphone stream")
-            print("\n🎙️ Listening...")
+            logger.debug("    ✓ Started microphone stream")
+            logger.info("\n🎙️ Listening...")
 
         except Exception as e:
-            print("\n❌ Error during initialization:")
-            print(f"    {str(e)}")
+            logger.error(f"\n❌ Error during initialization:\n    {str(e)}")
             self.transcriber = None
             raise
 
-    def _stream_microphone(self, microphone_stream, stream_callback):
+    def connect_transcriber(self):
+        """Opens an STT session and the audio input path feeding it."""
+        self.create_transcriber()
+        self.transcriber.connect()
+        # Captured chunks are regrouped into fixed-size frames inside one
+        # preallocated ring buffer instead of being forwarded as they come.
+        self.audio_ring = AudioRingBuffer(
+            capacity=self.config.MIC_BUFFER_MS * BYTES_PER_MS,
+            frame_bytes=self.config.MIC_FRAME_MS * BYTES_PER_MS,
+        )
+        self.vad_gate = None
+        if self.config.VAD_ENABLED:
+            self.vad_gate = VADGate(self.config, self.audio_ring, self.vad_factory(self.config))
+
+    def feed_audio(self, chunk: bytes) -> bool:
+        """Pushes captured 16 kHz PCM towards the transcriber; False once it has gone away."""
+        if not self.transcriber:
+            return False
+        ring, gate = self.audio_ring, self.vad_gate
+        ring.write(chunk)
+        for frame in ring.frames():
+            speaking = self.speaking.is_set()
+            if speaking and (gate is None or self.config.DUPLEX_MODE == "pause"):
+                # Keep the session open, but don't transcribe our own voice
+                continue
+            if gate is None:
+                if not self._stream_callback(frame):
+                    return False
+                continue
+            gate.duck(speaking)
+            was_in_speech = gate.in_speech
+            views, utterance_ended = gate.process(frame)
+            if gate.in_speech and not was_in_speech:
+                self._speech_started()
+            for view in views:
+                if not self._stream_callback(view):
+                    return False
+            if utterance_ended:
+                self._end_utterance()
+        return True
+
+    def _stream_microphone(self, microphone_stream):
+        gate = self.vad_gate
         try:
             for chunk in microphone_stream:
                 if not self.transcriber:
-                    print("\n⚠️  Stopping microphone stream (transcriber closed)")
-                    break
-                if not stream_callback(chunk):
-                    break
+                    logger.warning("\n⚠️  Stopping microphone stream (transcriber closed)")
+                    return
+                if not self.feed_audio(chunk):
+                    return
         except Exception as e:
-            print("\n❌ Microphone Stream Error:")
-            print(f"    {str(e)}")
+            logger.error(f"\n❌ Microphone Stream Error:\n    {str(e)}")
         finally:
-            print("\n🔚 Microphone stream ended")
+            if gate is not None:
+                logger.debug(f"\n🔇 Voice activity: {gate.stats()}")
+            logger.debug("\n🔚 Microphone stream ended")
+
+    def _speech_started(self):
+        if self.config.DUPLEX_MODE == "barge-in" and self.barge_in_callback:
+            self.barge_in_callback()
+
+    def _end_utterance(self):
+        # The local VAD heard the user stop; ask for the final transcript
+        # now rather than after the service's own end-of-speech timeout.
+        if not self.transcriber:
+            return
+        self.utterance_ended_at = time.perf_counter()
+        try:
+            self.transcriber.force_end_utterance()
+        except Exception as e:
+            logger.warning(f"\n⚠️  Could not end utterance: {e}")
 
     def stop_transcription(self):
-        print("\n⏹️  Stopping Speech Recognition...")
+        logger.debug("\n⏹️  Stopping Speech Recognition...")
         if self.transcriber:
             try:
                 self.transcriber.close()
-                print("    ✓ Transcriber closed successfully")
+                logger.debug("    ✓ Transcriber closed successfully")
             except Exception as e:
-                print("    ❌ Error closing transcriber:")
-                print(f"       {str(e)}")
+                logger.error(f"    ❌ Error closing transcriber:\n       {str(e)}")
             self.transcriber = None
 
     def set_transcription_callback(self, callback):
         self.transcription_callback = callback
 
-    def _stream_callback(self, chunk):
+    def set_barge_in_callback(self, callback):
+        """``callback`` runs on the microphone thread whenever the user starts talking."""
+        self.barge_in_callback = callback
+
+    def pause_listening(self):
+        """Closes the STT session while the assistant talks, in half-duplex mode only.
+
+        In the full-duplex modes the session and microphone thread stay up
+        across turns; playback only ducks or pauses the microphone gate.
+        """
+        if self.config.DUPLEX_MODE == "half":
+            self.stop_transcription()
+
+    def _stream_callback(self, frame: memoryview):
         if not self.transcriber:
             return False
         try:
-            self.transcriber.stream(chunk)
+            # The transcriber queues what it is given, so the frame view is
+            # copied out of the ring buffer exactly once, here.
+            self.transcriber.stream(bytes(frame))
             return True
         except Exception as e:
-            print("\n❌ Stream Processing Error:")
-            print(f"    {str(e)}")
+            logger.error(f"\n❌ Stream Processing Error:\n    {str(e)}")
             return False
 
-    async def text_to_speech(self, text: str):
-        print("\n🔊 Converting text to speech...")
-        self.stop_transcription()
+    async def synthesize(self, text: str, chunk_size: int = 16_384) -> AsyncIterator[bytes]:
+        model, voice = self.config.ELEVENLABS_MODEL, self.config.ELEVENLABS_VOICE
+        cached = self.tts_cache.get(text, model, voice)
+        if cached is not None:
+            mark("tts_first_byte")
+            for chunk in iter_chunked(cached, chunk_size):
+                yield chunk
+            return
+
+        audio_stream = await self.elevenlabs.generate(
+            text=text, model=model, voice=voice, stream=True
+        )
+        chunks = []
+        async for chunk in audio_stream:
+            mark("tts_first_byte")
+            chunks.append(chunk)
+            yield chunk
+        # Only complete utterances are cached; an interrupted stream never
+        # reaches this point.
+        self.tts_cache.put(text, model, voice, chunks)
+
+    async def prewarm_tts(self, phrases: list[str] = PREWARM_PHRASES):
+        """Synthesizes fixed phrases ahead of time so they play without a network call."""
+        for phrase in phrases:
+            try:
+                async for _ in self.synthesize(phrase):
+                    pass
+            except Exception as e:
+                logger.warning(f"    ⚠️  Could not pre-warm '{phrase}': {e}")
+        logger.debug(f"    ✓ TTS cache warmed: {self.tts_cache.stats()}")
 
+    async def play_stream(self, chunks: AsyncIterator[bytes]):
+        player = await self.executor.run("audio", self.player_factory)
+        self.speaking.set()
+        interrupted = False
         try:
-            print("    ⏳ Generating audio...")
-            audio_stream = await self.elevenlabs.generate(
-                text=text, model="eleven_turbo_v2_5", voice="mZ8K1MPRiT5wDQaasg3i"
-            )
+            with span("playback"):
+                async for chunk in chunks:
+                    await self.executor.run("audio", player.write, chunk)
+        except asyncio.CancelledError:
+            interrupted = True
+            raise
+        finally:
+            try:
+                # close() returns once the player has drained its buffer, so
+                # the mic is gated until the last of the reply has been heard
+                await self.executor.run("audio", player.stop if interrupted else player.close)
+            finally:
+                self.speaking.clear()
+
+    async def play_audio(self, audio: bytes, chunk_size: int = 16_384):
+        async def chunks():
+            for chunk in iter_chunked(audio, chunk_size):
+                yield chunk
+
+        await self.play_stream(chunks())
 
-            print("    ✓ Audio generated successfully")
-            audio_data = b""
-            async for chunk in audio_stream:
-                audio_data += chunk
+    async def text_to_speech(
+        self, text: str, audio_sink: Optional[list[bytes]] = None
+    ) -> bool:
+        """Speaks ``text``; returns whether it was synthesized and played in full."""
+        logger.debug("\n🔊 Converting text to speech...")
+        self.pause_listening()
 
-            print("    🔈 Playing audio response...")
-            play(audio_data)
-            print("    ✓ Audio playback completed")
+        async def chunks():
+            async for chunk in self.synthesize(text):
+                if audio_sink is not None:
+                    audio_sink.append(chunk)
+                yield chunk
+
+        spoken = False
+        try:
+            logger.debug("    🔈 Streaming audio response...")
+            await self.play_stream(chunks())
+            logger.debug("    ✓ Audio playback completed")
+            spoken = True
 
         except Exception as e:
-            print("    ❌ Text-to-Speech Error:")
-            print(f"       {str(e)}")
-        
-        print("\n✨ Ready for next input")
-        print("   Press SPACE to start recording")
\ No newline at end of file
+            logger.error(f"    ❌ Text-to-Speech Error:\n       {str(e)}")
+
+        self.announce_ready()
+        return spoken
+
+    def announce_ready(self):
+        logger.info("\n✨ Ready for next input")
+        if self.transcriber:
+            logger.info("   Listening...")
+        else:
+            logger.info("   Press SPACE to start recording")
@@ -1,15 +1,320 @@
-from typing import List
+import asyncio
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import List, Optional
 
-from duckduckgo_search import DDGS
+import httpx
 
+from chunking import chunk_text
 from config import Config
+from executors import ServiceTimeout, get_executor
+
+logger = logging.getLogger(__name__)
+
+WEB_SOURCE = "web"
+
+# Elements whose text is never part of the readable page
+_SKIPPED_TAGS = {"script", "style", "noscript", "template", "svg", "head", "nav", "footer", "form"}
+_BLOCK_TAGS = {"p", "div", "br", "li", "section", "article", "h1", "h2", "h3", "h4", "tr"}
+_WHITESPACE = re.compile(r"[ \t\r\f\v]+")
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIPPED_TAGS:
+            self.skipping += 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIPPED_TAGS and self.skipping:
+            self.skipping -= 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.parts.append(data)
+
+
+def extract_text(html: str) -> str:
+    """The readable text of an HTML page, one paragraph per line."""
+    extractor = _TextExtractor()
+    try:
+        extractor.feed(html)
+        extractor.close()
+    except Exception:
+        # Malformed markup: keep whatever was parsed before it
+        pass
+    lines = (_WHITESPACE.sub(" ", line).strip() for line in "".join(extractor.parts).split("\n"))
+    return "\n\n".join(line for line in lines if line)
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+@dataclass
+class WebResult:
+    url: str
+    title: str
+    snippet: str
 
 
 class WebSearcher:
-    def __init__(self, config: Config):
+    """DuckDuckGo search with a result cache and write-back into the knowledge base.
+
+    Results are cached per normalized query for ``WEB_CACHE_TTL`` seconds,
+    and concurrent searches for the same query share one request. With a
+    ``milvus_wrapper``, results that answered a turn (see
+    :meth:`keep_results`) are written back in the background: the result
+    pages are fetched concurrently (at most
+    ``WEB_FETCH_CONCURRENCY`` at once), reduced to their text, chunked and
+    embedded in batches, and stored with ``source="web"``, the page ``url``
+    and a ``fetched_at`` timestamp. A recurring question is then answered
+    by the knowledge base, and web documents older than ``WEB_KB_TTL`` are
+    deleted every ``WEB_KB_PURGE_INTERVAL`` seconds.
+    """
+
+    def __init__(self, config: Config, milvus_wrapper=None):
         self.config = config
-        self.DDGS = DDGS()
+        self.milvus_wrapper = milvus_wrapper
+        self._ddgs = None
+        self._ddgs_lock = threading.Lock()
+        self.executor = get_executor(config)
+        # normalized query -> (stored at, results), least recently used first
+        self.cache: OrderedDict[str, tuple[float, list[WebResult]]] = OrderedDict()
+        self.searching: dict[str, asyncio.Task] = {}
+        # Cached queries whose results were written back already
+        self.kept: set[str] = set()
+        # Created on first use so they bind to the running event loop
+        self.http_client: Optional[httpx.AsyncClient] = None
+        self.fetch_semaphore: Optional[asyncio.Semaphore] = None
+        self.background: set[asyncio.Task] = set()
+        self.last_purge = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.pages_fetched = 0
+        self.documents_written = 0
+        self.documents_expired = 0
 
-    def search(self, query: str) -> List[str]:
+    @property
+    def DDGS(self):
+        # Built on the first search, on a web worker thread
+        with self._ddgs_lock:
+            if self._ddgs is None:
+                from duckduckgo_search import DDGS
+
+                self._ddgs = DDGS()
+            return self._ddgs
+
+    def search_results(self, query: str) -> list[WebResult]:
         results = self.DDGS.text(query, max_results=self.config.DUCKDUCKGO_NUM_RESULTS)
-        return [result["body"] for result in results]
+        return [
+            WebResult(result.get("href", ""), result.get("title", ""), result["body"])
+            for result in results
+        ]
+
+    def search(self, query: str) -> List[str]:
+        return [result.snippet for result in self.search_results(query)]
+
+    def _cached(self, key: str) -> Optional[list[WebResult]]:
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        stored_at, results = entry
+        if time.time() - stored_at > self.config.WEB_CACHE_TTL:
+            del self.cache[key]
+            self.kept.discard(key)
+            return None
+        self.cache.move_to_end(key)
+        return results
+
+    def _store(self, key: str, results: list[WebResult]):
+        self.cache[key] = (time.time(), results)
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.config.WEB_CACHE_MAX_ENTRIES:
+            evicted, _ = self.cache.popitem(last=False)
+            self.kept.discard(evicted)
+
+    async def _search(self, key: str, query: str) -> list[WebResult]:
+        self.cache_misses += 1
+        results = await self.executor.run("web", self.search_results, query)
+        self._store(key, results)
+        return results
+
+    async def asearch_results(self, query: str) -> list[WebResult]:
+        key = normalize_query(query)
+        results = self._cached(key)
+        if results is not None:
+            self.cache_hits += 1
+            return results
+        search = self.searching.get(key)
+        if search is None:
+            search = self.searching[key] = asyncio.ensure_future(self._search(key, query))
+            search.add_done_callback(lambda _: self._search_done(key, search))
+        # Shielded: the turn is cancelled on a knowledge-base hit, but the
+        # search still completes for the cache and for concurrent callers
+        return await asyncio.shield(search)
+
+    def _search_done(self, key: str, search: asyncio.Task):
+        self.searching.pop(key, None)
+        if not search.cancelled():
+            # Marks a failure as retrieved when every caller had been cancelled
+            search.exception()
+
+    async def asearch(self, query: str) -> List[str]:
+        if self.milvus_wrapper is not None and self.config.WEB_WRITE_BACK:
+            if time.time() - self.last_purge > self.config.WEB_KB_PURGE_INTERVAL:
+                self.last_purge = time.time()
+                self._in_background(self.expire())
+        try:
+            results = await self.asearch_results(query)
+        except ServiceTimeout as e:
+            logger.warning(f"    ⚠️  Web search skipped: {e}")
+            return []
+        return [result.snippet for result in results]
+
+    def keep_results(self, query: str):
+        """Writes the cached results of ``query`` back into the knowledge base.
+
+        Called by the retriever once the web results answered a turn; the
+        speculative searches of turns answered otherwise are only cached.
+        """
+        if self.milvus_wrapper is None or not self.config.WEB_WRITE_BACK:
+            return
+        key = normalize_query(query)
+        results = self._cached(key)
+        if results and key not in self.kept:
+            self.kept.add(key)
+            self._in_background(self.write_back(results))
+
+    def _in_background(self, coroutine):
+        # Outlives the turn, which may be cancelled by barge-in
+        task = asyncio.ensure_future(coroutine)
+        self.background.add(task)
+        task.add_done_callback(self.background.discard)
+
+    async def _fetch_page(self, url: str) -> str:
+        """The text of the page at ``url``, or "" if it is not a readable HTML page."""
+        if self.http_client is None:
+            self.http_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.config.WEB_FETCH_TIMEOUT),
+                follow_redirects=True,
+                headers={"User-Agent": "Mozilla/5.0 (compatible; voice-assistant)"},
+            )
+            self.fetch_semaphore = asyncio.Semaphore(self.config.WEB_FETCH_CONCURRENCY)
+        if not url.startswith(("http://", "https://")):
+            return ""
+        async with self.fetch_semaphore:
+            try:
+                async with self.http_client.stream("GET", url) as response:
+                    if response.status_code != 200 or "html" not in response.headers.get(
+                        "content-type", ""
+                    ):
+                        return ""
+                    body = bytearray()
+                    async for chunk in response.aiter_bytes():
+                        body.extend(chunk)
+                        if len(body) >= self.config.WEB_FETCH_MAX_BYTES:
+                            break
+                    html = bytes(body).decode(response.encoding or "utf-8", errors="replace")
+            except httpx.HTTPError as e:
+                logger.debug(f"Fetching {url} failed: {e}")
+                return ""
+        self.pages_fetched += 1
+        # Parsing a large page takes milliseconds of CPU, so not on the event loop
+        return await asyncio.to_thread(extract_text, html)
+
+    async def fetch_pages(self, urls: list[str]) -> list[str]:
+        """Fetches the pages concurrently; each is its text or "" on failure."""
+        return await asyncio.gather(*[self._fetch_page(url) for url in urls])
+
+    def _documents(self, results: list[WebResult], pages: list[str]) -> tuple[list[str], list[dict]]:
+        fetched_at = time.time()
+        texts, metadata, seen = [], [], set()
+        for result, page in zip(results, pages):
+            chunks = chunk_text(
+                page, self.config.CHUNK_TOKENS, self.config.CHUNK_OVERLAP_TOKENS
+            )[: self.config.WEB_PAGE_MAX_CHUNKS]
+            # The snippet still describes a page that could not be read
+            for text in chunks or [result.snippet]:
+                if text and text not in seen:
+                    seen.add(text)
+                    texts.append(text)
+                    metadata.append(
+                        {"source": WEB_SOURCE, "url": result.url, "fetched_at": fetched_at}
+                    )
+        return texts, metadata
+
+    def _replace_documents(self, urls: list[str], texts: list[str], metadata: list[dict]) -> int:
+        """Replaces the stored documents of ``urls``; blocking."""
+        self.milvus_wrapper.delete_documents(
+            f"source == {json.dumps(WEB_SOURCE)} and url in {json.dumps(urls)}"
+        )
+        inserted = 0
+        for start in range(0, len(texts), self.config.EMBED_BATCH_SIZE):
+            end = start + self.config.EMBED_BATCH_SIZE
+            inserted += self.milvus_wrapper.insert_rows(texts[start:end], metadata[start:end])
+        return inserted
+
+    async def write_back(self, results: list[WebResult]):
+        """Stores the text of the result pages in the knowledge base."""
+        try:
+            pages = await self.fetch_pages([result.url for result in results])
+            texts, metadata = self._documents(results, pages)
+            if not texts:
+                return
+            urls = sorted({result.url for result in results})
+            inserted = await self.executor.run(
+                "milvus", self._replace_documents, urls, texts, metadata, timeout=60
+            )
+            self.documents_written += inserted
+            logger.debug(f"Stored {inserted} web documents from {len(urls)} pages")
+        except Exception as e:
+            logger.warning(f"    ⚠️  Storing web results failed: {e}")
+
+    async def expire(self):
+        """Deletes web documents fetched more than ``WEB_KB_TTL`` seconds ago."""
+        cutoff = time.time() - self.config.WEB_KB_TTL
+        try:
+            expired = await self.executor.run(
+                "milvus",
+                self.milvus_wrapper.delete_documents,
+                f"source == {json.dumps(WEB_SOURCE)} and fetched_at < {cutoff}",
+                timeout=60,
+            )
+        except Exception as e:
+            logger.warning(f"    ⚠️  Expiring web documents failed: {e}")
+            return
+        self.documents_expired += expired
+        if expired:
+            logger.debug(f"Expired {expired} web documents")
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "pages_fetched": self.pages_fetched,
+            "documents_written": self.documents_written,
+            "documents_expired": self.documents_expired,
+        }
+
+    async def aclose(self):
+        for task in list(self.background):
+            task.cancel()
+        await asyncio.gather(*self.background, return_exceptions=True)
+        if self.http_client is not None:
+            await self.http_client.aclose()
+            self.http_client = None